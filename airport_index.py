@@ -0,0 +1,269 @@
+import csv
+import math
+import os
+import re
+import zoneinfo
+from functools import lru_cache
+
+from result_store import cell_key
+
+# Spatial index over the latitude/longitude columns of iata-icao.csv, used
+# to expand a search to the airports near its origin or destination. Airports
+# are bucketed into a grid of GRID_DEGREES cells; a radius query only visits
+# the cells overlapping the radius's bounding box (wrapping at the
+# antimeridian, all longitudes near the poles) and computes great-circle
+# distances for the airports in them, so a query takes microseconds instead
+# of a scan over ~9000 rows.
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'iata-icao.csv')
+GRID_DEGREES = 1.0
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_MAX_NEARBY = 3
+EXPAND_MODES = ("origin", "destination", "both")
+
+# Airports whose name contains one of these are never suggested (no
+# scheduled passenger flights to search for)
+EXCLUDED_NAME_WORDS = ("Air Base", "Air Force", "Naval Air", "Army", "Military", "Heliport", "Airpark")
+
+# Principal-city coordinates in tzdata's zone.tab, e.g. +3541+13946 or +404251-0740023
+ZONE_COORDS = re.compile(r"([+-])(\d{2})(\d{2})(\d{2})?([+-])(\d{3})(\d{2})(\d{2})?$")
+
+# City codes the site accepts that are not airports; they are located at the
+# centre of their airports
+METRO_AIRPORTS = {
+    "TYO": ("HND", "NRT"),
+    "OSA": ("KIX", "ITM", "UKB"),
+    "SPK": ("CTS", "OKD"),
+    "SEL": ("ICN", "GMP"),
+    "BJS": ("PEK", "PKX"),
+    "NYC": ("JFK", "EWR", "LGA"),
+    "LON": ("LHR", "LGW", "STN", "LTN", "LCY"),
+    "PAR": ("CDG", "ORY"),
+}
+
+
+def load_airports(file_path=DEFAULT_CSV_PATH):
+    """Reads airports with an IATA code and coordinates from the CSV.
+
+    Returns:
+        List of dicts with iata, name, country_code, lat and lon
+    """
+    airports = []
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                lat, lon = float(row["latitude"]), float(row["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if row.get("iata"):
+                airports.append({"iata": row["iata"], "name": row["airport"],
+                                 "country_code": row["country_code"], "lat": lat, "lon": lon})
+    return airports
+
+
+def _zone_degrees(sign, degrees, minutes, seconds):
+    value = int(degrees) + int(minutes) / 60 + int(seconds or 0) / 3600
+    return -value if sign == "-" else value
+
+
+def load_zone_table():
+    """Reads tzdata's zone.tab from the system tz database (zoneinfo.TZPATH).
+
+    Returns:
+        Dict of country code to [(lat, lon, zone name)]; empty if there is no tz database
+    """
+    for base in zoneinfo.TZPATH:
+        path = os.path.join(base, "zone.tab")
+        if os.path.exists(path):
+            break
+    else:
+        return {}
+    table = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            fields = line.rstrip("\n").split("\t")
+            match = ZONE_COORDS.match(fields[1]) if len(fields) >= 3 else None
+            if match is None:
+                continue
+            lat = _zone_degrees(*match.group(1, 2, 3, 4))
+            lon = _zone_degrees(*match.group(5, 6, 7, 8))
+            table.setdefault(fields[0], []).append((lat, lon, fields[2]))
+    return table
+
+
+@lru_cache(maxsize=1)
+def get_zone_table():
+    """Returns the process-wide zone table (read on first use)."""
+    return load_zone_table()
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class AirportIndex:
+    """Grid index of airports for radius queries.
+
+    Args:
+        airports: Airport dicts as returned by load_airports
+        cell_degrees: Grid cell size in degrees of latitude and longitude
+    """
+
+    def __init__(self, airports, cell_degrees=GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lon_cells = int(math.ceil(360 / cell_degrees))
+        self.by_code = {}
+        self._grid = {}
+        for airport in airports:
+            self.by_code.setdefault(airport["iata"], airport)
+            lat, lon = math.radians(airport["lat"]), math.radians(airport["lon"])
+            self._grid.setdefault(self._cell(airport["lat"], airport["lon"]), []).append(
+                (lat, lon, math.cos(lat), airport))
+
+    def _cell(self, lat, lon):
+        return (int(math.floor((lat + 90) / self.cell_degrees)),
+                int(math.floor((lon + 180) / self.cell_degrees)) % self.lon_cells)
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def locate(self, code):
+        """Returns (lat, lon) of an airport or metro code, or None if unknown."""
+        airport = self.by_code.get(code)
+        if airport is not None:
+            return airport["lat"], airport["lon"]
+        members = [self.by_code[c] for c in METRO_AIRPORTS.get(code, ()) if c in self.by_code]
+        if not members:
+            return None
+        return (sum(a["lat"] for a in members) / len(members),
+                sum(a["lon"] for a in members) / len(members))
+
+    def timezone(self, code, zones=None):
+        """Returns the IANA time zone name of an airport, or None if unknown.
+
+        The zone is the one of the airport's country whose principal city is
+        nearest, which picks e.g. America/Chicago for ORD.
+        """
+        airport = self.by_code.get(code)
+        if airport is None:
+            return None
+        candidates = (get_zone_table() if zones is None else zones).get(airport["country_code"])
+        if not candidates:
+            return None
+        return min(candidates, key=lambda zone: haversine_km(airport["lat"], airport["lon"], zone[0], zone[1]))[2]
+
+    def within(self, lat, lon, radius_km):
+        """Returns [(distance_km, airport)] within radius_km of a point, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        lat_low, lat_high = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        row_low, _ = self._cell(lat_low, 0)
+        row_high, _ = self._cell(min(lat_high, 90 - 1e-9), 0)
+        cos_edge = math.cos(math.radians(max(abs(lat_low), abs(lat_high))))
+        if cos_edge < 1e-9 or radius_km / (KM_PER_DEGREE * cos_edge) >= 180:
+            columns = range(self.lon_cells)
+        else:
+            dlon = radius_km / (KM_PER_DEGREE * cos_edge)
+            first = int(math.floor((lon - dlon + 180) / self.cell_degrees))
+            last = int(math.floor((lon + dlon + 180) / self.cell_degrees))
+            columns = {column % self.lon_cells for column in range(first, last + 1)}
+
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_r)
+        # Compare haversine terms instead of distances: one asin per match, not per candidate
+        limit = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+        found = []
+        for row in range(row_low, row_high + 1):
+            for column in columns:
+                for a_lat, a_lon, a_cos, airport in self._grid.get((row, column), ()):
+                    h = math.sin((a_lat - lat_r) / 2) ** 2 + cos_lat * a_cos * math.sin((a_lon - lon_r) / 2) ** 2
+                    if h <= limit:
+                        found.append((2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h))), airport))
+        found.sort(key=lambda item: (item[0], item[1]["iata"]))
+        return found
+
+    def nearby(self, code, radius_km, limit=DEFAULT_MAX_NEARBY):
+        """Returns up to `limit` other airports within radius_km of an airport or metro code.
+
+        Military airfields and heliports are skipped (see EXCLUDED_NAME_WORDS).
+        A metro code's own airports count as nearby.
+
+        Returns:
+            List of (distance_km, airport), nearest first; empty if the code is unknown
+        """
+        point = self.locate(code)
+        if point is None:
+            return []
+        result = []
+        for distance, airport in self.within(point[0], point[1], radius_km):
+            if airport["iata"] == code or any(word in airport["name"] for word in EXCLUDED_NAME_WORDS):
+                continue
+            result.append((distance, airport))
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+@lru_cache(maxsize=4)
+def get_airport_index(file_path=DEFAULT_CSV_PATH):
+    """Returns the process-wide AirportIndex for a CSV (built on first use)."""
+    return AirportIndex(load_airports(file_path))
+
+
+def nearby_settings(config=None):
+    """Reads NEARBY_RADIUS_KM, NEARBY_MAX_AIRPORTS and NEARBY_EXPAND.
+
+    Returns:
+        dict with radius_km, limit and mode, or None if expansion is off
+        (NEARBY_RADIUS_KM unset or 0)
+    """
+    config = config or {}
+    radius_km = float(config.get("NEARBY_RADIUS_KM") or 0)
+    if radius_km <= 0:
+        return None
+    mode = (config.get("NEARBY_EXPAND") or "both").lower()
+    if mode not in EXPAND_MODES:
+        print(f"Unknown NEARBY_EXPAND {mode!r}, using both")
+        mode = "both"
+    return {"radius_km": radius_km, "limit": int(config.get("NEARBY_MAX_AIRPORTS") or DEFAULT_MAX_NEARBY),
+            "mode": mode}
+
+
+def expand_cells(cells, config=None, index=None):
+    """Adds a cell per nearby airport of each cell's origin and/or destination.
+
+    Only one end is swapped per extra cell, so a cell gets at most
+    2 * NEARBY_MAX_AIRPORTS extras. Extra cells carry "nearby_of" (the key
+    of the configured cell) and come after all configured cells; a cell
+    that is configured anyway is not added twice.
+
+    Returns:
+        The configured cells followed by the extra cells
+    """
+    settings = nearby_settings(config)
+    if settings is None or not cells:
+        return list(cells)
+    index = index or get_airport_index()
+    seen = {cell_key(cell) for cell in cells}
+    extra = []
+    for cell in cells:
+        swaps = []
+        if settings["mode"] in ("origin", "both"):
+            swaps += [("origin", a["iata"]) for _, a in index.nearby(cell["origin"], settings["radius_km"], settings["limit"])]
+        if settings["mode"] in ("destination", "both"):
+            swaps += [("dest", a["iata"]) for _, a in index.nearby(cell["dest"], settings["radius_km"], settings["limit"])]
+        for field, code in swaps:
+            candidate = dict(cell, **{field: code}, nearby_of=cell_key(cell))
+            if candidate["origin"] == candidate["dest"] or cell_key(candidate) in seen:
+                continue
+            seen.add(cell_key(candidate))
+            extra.append(candidate)
+    if extra:
+        print(f"Nearby airports: {len(extra)} extra cells within {settings['radius_km']:.0f} km")
+    return list(cells) + extra
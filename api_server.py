@@ -0,0 +1,98 @@
+import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from browser_pool import BrowserPool
+from result_store import ResultStore
+from scraper import create_scrape_driver
+from search_service import SearchService, build_cell, DEFAULT_MAX_AGE
+
+DEFAULT_PORT = 8081
+
+
+def make_handler(service):
+    """Builds the request handler class bound to a SearchService."""
+
+    class SearchHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _handle_search(self, params):
+            try:
+                cell = build_cell(params.get("origin"), params.get("dest"), params.get("dep_date"),
+                                  params.get("ret_date"), params.get("air_type", "0"))
+                max_age = float(params["max_age"]) if params.get("max_age") not in (None, "") else None
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            try:
+                self._send_json(200, service.search(cell, max_age=max_age))
+            except FutureTimeoutError:
+                self._send_json(504, {"error": "Timed out waiting for the scrape"})
+            except Exception as e:
+                self._send_json(502, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/search':
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._handle_search(params)
+            elif url.path == '/health':
+                self._send_json(200, {"status": "ok", "browser_pool": service.pool.stats(),
+                                      "in_flight": service.in_flight(), "stats": service.stats})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/search':
+                self._send_json(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(params, dict):
+                    raise ValueError("Request body must be a JSON object")
+            except ValueError as e:
+                self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+                return
+            self._handle_search({k: str(v) for k, v in params.items() if v is not None})
+
+        def log_message(self, format, *args):
+            print(f"API {self.address_string()} - {format % args}")
+
+    return SearchHandler
+
+
+def run_api_server(config):
+    """Serves on-demand searches over HTTP until interrupted.
+
+    GET /search?origin=TYO&dest=SIN&dep_date=20260101[&ret_date=...&air_type=1&max_age=600]
+    POST /search with the same fields as a JSON object
+    GET /health
+    """
+    port = int(config.get("API_PORT") or DEFAULT_PORT)
+    max_age = float(config.get("API_CACHE_MAX_AGE") or DEFAULT_MAX_AGE)
+    pool_size = int(config.get("BROWSER_POOL_SIZE") or 1)
+
+    store = ResultStore()
+    pool = BrowserPool(lambda: create_scrape_driver(config), size=pool_size)
+    service = SearchService(store, pool, max_age=max_age, config=config)
+    server = ThreadingHTTPServer(("0.0.0.0", port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Search API listening on port {port} (cache max age {max_age:.0f}s, {pool_size} browser(s))")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping search API...")
+    finally:
+        server.server_close()
+        service.close()
+        pool.close()
+        store.close()
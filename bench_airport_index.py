@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark of nearby-airport queries: the grid index (airport_index.py)
+against a full scan of iata-icao.csv, for a few hub airports and radii.
+
+Usage: python bench_airport_index.py [queries]
+"""
+
+import sys
+import time
+
+from airport_index import AirportIndex, haversine_km, load_airports
+
+HUBS = ("HND", "ICN", "BKK", "SIN", "JFK", "LHR")
+RADII_KM = (50, 150, 500)
+
+
+def per_query_us(fn, queries):
+    started = time.perf_counter()
+    for _ in range(queries):
+        fn()
+    return (time.perf_counter() - started) / queries * 1e6
+
+
+def main():
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    started = time.perf_counter()
+    airports = load_airports()
+    loaded = time.perf_counter()
+    index = AirportIndex(airports)
+    built = time.perf_counter()
+    print(f"{len(airports)} airports: CSV read {(loaded - started) * 1000:.0f} ms, "
+          f"index built {(built - loaded) * 1000:.0f} ms")
+
+    print(f"{'radius':>7} {'grid us':>9} {'scan us':>9} {'speedup':>8} {'found':>6}")
+    for radius in RADII_KM:
+        points = [(index.by_code[code]["lat"], index.by_code[code]["lon"]) for code in HUBS]
+        grid = sum(per_query_us(lambda: index.within(lat, lon, radius), queries) for lat, lon in points) / len(points)
+        scan = sum(per_query_us(lambda: [a for a in airports if haversine_km(lat, lon, a["lat"], a["lon"]) <= radius],
+                                max(1, queries // 100)) for lat, lon in points) / len(points)
+        found = sum(len(index.within(lat, lon, radius)) for lat, lon in points) / len(points)
+        print(f"{radius:>5}km {grid:>9.1f} {scan:>9.0f} {scan / grid:>7.0f}x {found:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
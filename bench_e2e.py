@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+End-to-end scrape benchmark against the offline replay server.
+
+Runs scrape_cell over a batch of search cells for every combination of
+worker count and readiness strategy, and reports pages/min, the median time
+per stage (navigate, wait, page_source, clean_html, parse, save; see
+instrumentation.py) and the peak RSS of all Chrome processes.
+
+Usage:
+    python bench_e2e.py [--pages 8] [--workers 1,2,4] [--strategies sleep,observer]
+                        [--latency 1.0] [--inject-interval 0.5] [--batch-size 2]
+
+The fixed-sleep strategy waits long enough for every card to be injected
+(latency + all batches + 1s), which is the replay equivalent of the 55s
+production sleep. Cache files are written to a temporary directory, so the
+real data/ directory is not touched.
+"""
+
+import argparse
+import math
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from browser_pool import BrowserPool, process_tree_rss
+from replay_server import ReplayServer, DEFAULT_PAGES
+from scraper import create_scrape_driver, scrape_cell
+
+STAGES = ("navigate", "wait", "page_source", "clean_html", "parse", "save")
+
+# Only used to vary the cells; the replay server answers every search with the recorded page
+BENCH_DESTINATIONS = ["SEL", "BKK", "TPE", "HKG", "SIN", "MNL", "SGN", "HAN"]
+
+
+class RssSampler:
+    """Samples the RSS of every process started by this one (chromedriver + Chrome)."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(os.getpid(), include_root=False))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def bench_cells(count, air_type):
+    return [{"origin": "TYO", "dest": BENCH_DESTINATIONS[i % len(BENCH_DESTINATIONS)],
+             "dep_date": f"202612{10 + i // len(BENCH_DESTINATIONS):02d}",
+             "ret_date": "20261231" if air_type == "1" else None, "air_type": air_type}
+            for i in range(count)]
+
+
+def run_case(base_url, cells, workers, strategy, sleep_seconds, stable_seconds):
+    config = {
+        "SEARCH_BASE_URL": base_url,
+        "SCRAPE_WAIT_STRATEGY": strategy,
+        "SCRAPE_MAX_WAIT": str(sleep_seconds if strategy == "sleep" else 55),
+        "SCRAPE_STABLE_SECONDS": str(stable_seconds),
+    }
+    pool = BrowserPool(lambda: create_scrape_driver(config), size=workers)
+    try:
+        # Launch every browser before the clock starts
+        with ExitStack() as stack:
+            for _ in range(workers):
+                stack.enter_context(pool.acquire())
+
+        def scrape(cell):
+            timings = {}
+            with pool.acquire() as driver:
+                flights = scrape_cell(driver, cell, config=config, timings=timings)
+            return flights, timings
+
+        with RssSampler() as sampler:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(scrape, cells))
+            elapsed = time.perf_counter() - started
+    finally:
+        pool.close()
+
+    failed = sum(1 for flights, _ in results if not flights)
+    stage_medians = {
+        stage: statistics.median([t[stage] for _, t in results if stage in t] or [0.0]) for stage in STAGES
+    }
+    return {
+        "pages_per_min": len(cells) / elapsed * 60,
+        "elapsed": elapsed,
+        "failed": failed,
+        "offers": statistics.median([len(f or []) for f, _ in results]),
+        "stages": stage_medians,
+        "peak_rss": sampler.peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end scrape benchmark on the replay server.")
+    parser.add_argument("--pages", type=int, default=8, help="search cells per case")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated browser counts")
+    parser.add_argument("--strategies", default="sleep,observer", help="comma-separated wait strategies")
+    parser.add_argument("--air-type", default="0", choices=("0", "1"))
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--inject-interval", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--stable-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    pages = {k: os.path.abspath(v) for k, v in DEFAULT_PAGES.items()}
+    server = ReplayServer(pages, port=0, latency=args.latency,
+                          inject_interval=args.inject_interval, batch_size=args.batch_size).start()
+    card_count = server.card_counts[args.air_type]
+    sleep_seconds = args.latency + math.ceil(card_count / args.batch_size) * args.inject_interval + 1
+    cells = bench_cells(args.pages, args.air_type)
+
+    # save_cell_results writes to ./data; keep benchmark output out of the real cache
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.chdir(workdir)
+
+    print(f"🧪 {args.pages} pages per case from {server.base_url} ({card_count} cards, "
+          f"latency {args.latency}s, {args.batch_size} cards every {args.inject_interval}s, sleep {sleep_seconds:.1f}s)")
+    header = f"{'strategy':<9} {'workers':>7} {'pages/min':>9} {'failed':>6} {'offers':>6} " + \
+             " ".join(f"{s + ' s':>10}" for s in STAGES) + f" {'peak RSS MB':>11}"
+    print(header)
+    try:
+        for strategy in [s.strip() for s in args.strategies.split(',') if s.strip()]:
+            for workers in [int(w) for w in args.workers.split(',') if w.strip()]:
+                result = run_case(server.base_url, cells, workers, strategy, sleep_seconds, args.stable_seconds)
+                stages = " ".join(f"{result['stages'][s]:>10.2f}" for s in STAGES)
+                print(f"{strategy:<9} {workers:>7} {result['pages_per_min']:>9.1f} {result['failed']:>6} "
+                      f"{result['offers']:>6.0f} {stages} {result['peak_rss'] / 1e6:>11.0f}")
+    finally:
+        server.stop()
+    print(f"Cache files written to {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark of report image encoding: the old fixed JPEG (quality 75, tall
+reports shrunk to 9000px) against progressive JPEG, size-budgeted JPEG and
+WebP, and "auto", on a Pillow-rendered report from debug.html and on a
+report four times as tall.
+
+Usage: python bench_image_encoder.py [max_kb]
+"""
+
+import io
+import sys
+import time
+
+from bs4 import BeautifulSoup
+from PIL import Image
+from parser import parse_flight_data, clean_html
+from pillow_renderer import render_report
+from image_encoder import MAX_HEIGHT, MAX_WIDTH, encode, encode_report, fit_width, split_pages
+
+COMMENT = ("**优点**：价格最低，直飞 *无需中转*\n- 注意 **行李** 规定与转机时间\n"
+           "- Check the terminal change and the visa rules before booking\n2. 早班出发，建议提前到达机场")
+
+
+def sample_report():
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        flights = parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), "0")
+    return render_report({
+        "origin_airport_name": "東京", "destination_airport_name": "ソウル", "today_date": "2026年 10月 19日",
+        "flights": flights[:3], "is_round_trip": False, "summary_note": "以上为最便宜的三个航班选项。" * 3,
+        "report_url": "#", "flight_comments": [COMMENT * 2] * 3,
+    })
+
+
+def stacked(image, copies):
+    tall = Image.new('RGB', (image.width, image.height * copies))
+    for i in range(copies):
+        tall.paste(image, (0, i * image.height))
+    return tall
+
+
+def legacy(image):
+    """The previous path: shrink to Telegram's limits, then JPEG quality 75."""
+    if image.height > MAX_HEIGHT or image.width > MAX_WIDTH:
+        scale = min(MAX_HEIGHT / image.height, MAX_WIDTH / image.width)
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=75, optimize=True)
+    return [{"data": out.getvalue(), "format": "jpeg", "quality": 75, "width": image.width, "height": image.height}]
+
+
+def run(name, image, max_bytes):
+    variants = [
+        ("legacy q75", lambda: legacy(image)),
+        ("progressive q75", lambda: [{"data": encode(page, "jpeg", 75), "format": "jpeg", "quality": 75,
+                                      "width": page.width, "height": page.height}
+                                     for page in split_pages(fit_width(image))]),
+        ("budget jpeg", lambda: encode_report(image, "jpeg", max_bytes)),
+        ("budget webp", lambda: encode_report(image, "webp", max_bytes)),
+        ("auto", lambda: encode_report(image, "auto", max_bytes)),
+    ]
+    print(f"\n{name}: {image.width}x{image.height}")
+    print(f"{'variant':<16} {'ms':>8} {'KB':>8} {'pages':>6}  quality / page size")
+    for label, fn in variants:
+        started = time.perf_counter()
+        pages = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        total_kb = sum(len(p["data"]) for p in pages) / 1024
+        detail = ", ".join(f"{p['format']} q{p['quality']} {p['width']}x{p['height']}" for p in pages)
+        print(f"{label:<16} {elapsed:>8.0f} {total_kb:>8.1f} {len(pages):>6}  {detail}")
+
+
+def main():
+    max_bytes = int(float(sys.argv[1]) * 1024) if len(sys.argv) > 1 else 1024 * 1024
+    image = sample_report()
+    run("Report (3 cards)", image, max_bytes)
+    run("Tall report (stacked x4)", stacked(image, 4), max_bytes)
+
+
+if __name__ == "__main__":
+    main()
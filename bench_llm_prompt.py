@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the report's Gemini request: the previous prompt (the top
+offers as indented JSON plus a spelled-out reply format) against the
+compact table prompt with a JSON response schema (llm_prompt.py).
+
+Offers are parsed from the saved result pages (debug.html for one-way,
+flight.html for round trips). Token counts are estimated offline; with
+--api and GEMINI_API_ENDPOINT/GEMINI_API_KEY in .env, they come from the
+countTokens endpoint instead.
+
+Usage: python bench_llm_prompt.py [--api] [--flights 3]
+"""
+
+import argparse
+import json
+import re
+import time
+
+from llm_prompt import build_prompt, build_request
+
+# generate_report's prompts before llm_prompt.py
+LEGACY_ROUND_TRIP_PROMPT = """You are a flight analysis assistant. Analyze the round-trip flight data and provide a detailed summary and individual flight comments in Chinese.
+
+DATA:
+```json
+{json_flights_data}
+```
+
+OUTPUT FORMAT (valid JSON only, no markdown):
+```json
+{{
+    "summary_note": "Brief note about the round-trip flights (e.g., self-transfer requirements, best value recommendations, stay duration)",
+    "outbound_comments": [
+        "Comment for outbound flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
+        "Comment for outbound flight 2 in markdown format",
+        "Comment for outbound flight 3 in markdown format"
+    ],
+    "return_comments": [
+        "Comment for return flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
+        "Comment for return flight 2 in markdown format",
+        "Comment for return flight 3 in markdown format"
+    ]
+}}
+```
+
+IMPORTANT: Each flight comment should include:
+- Transfer information (if any): self-transfer or protected transfer
+- What travelers should watch out for: layover time, visa requirements, terminal changes
+- Pros: price, timing, airline quality
+- Cons: long layover, early departure, etc.
+
+Use markdown formatting: **bold**, *italic*, - bullets, numbered lists.
+
+Keep the summary_note concise (under 100 Chinese characters). Keep each flight comment under 150 Chinese characters."""
+
+LEGACY_ONE_WAY_PROMPT = """You are a flight analysis assistant. Analyze the flight data and provide a detailed summary and individual flight comments in Chinese.
+
+DATA:
+```json
+{json_flights_data}
+```
+
+OUTPUT FORMAT (valid JSON only, no markdown):
+```json
+{{
+    "summary_note": "Brief note about the flights (e.g., self-transfer requirements, best value recommendations, price differences)",
+    "flight_comments": [
+        "Comment for flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
+        "Comment for flight 2 in markdown format - discuss transfer info, what to watch out for, pros/cons",
+        "Comment for flight 3 in markdown format - discuss transfer info, what to watch out for, pros/cons"
+    ]
+}}
+```
+
+IMPORTANT: Each flight comment should include:
+- Transfer information (if any): self-transfer or protected transfer
+- What travelers should watch out for: layover time, visa requirements, terminal changes
+- Pros: price, timing, airline quality
+- Cons: long layover, early departure, etc.
+
+Use markdown formatting: **bold**, *italic*, - bullets, numbered lists.
+
+Keep the summary_note concise (under 100 Chinese characters). Keep each flight comment under 150 Chinese characters."""
+
+# Roughly how Gemini's SentencePiece vocabulary splits text: one token per
+# ASCII word, digit, symbol or CJK character; whitespace runs are free
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def legacy_request(flights, is_round_trip):
+    template = LEGACY_ROUND_TRIP_PROMPT if is_round_trip else LEGACY_ONE_WAY_PROMPT
+    prompt = template.format(json_flights_data=json.dumps(flights, indent=2, ensure_ascii=False))
+    return {"contents": [{"parts": [{"text": prompt}]}]}
+
+
+def load_flights(count):
+    """Returns (one-way, round-trip) top offers as generate_report passes them to the prompt."""
+    from bs4 import BeautifulSoup
+    from parser import parse_flight_data, parse_round_trip_flight_data
+    from scraper import build_search_url, normalize_flight_data
+
+    samples = []
+    for path, parse, cell in (
+            ("debug.html", parse_flight_data,
+             {"origin": "HND", "dest": "CMB", "dep_date": "20251227", "ret_date": None, "air_type": "0"}),
+            ("flight.html", parse_round_trip_flight_data,
+             {"origin": "NRT", "dest": "KTM", "dep_date": "20260105", "ret_date": "20260124", "air_type": "1"})):
+        with open(path, "r", encoding="utf-8") as f:
+            flights = parse(BeautifulSoup(f.read(), "lxml"))
+        for flight in flights:
+            flight["source_url"] = build_search_url(cell)
+        if cell["air_type"] == "0":
+            flights = normalize_flight_data(flights)
+        samples.append(flights[:count])
+    return samples
+
+
+def count_tokens_api(config, request):
+    import requests
+    url = f"{config['GEMINI_API_ENDPOINT']}/models/gemini-flash-latest-non-thinking:countTokens?key={config['GEMINI_API_KEY']}"
+    response = requests.post(url, json={"contents": request["contents"]}, timeout=30)
+    response.raise_for_status()
+    return response.json()["totalTokens"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the report's Gemini prompt before and after llm_prompt.py.")
+    parser.add_argument("--api", action="store_true", help="Count tokens with the countTokens endpoint")
+    parser.add_argument("--flights", type=int, default=3)
+    args = parser.parse_args()
+
+    count = estimate_tokens
+    label = "estimated tokens"
+    if args.api:
+        from scraper import load_config
+        config = load_config()
+        count = lambda text: count_tokens_api(config, {"contents": [{"parts": [{"text": text}]}]})
+        label = "tokens (countTokens)"
+
+    one_way, round_trip = load_flights(args.flights)
+    print(f"{'':20} {'chars':>7} {label:>22}")
+    for name, flights, is_round_trip in (("one-way", one_way, False), ("round-trip", round_trip, True)):
+        if not flights:
+            print(f"{name}: no offers parsed")
+            continue
+        before = legacy_request(flights, is_round_trip)["contents"][0]["parts"][0]["text"]
+        started = time.perf_counter()
+        request = build_request(flights, is_round_trip)
+        build_ms = (time.perf_counter() - started) * 1000
+        after = build_prompt(flights, is_round_trip)
+        # The response schema is billed as input too
+        schema = json.dumps(request["generationConfig"]["responseSchema"])
+        before_tokens, after_tokens = count(before), count(after) + count(schema)
+        print(f"{name + ' before':20} {len(before):>7} {before_tokens:>22}")
+        print(f"{name + ' after':20} {len(after):>7} {count(after):>22}")
+        print(f"{'  + response schema':20} {len(schema):>7} {after_tokens:>22}"
+              f"   ({1 - after_tokens / before_tokens:.0%} fewer, request built in {build_ms:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark of chrome_render.render_html_batch: N reports rendered one after
+another (one tab, one encoder) against one batch (N tabs on their own CDP
+sessions, captures encoded on CPU-count encoder threads).
+
+With Chrome installed, filled template.html reports from debug.html are
+rendered for real. --simulate replaces Chrome with fake tab sessions that
+wait --chrome-ms per page (load, layout and raster happen in Chrome's own
+processes) and return a real PNG of a Pillow-drawn report, so the base64
+and PNG decoding and the image_encoder work done in Python are measured as
+they are.
+
+Usage:
+    python bench_render_batch.py [--reports 8] [--simulate] [--chrome-ms 300] [--format jpeg]
+"""
+
+import argparse
+import base64
+import io
+import os
+import time
+
+from bs4 import BeautifulSoup
+
+from chrome_render import render_html_batch, create_render_driver
+from parser import parse_flight_data, clean_html
+
+COMMENT = "<p><strong>优点</strong>：价格最低，直飞</p><ul><li>注意 <strong>行李</strong> 规定与转机时间</li></ul>"
+
+
+def sample_flights():
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        return parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), "0")
+
+
+def report_documents(count):
+    from scraper import generate_flight_card_html
+    with open('template.html', 'r', encoding='utf-8') as f:
+        template = f.read()
+    flights = sample_flights()
+    documents = []
+    for n in range(count):
+        cards = "".join(generate_flight_card_html(flight, i, COMMENT * 3)
+                        for i, flight in enumerate(flights[n % 5:n % 5 + 3]))
+        documents.append(template.format(
+            origin_airport_name="東京", destination_airport_name="コロンボ", today_date="2026年 10月 19日",
+            flight_cards=cards, summary_note=f"以上为最便宜的三个航班选项。#{n}", report_url="#"))
+    return documents
+
+
+class SimulatedBrowser:
+    """Stands in for Chrome: every tab takes chrome_ms and captures the same PNG."""
+
+    capabilities = {"goog:chromeOptions": {"debuggerAddress": "127.0.0.1:9222"}}
+
+    def __init__(self, chrome_ms):
+        from pillow_renderer import render_report
+        image = render_report({
+            "origin_airport_name": "東京", "destination_airport_name": "コロンボ", "today_date": "2026年 10月 19日",
+            "flights": sample_flights()[:3], "is_round_trip": False, "summary_note": "以上为最便宜的三个航班选项。",
+            "report_url": "#", "flight_comments": ["**优点**：价格最低，直飞\n- 注意 **行李** 规定与转机时间" * 3] * 3,
+        })
+        out = io.BytesIO()
+        image.save(out, 'PNG')
+        self.capture = base64.b64encode(out.getvalue()).decode()
+        self.size = image.size
+        self.chrome_ms = chrome_ms
+        self.targets = 0
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.targets += 1
+        return {"targetId": f"T{self.targets}"}
+
+    def session(self, websocket_url, timeout):
+        return SimulatedSession(self)
+
+
+class SimulatedSession:
+    def __init__(self, browser):
+        self.browser = browser
+
+    def send(self, method, params=None):
+        if method == "Runtime.evaluate":
+            return {"result": {"value": list(self.browser.size) if params["awaitPromise"] else "complete"}}
+        if method == "Page.captureScreenshot":
+            time.sleep(self.browser.chrome_ms / 1000)
+            return {"data": self.browser.capture}
+        return {}
+
+    def close(self):
+        pass
+
+
+def timed(fn):
+    started = time.perf_counter()
+    results = fn()
+    return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs batched report rendering.")
+    parser.add_argument("--reports", type=int, default=8)
+    parser.add_argument("--simulate", action="store_true", help="fake Chrome tabs instead of a real browser")
+    parser.add_argument("--chrome-ms", type=float, default=300, help="simulated Chrome time per page")
+    parser.add_argument("--format", default="jpeg", help="REPORT_IMAGE_FORMAT (jpeg, webp, auto)")
+    args = parser.parse_args()
+
+    config = {"REPORT_IMAGE_FORMAT": args.format}
+    documents = report_documents(args.reports)
+    if args.simulate:
+        driver = SimulatedBrowser(args.chrome_ms)
+        kwargs = {"session_factory": driver.session}
+        label = f"simulated Chrome, {args.chrome_ms:.0f} ms per page"
+    else:
+        driver = create_render_driver()
+        kwargs = {}
+        label = "headless Chrome"
+    print(f"{args.reports} reports, {label}, {os.cpu_count()} CPUs, {args.format}")
+
+    try:
+        # Warm-up: first launch costs (fonts, encoder tables) stay out of both timings
+        render_html_batch(documents[:1], driver=driver, config=config, **kwargs)
+        sequential, _ = timed(lambda: [render_html_batch([document], driver=driver, concurrency=1, config=config,
+                                                         encode_workers=1, **kwargs)
+                                       for document in documents])
+        batched, results = timed(lambda: render_html_batch(documents, driver=driver, config=config,
+                                                           concurrency=args.reports, **kwargs))
+    finally:
+        if not args.simulate:
+            driver.quit()
+
+    assert all(results), "some reports failed to render"
+    print(f"{'mode':<12} {'seconds':>8} {'reports/s':>10}")
+    for name, seconds in (("sequential", sequential), ("batched", batched)):
+        print(f"{name:<12} {seconds:>8.2f} {args.reports / seconds:>10.2f}")
+    print(f"speedup: {sequential / batched:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
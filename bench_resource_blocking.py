@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: page load time, bytes transferred and JS heap with and without
+resource blocking, against a saved local copy of a tour.ne.jp result page.
+
+Usage:
+    python bench_resource_blocking.py [page.html] [runs]
+
+The page (default: debug.html) is served from a local HTTP server. Resources
+it references on other hosts (images, ads, trackers) are fetched as usual
+unless blocked, so the numbers reflect what blocking saves on a real page.
+"""
+
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from scraper import create_scrape_driver
+
+PORT = 8765
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory):
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bytes_transferred(driver):
+    """Sums encodedDataLength of finished requests from the performance log."""
+    total = 0
+    requests_done = 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            total += message["params"].get("encodedDataLength", 0)
+            requests_done += 1
+    return total, requests_done
+
+
+def measure(config, url):
+    driver = create_scrape_driver(config, performance_logging=True)
+    try:
+        driver.get_log("performance")  # Drop startup entries
+        started = time.perf_counter()
+        driver.get(url)
+        load_seconds = time.perf_counter() - started
+        # Give late (async) requests a moment to finish
+        time.sleep(2)
+        transferred, requests_done = bytes_transferred(driver)
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        heap = next((m["value"] for m in metrics if m["name"] == "JSHeapUsedSize"), 0)
+        return load_seconds, transferred, requests_done, heap
+    finally:
+        driver.quit()
+
+
+def main():
+    page = sys.argv[1] if len(sys.argv) > 1 else "debug.html"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    directory = os.path.dirname(os.path.abspath(page))
+    url = f"http://127.0.0.1:{PORT}/{os.path.basename(page)}"
+    server = start_server(directory)
+
+    print(f"🧪 Benchmarking {url} ({runs} runs per mode)")
+    print(f"{'mode':<10} {'load s':>8} {'MB':>8} {'requests':>9} {'heap MB':>8}")
+    try:
+        for mode, blocking in (("baseline", "false"), ("blocking", "true")):
+            samples = [measure({"RESOURCE_BLOCKING": blocking}, url) for _ in range(runs)]
+            load, transferred, requests_done, heap = (statistics.median(col) for col in zip(*samples))
+            print(f"{mode:<10} {load:>8.2f} {transferred / 1e6:>8.2f} {requests_done:>9.0f} {heap / 1e6:>8.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the cross-route summary (route_analytics.py) on a synthetic
+result store: a Python group-by over every stored offer, a full rebuild of
+the summary, an incremental update after a few cells were scraped again,
+and the report queries.
+
+Usage: python bench_route_analytics.py [offers_per_cell] [rescraped_cells]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from result_store import ResultStore
+from route_analytics import RouteSummary, format_summary
+
+ORIGINS = ("TYO", "NRT", "HND")
+DESTINATIONS = tuple(f"D{i:02d}" for i in range(40))
+DATES = tuple(f"209912{d:02d}" for d in range(1, 31)) + tuple(f"210001{d:02d}" for d in range(1, 31))
+
+
+def offers_group_by(store):
+    """The straightforward way: read every offer of the latest searches and group in Python."""
+    rows = store.conn.execute(
+        "SELECT s.origin, s.dest, s.dep_date, s.air_type, o.price FROM searches s"
+        " JOIN offers o ON o.search_id = s.id"
+        " WHERE o.price IS NOT NULL"
+        " AND s.scraped_at = (SELECT MAX(scraped_at) FROM searches WHERE cell_key = s.cell_key)"
+    ).fetchall()
+    best = {}
+    for origin, dest, dep_date, air_type, price in rows:
+        key = (origin, dest, dep_date, air_type)
+        if key not in best or price < best[key]:
+            best[key] = price
+    return best
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    per_cell = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rescraped = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(0)
+    cells = [{"origin": o, "dest": d, "dep_date": date, "ret_date": None, "air_type": "0"}
+             for o in ORIGINS for d in DESTINATIONS for date in DATES]
+
+    def scrape(cell, scraped_at):
+        store.record_search(cell, [{"price": f"{rng.randint(20000, 200000):,}円"} for _ in range(per_cell)],
+                            scraped_at)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        _, ms = timed(lambda: [scrape(cell, 1700000000.0) for cell in cells])
+        print(f"{len(cells)} cells, {len(cells) * per_cell} offers stored in {ms / 1000:.1f} s")
+
+        best, scan_ms = timed(lambda: offers_group_by(store))
+        print(f"Python group-by over all offers: {len(best)} groups in {scan_ms:.0f} ms")
+        summary = RouteSummary(store)
+        groups, rebuild_ms = timed(summary.update)
+        print(f"Summary rebuild: {groups} groups in {rebuild_ms:.0f} ms")
+
+        for cell in rng.sample(cells, rescraped):
+            scrape(cell, 1700003600.0)
+        groups, update_ms = timed(summary.update)
+        print(f"Incremental update: {groups} groups in {update_ms:.1f} ms")
+        _, report_ms = timed(lambda: format_summary(summary))
+        print(f"Report queries: {report_ms:.1f} ms")
+        assert offers_group_by(store) == {
+            tuple(row[:4]): row[4] for row in store.conn.execute(
+                "SELECT origin, dest, dep_date, air_type, min_price FROM route_summary")}
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark based on `python -X importtime`.
+
+Runs each scenario in a fresh interpreter several times and reports the
+median wall time, the total import time and which heavy packages were
+loaded at all:
+
+    import      python -c "import scraper"
+    cache-run   python scraper.py with USE_CACHE=true and RENDER_ENGINE=pillow,
+                no LLM or Telegram configured, reading one cached result
+                file (parsed from debug.html) in a temporary directory
+
+Usage:
+    python bench_startup.py [--runs 5] [--top 10]
+
+The heaviest direct imports of the last run of each scenario are listed
+with their cumulative import time.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_PACKAGES = ("selenium", "bs4", "lxml", "PIL", "requests", "markdown", "structlog")
+
+
+def parse_importtime(stderr):
+    """Returns [(module, parent, self_us, cumulative_us)] from -X importtime output.
+
+    parent is None for modules imported by the entry point itself.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    # A module is listed after everything it imports
+    modules = []
+    parents = {}
+    for name, depth, self_us, cumulative_us in reversed(entries):
+        parents[depth] = name
+        modules.append((name, parents.get(depth - 1) if depth else None, self_us, cumulative_us))
+    return modules[::-1]
+
+
+def write_cache_file(work_dir):
+    sys.path.insert(0, REPO_DIR)
+    from bs4 import BeautifulSoup
+    from parser import parse_flight_data, clean_html
+    with open(os.path.join(REPO_DIR, 'debug.html'), 'r', encoding='utf-8') as f:
+        flights = parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), "0")
+    os.makedirs(os.path.join(work_dir, "data"), exist_ok=True)
+    with open(os.path.join(work_dir, "data", "TYO-SEL-20261210-20261019_000000.md"), 'w', encoding='utf-8') as f:
+        f.write("# Flight Search Results for TYO to SEL on 20261210\n\n```json\n")
+        f.write(json.dumps(flights, indent=2, ensure_ascii=False))
+        f.write("\n```\n")
+    shutil.copy(os.path.join(REPO_DIR, 'iata-icao.csv'), work_dir)
+
+
+def run_once(args, env, cwd):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], env=env, cwd=cwd,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(("GEMINI_", "TELEGRAM_"))}
+    with tempfile.TemporaryDirectory() as work_dir:
+        write_cache_file(work_dir)
+        env.update(USE_CACHE="true", RENDER_ENGINE="pillow", PYTHONPATH=REPO_DIR,
+                   TRACE_DIR=os.path.join(work_dir, "traces"), METRICS_FILE=os.path.join(work_dir, "metrics.prom"))
+        # (name, interpreter args, module whose direct imports are listed)
+        scenarios = [
+            ("import", ["-c", "import scraper"], "scraper"),
+            ("cache-run", [os.path.join(REPO_DIR, "scraper.py")], None),
+        ]
+        print(f"{'scenario':<10} {'wall ms':>8} {'import ms':>10}  heavy packages loaded")
+        tops = []
+        for name, scenario_args, root in scenarios:
+            walls, imports = [], []
+            for _ in range(args.runs):
+                wall, modules = run_once(scenario_args, env, work_dir)
+                walls.append(wall * 1000)
+                imports.append(sum(cumulative for _, parent, _, cumulative in modules if parent is None) / 1000)
+            loaded = {module for module, _, _, _ in modules}
+            heavy = [package for package in HEAVY_PACKAGES if package in loaded]
+            print(f"{name:<10} {statistics.median(walls):>8.0f} {statistics.median(imports):>10.0f}  "
+                  f"{', '.join(heavy) or '-'}")
+            top_level = sorted((m for m in modules if m[1] == root), key=lambda m: -m[3])[:args.top]
+            tops.append((name, top_level))
+
+    for name, top_level in tops:
+        print(f"\nHeaviest imports ({name}):")
+        for module, _, _, cumulative in top_level:
+            print(f"  {module:<32} {cumulative / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
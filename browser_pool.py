@@ -0,0 +1,223 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from instrumentation import stage
+
+
+def _children(pid):
+    """Returns the direct child pids of a process (Linux /proc)."""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    try:
+        tids = os.listdir(task_dir)
+    except OSError:
+        return children
+    for tid in tids:
+        try:
+            with open(f"{task_dir}/{tid}/children") as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def process_rss(pid):
+    """Returns the resident set size of a process in bytes (0 if it is gone)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss(pid, include_root=True):
+    """Sums the RSS of a process and all of its descendants, in bytes."""
+    total = process_rss(pid) if include_root else 0
+    pending = _children(pid)
+    while pending:
+        child = pending.pop()
+        total += process_rss(child)
+        pending.extend(_children(child))
+    return total
+
+
+def driver_rss(driver):
+    """Returns the RSS of chromedriver plus every Chrome process it started."""
+    return process_tree_rss(driver.service.process.pid)
+
+
+class BrowserPool:
+    """A fixed-size pool of warm WebDriver instances.
+
+    Drivers are launched lazily with `driver_factory` and kept alive between
+    searches so long-running processes (daemon, API) don't pay the Chrome
+    launch cost per search. A driver that raises while checked out is
+    discarded and replaced on the next acquire.
+    """
+
+    def __init__(self, driver_factory, size=1):
+        self.driver_factory = driver_factory
+        self.size = size
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _is_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _take(self, timeout):
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self.driver_factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Checks out a driver, waiting up to `timeout` seconds if all are busy."""
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        driver = self._take(timeout)
+        if not self._is_alive(driver):
+            self.discard(driver)
+            driver = self._take(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.discard(driver)
+            raise
+        else:
+            self._idle.put(driver)
+
+    def discard(self, driver):
+        """Quits a driver and frees its slot so a fresh one can be launched."""
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Warning: Error closing driver: {e}")
+        with self._lock:
+            self._created -= 1
+
+    def stats(self):
+        return {"size": self.size, "launched": self._created, "idle": self._idle.qsize()}
+
+    def close(self):
+        """Quits all idle drivers; the pool cannot be used afterwards."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
+
+
+class DriverWatchdog:
+    """Keeps the memory of a long-lived scraping driver bounded.
+
+    Before every navigation the browser process-tree RSS is sampled, and the
+    driver is restarted once it exceeds `max_rss_mb` or has served
+    `max_navigations` pages. A cell whose scrape fails (scrape function
+    returns None) is retried on a fresh driver, so a crashed tab costs one
+    restart instead of every remaining cell.
+
+    An initial `driver` (e.g. from a BrowserPool) is used first and quit
+    when recycled; the pool notices the dead driver on its next acquire.
+    Drivers the watchdog launched itself are quit by `close()`.
+    """
+
+    def __init__(self, driver_factory, driver=None, max_rss_mb=None, max_navigations=None, rss_fn=driver_rss):
+        self.driver_factory = driver_factory
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.max_navigations = max_navigations
+        self.rss_fn = rss_fn
+        self._driver = driver
+        self._owned = driver is None
+        self._navigations = 0
+        self.stats = {"navigations": 0, "recycles": 0, "retries": 0, "peak_rss_mb": 0.0}
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self.driver_factory()
+            self._owned = True
+            self._navigations = 0
+        return self._driver
+
+    def _rss(self):
+        try:
+            return self.rss_fn(self._driver)
+        except Exception:
+            return 0
+
+    def recycle(self, reason):
+        """Quits the current driver; the next access launches a fresh one."""
+        if self._driver is None:
+            return
+        print(f"Recycling browser ({reason})")
+        with stage("browser_recycle"):
+            try:
+                self._driver.quit()
+            except Exception as e:
+                print(f"Warning: Error closing driver: {e}")
+        self._driver = None
+        self.stats["recycles"] += 1
+
+    def before_navigation(self):
+        """Recycles the driver if it is over the RSS or navigation limit."""
+        if self._driver is not None:
+            rss = self._rss()
+            self.stats["peak_rss_mb"] = max(self.stats["peak_rss_mb"], round(rss / 1024 / 1024, 1))
+            if self.max_rss and rss > self.max_rss:
+                self.recycle(f"RSS {rss / 1024 / 1024:.0f} MB > {self.max_rss / 1024 / 1024:.0f} MB")
+            elif self.max_navigations and self._navigations >= self.max_navigations:
+                self.recycle(f"{self._navigations} navigations")
+        driver = self.driver
+        self._navigations += 1
+        self.stats["navigations"] += 1
+        return driver
+
+    def run(self, scrape_fn, retries=1):
+        """Calls scrape_fn(driver), retrying on a fresh driver if it returns None or raises."""
+        for attempt in range(retries + 1):
+            driver = self.before_navigation()
+            try:
+                result = scrape_fn(driver)
+            except Exception as e:
+                print(f"Scrape raised {type(e).__name__}: {e}")
+                result = None
+            if result is not None:
+                return result
+            if attempt < retries:
+                self.recycle("scrape failed")
+                self.stats["retries"] += 1
+                print("Retrying on a fresh browser...")
+        return None
+
+    def close(self):
+        """Quits the current driver if the watchdog launched it."""
+        if self._driver is not None and self._owned:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                print(f"Warning: Error closing driver: {e}")
+        self._driver = None
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import time
+
+from result_store import cell_key
+
+# Checkpoint of an in-progress sweep over the configured cells. Every cell is
+# written to the result store as soon as it is scraped; a checkpoint file per
+# sweep (named by the hash of its cell keys) records which cells are done. If
+# the run is killed (container stop, Chrome crash) and the same cells are
+# searched again within RESUME_WINDOW seconds of the last progress, the new
+# run skips the done cells and takes their flights from the store. A run that
+# finishes deletes its checkpoint, so the next one is a fresh sweep.
+
+DEFAULT_CHECKPOINT_DIR = 'data/checkpoints'
+DEFAULT_RESUME_WINDOW = 6 * 3600
+
+
+def sweep_id(keys):
+    """Returns a short hash identifying a sweep by its set of cell keys."""
+    data = json.dumps(sorted(keys)).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8, person=b'sweep').hexdigest()
+
+
+class RunCheckpoint:
+    """Durable per-cell progress of one sweep.
+
+    Args:
+        cells: The sweep's search cells
+        checkpoint_dir: Directory of the checkpoint files
+        resume_window: Seconds after the last recorded progress during which
+            an unfinished sweep of the same cells is resumed
+    """
+
+    def __init__(self, cells, checkpoint_dir=DEFAULT_CHECKPOINT_DIR, resume_window=DEFAULT_RESUME_WINDOW, now=None):
+        now = time.time() if now is None else now
+        self.keys = {cell_key(cell) for cell in cells}
+        self.sweep = sweep_id(self.keys)
+        self.path = os.path.join(checkpoint_dir, self.sweep + '.json')
+        state = self._load_state()
+        self.resumed = (state.get('sweep') == self.sweep
+                        and now - state.get('updated_at', 0) <= resume_window)
+        self.started_at = state['started_at'] if self.resumed else now
+        self.completed = state.get('completed', {}) if self.resumed else {}
+
+    def _load_state(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: could not read checkpoint {self.path}: {e}")
+            return {}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        state = {'sweep': self.sweep, 'started_at': self.started_at, 'updated_at': time.time(),
+                 'completed': self.completed}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remaining(self, cells):
+        """Returns the cells not done yet, in their original order."""
+        return [cell for cell in cells if cell_key(cell) not in self.completed]
+
+    def complete(self, cell, scraped_at=None):
+        """Marks a cell of the sweep as done and writes the checkpoint."""
+        key = cell_key(cell)
+        if key not in self.keys:
+            return
+        self.completed[key] = time.time() if scraped_at is None else scraped_at
+        self.save_state()
+
+    def resumed_flights(self, store):
+        """Returns the flights of the done cells as stored during this sweep."""
+        flights = []
+        for key in self.completed:
+            scraped_at, cell_flights = store.latest_flights(key)
+            if cell_flights and scraped_at >= self.started_at:
+                flights.extend(cell_flights)
+        return flights
+
+    def finish(self):
+        """Deletes the checkpoint once the sweep has run to the end."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def prune_checkpoints(checkpoint_dir=DEFAULT_CHECKPOINT_DIR, resume_window=DEFAULT_RESUME_WINDOW, now=None):
+    """Deletes checkpoints that can no longer be resumed.
+
+    Returns:
+        Number of files deleted
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    try:
+        names = os.listdir(checkpoint_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(checkpoint_dir, name)
+        try:
+            if name.endswith('.json') and now - os.path.getmtime(path) > resume_window:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def open_checkpoint(cells, config=None, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+    """Returns the RunCheckpoint for a sweep, or None if RESUME_WINDOW is "0"."""
+    config = config or {}
+    window = config.get("RESUME_WINDOW")
+    resume_window = float(window) if window not in (None, "") else DEFAULT_RESUME_WINDOW
+    if resume_window <= 0:
+        return None
+    prune_checkpoints(checkpoint_dir, resume_window)
+    checkpoint = RunCheckpoint(cells, checkpoint_dir, resume_window)
+    if checkpoint.resumed:
+        print(f"Resuming sweep started {time.strftime('%Y-%m-%d %H:%M', time.localtime(checkpoint.started_at))}: "
+              f"{len(checkpoint.completed)}/{len(cells)} cells already done")
+    return checkpoint
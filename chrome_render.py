@@ -0,0 +1,431 @@
+import atexit
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from image_encoder import encode_report, encoder_settings, save_report_images
+from instrumentation import stage
+
+# Report rendering in headless Chrome. render_html_to_png (scraper.py)
+# renders one file per browser; render_html_batch renders many reports in
+# parallel tabs of a single browser (a library entry point for callers with
+# several reports at once; a run produces one report). Each tab is a CDP
+# target with its own DevTools websocket (CdpSession), driven by its own
+# thread, so tabs load, lay out and capture concurrently instead of taking
+# turns on the WebDriver's current window. Each capture is handed to a pool
+# of encoder threads as soon as it arrives; Pillow releases the GIL while it
+# encodes, so encodes of different reports run on different cores.
+#
+# WarmRenderer keeps one tab on the template.html shell: the stylesheet and
+# fonts are resolved once, and each report only swaps its header, flight
+# cards, summary and link into the shell before the capture. Reports are
+# captured losslessly (PNG) and encoded once by image_encoder, which splits
+# tall reports into pages instead of shrinking them.
+
+VIEWPORT_WIDTH = 780
+VIEWPORT_HEIGHT = 1688
+DEVICE_SCALE_FACTOR = 2
+MOBILE_USER_AGENT = "Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1"
+
+WAIT_FOR_FONTS_SCRIPT = """
+const done = arguments[arguments.length - 1];
+document.fonts.ready.then(() => done([document.body.scrollWidth, document.body.scrollHeight]));
+"""
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.html')
+
+# template.html placeholders swapped in per report (report_url is an href)
+TEMPLATE_FIELDS = ("origin_airport_name", "destination_airport_name", "today_date",
+                   "flight_cards", "summary_note")
+# Fields holding block markup go in place of a comment marker instead of a
+# <span>, so the cards stay direct children of .flights-container (its
+# :nth-child rules count them) exactly as in the filled template
+BLOCK_FIELDS = ("flight_cards",)
+BLOCK_MARKER = "slot:"
+URL_FIELD = "report_url"
+URL_MARKER = "about:blank#report_url"
+
+INJECT_REPORT_SCRIPT = """
+const fields = arguments[0];
+const done = arguments[arguments.length - 1];
+document.querySelectorAll('[data-slot]').forEach(el => { el.innerHTML = fields[el.dataset.slot]; });
+document.querySelectorAll('[data-slot-href]').forEach(el => { el.setAttribute('href', fields[el.dataset.slotHref]); });
+// Block slots: drop the previous report's nodes, insert the new ones before the marker
+window.__slotNodes = window.__slotNodes || {};
+const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_COMMENT);
+const markers = [];
+while (walker.nextNode()) {
+    if (walker.currentNode.data.startsWith('slot:')) markers.push(walker.currentNode);
+}
+markers.forEach(marker => {
+    const name = marker.data.slice('slot:'.length);
+    (window.__slotNodes[name] || []).forEach(node => node.remove());
+    const template = document.createElement('template');
+    template.innerHTML = fields[name];
+    window.__slotNodes[name] = Array.from(template.content.childNodes);
+    marker.before(template.content);
+});
+document.title = fields.title;
+document.fonts.ready.then(() => requestAnimationFrame(() =>
+    done([document.body.scrollWidth, document.body.scrollHeight])));
+"""
+
+
+def create_render_driver():
+    """Launches the headless Chrome used to render reports (mobile viewport, 2x scale)."""
+    chrome_options = Options()
+
+    # Essential options for Docker and headless environments
+    chrome_options.add_argument("--headless=new")  # Use new headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+
+    # Mobile viewport - 2x resolution for high quality
+    chrome_options.add_argument(f"--window-size={VIEWPORT_WIDTH},{VIEWPORT_HEIGHT}")
+    chrome_options.add_argument(f"--force-device-scale-factor={DEVICE_SCALE_FACTOR}")
+    chrome_options.add_argument(f"--user-agent={MOBILE_USER_AGENT}")
+
+    # Additional rendering options
+    chrome_options.add_argument("--hide-scrollbars")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("--disable-logging")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("--disable-dev-tools")
+
+    with stage("render_browser_launch"):
+        driver = webdriver.Chrome(options=chrome_options)
+    driver.set_script_timeout(30)
+    driver.set_page_load_timeout(30)
+    return driver
+
+
+def _wait_until_loaded(driver, timeout):
+    deadline = time.time() + timeout
+    while driver.execute_script("return document.readyState") != "complete":
+        if time.time() > deadline:
+            raise TimeoutError("page did not finish loading")
+        time.sleep(0.05)
+    return driver.execute_async_script(WAIT_FOR_FONTS_SCRIPT)
+
+
+def _capture_params(width, height):
+    return {
+        "format": "png",
+        "captureBeyondViewport": True,
+        "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": 1},
+    }
+
+
+def _decode_capture(result):
+    with Image.open(io.BytesIO(base64.b64decode(result["data"]))) as img:
+        return img.convert('RGB')
+
+
+def _screenshot_image(driver, width, height):
+    """Full-resolution capture as an RGB image, for image_encoder to encode."""
+    return _decode_capture(driver.execute_cdp_cmd("Page.captureScreenshot", _capture_params(width, height)))
+
+
+class CdpSession:
+    """DevTools protocol connection to one page target over its own websocket.
+
+    Args:
+        websocket_url: ws://<debugger address>/devtools/page/<target id>
+        timeout: Seconds to wait for each reply
+    """
+
+    def __init__(self, websocket_url, timeout=30):
+        import websocket  # websocket-client, installed with selenium
+        # No Origin header: Chrome rejects websocket origins it was not started to allow
+        self._ws = websocket.create_connection(websocket_url, timeout=timeout, suppress_origin=True)
+        self._next_id = 0
+
+    def send(self, method, params=None):
+        """Sends a command and returns its result; events arriving meanwhile are skipped."""
+        self._next_id += 1
+        self._ws.send(json.dumps({"id": self._next_id, "method": method, "params": params or {}}))
+        while True:
+            message = json.loads(self._ws.recv())
+            if message.get("id") == self._next_id:
+                if "error" in message:
+                    raise RuntimeError(f"{method}: {message['error'].get('message')}")
+                return message.get("result", {})
+
+    def close(self):
+        self._ws.close()
+
+
+def _evaluate(session, expression, await_promise=False):
+    result = session.send("Runtime.evaluate", {"expression": expression, "returnByValue": True,
+                                               "awaitPromise": await_promise})
+    if "exceptionDetails" in result:
+        raise RuntimeError(f"evaluate failed: {result['exceptionDetails'].get('text')}")
+    return result["result"].get("value")
+
+
+def _capture_tab(driver, driver_lock, session_factory, url, timeout):
+    """Opens a tab on its own CDP session, loads url and returns its full-page capture."""
+    with driver_lock:
+        # The WebDriver connection is shared between tab threads
+        target_id = driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank"})["targetId"]
+        address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    session = None
+    try:
+        session = session_factory(f"ws://{address}/devtools/page/{target_id}", timeout)
+        session.send("Emulation.setDeviceMetricsOverride", {
+            "width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT,
+            "deviceScaleFactor": DEVICE_SCALE_FACTOR, "mobile": True,
+        })
+        with stage("render_batch_load"):
+            session.send("Page.navigate", {"url": url})
+            deadline = time.time() + timeout
+            while _evaluate(session, "document.readyState") != "complete":
+                if time.time() > deadline:
+                    raise TimeoutError("page did not finish loading")
+                time.sleep(0.05)
+            width, height = _evaluate(session, "document.fonts.ready.then(() => "
+                                               "[document.body.scrollWidth, document.body.scrollHeight])", True)
+        with stage("render_batch_capture"):
+            return _decode_capture(session.send("Page.captureScreenshot", _capture_params(width, height)))
+    finally:
+        if session is not None:
+            try:
+                session.send("Target.closeTarget", {"targetId": target_id})
+            except Exception as e:
+                print(f"Warning: Error closing tab: {e}")
+            session.close()
+        else:
+            try:
+                with driver_lock:
+                    driver.execute_cdp_cmd("Target.closeTarget", {"targetId": target_id})
+            except Exception as e:
+                print(f"Warning: Error closing tab: {e}")
+
+
+def _encode_capture(image, settings):
+    with stage("render_batch_encode"):
+        return encode_report(image, **settings)
+
+
+def render_html_batch(documents, driver=None, concurrency=None, config=None, timeout=30,
+                      encode_workers=None, session_factory=CdpSession):
+    """Renders report HTML documents in parallel tabs of one Chrome.
+
+    Up to `concurrency` tabs load and capture at once, each on its own CDP
+    session; every capture is encoded like a single report (see
+    image_encoder.encode_report) on an encoder thread while the next tabs
+    render, so tall reports become several pages.
+
+    Args:
+        documents: List of complete HTML documents (e.g. filled template.html)
+        driver: Render driver to reuse (see create_render_driver); a new one
+            is launched and quit if None
+        concurrency: Tabs open at once (default: CPU count)
+        config: Configuration dict with the REPORT_IMAGE_* settings
+        timeout: Seconds to wait for each page to load
+        encode_workers: Encoder threads (default: CPU count)
+        session_factory: Opens the CDP session of a tab from its websocket URL
+
+    Returns:
+        List of encoded pages per document, in document order (None for a
+        document that failed)
+    """
+    if not documents:
+        return []
+    concurrency = max(1, concurrency or os.cpu_count() or 1)
+    encode_workers = max(1, encode_workers or os.cpu_count() or 1)
+    results = [None] * len(documents)
+    settings = encoder_settings(config)
+    owns_driver = driver is None
+    workdir = tempfile.mkdtemp(prefix="render_batch_")
+    try:
+        if owns_driver:
+            driver = create_render_driver()
+        # File URLs keep relative resources and large documents working
+        urls = []
+        for i, html in enumerate(documents):
+            path = os.path.join(workdir, f"report_{i}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            urls.append(f"file://{path}")
+
+        driver_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="render-tab") as tabs, \
+                ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix="render-encode") as encoders:
+            captures = {tabs.submit(_capture_tab, driver, driver_lock, session_factory, url, timeout): i
+                        for i, url in enumerate(urls)}
+            encodes = {}
+            for future in as_completed(captures):
+                i = captures[future]
+                try:
+                    encodes[encoders.submit(_encode_capture, future.result(), settings)] = i
+                except Exception as e:
+                    print(f"Error rendering report {i + 1}/{len(documents)}: {type(e).__name__}: {e}")
+            for future in as_completed(encodes):
+                i = encodes[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"Error encoding report {i + 1}/{len(documents)}: {type(e).__name__}: {e}")
+    except Exception as e:
+        print(f"Batch render failed: {type(e).__name__}: {e}")
+    finally:
+        if owns_driver and driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Warning: Error closing driver: {e}")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Rendered {sum(r is not None for r in results)}/{len(documents)} reports "
+          f"in one browser ({concurrency} tabs, {encode_workers} encoders)")
+    return results
+
+
+def build_template_shell(template_html):
+    """Fills template.html with empty slots that WarmRenderer injects reports into.
+
+    Returns:
+        The shell HTML: each text field is an element with
+        data-slot="<field>", each of BLOCK_FIELDS a <!--slot:<field>-->
+        comment, and the report link carries data-slot-href="report_url"
+    """
+    # Markup in <title> is plain text there; the injection script sets the title
+    slots = {name: f'<!--{BLOCK_MARKER}{name}-->' if name in BLOCK_FIELDS else f'<span data-slot="{name}"></span>'
+             for name in TEMPLATE_FIELDS}
+    shell = template_html.format(report_url=URL_MARKER, **slots)
+    return shell.replace(f'href="{URL_MARKER}"', f'href="" data-slot-href="{URL_FIELD}"')
+
+
+class WarmRenderer:
+    """Renders reports in a tab that keeps template.html loaded.
+
+    Args:
+        template_path: Template with the report placeholders
+        driver_factory: Launches the render browser (see create_render_driver)
+        timeout: Seconds to wait for the shell to load
+    """
+
+    def __init__(self, template_path=TEMPLATE_PATH, driver_factory=create_render_driver, timeout=30):
+        self.template_path = template_path
+        self.driver_factory = driver_factory
+        self.timeout = timeout
+        self.driver = None
+        self._shell_loaded = False
+        self._lock = threading.Lock()
+        self.stats = {"shell_loads": 0, "renders": 0, "failures": 0}
+
+    def _load_shell(self):
+        with open(self.template_path, 'r', encoding='utf-8') as f:
+            shell = build_template_shell(f.read())
+        if self.driver is None:
+            self.driver = self.driver_factory()
+        fd, path = tempfile.mkstemp(prefix="report_shell_", suffix=".html")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(shell)
+            with stage("render_shell_load"):
+                self.driver.get(f"file://{path}")
+                _wait_until_loaded(self.driver, self.timeout)
+        finally:
+            os.remove(path)
+        self._shell_loaded = True
+        self.stats["shell_loads"] += 1
+
+    def _render_once(self, fields):
+        if not self._shell_loaded:
+            self._load_shell()
+        with stage("render_inject"):
+            width, height = self.driver.execute_async_script(INJECT_REPORT_SCRIPT, fields)
+        with stage("render_capture"):
+            return _screenshot_image(self.driver, width, height)
+
+    def render(self, fields, config=None):
+        """Renders one report and encodes it with image_encoder.
+
+        Args:
+            fields: Template values (TEMPLATE_FIELDS and report_url, already HTML)
+            config: Configuration dict with the REPORT_IMAGE_* settings
+
+        Returns:
+            Encoded pages (see image_encoder.encode_report), or None if
+            rendering failed twice
+        """
+        image = self.render_image(fields)
+        if image is None:
+            return None
+        return encode_report(image, **encoder_settings(config))
+
+    def render_image(self, fields):
+        """Renders one report to a full-resolution PIL image (PNG capture).
+
+        Returns:
+            RGB image, or None if rendering failed twice
+        """
+        fields = dict(fields)
+        fields.setdefault("title", f"Flight Report - {fields.get('origin_airport_name', '')} "
+                                   f"to {fields.get('destination_airport_name', '')}")
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    result = self._render_once(fields)
+                    self.stats["renders"] += 1
+                    return result
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    print(f"Warm render failed (attempt {attempt + 1}): {type(e).__name__}: {e}")
+                    # Start over with a fresh browser and shell
+                    self._quit()
+            return None
+
+    def _quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Warning: Error closing driver: {e}")
+        self.driver = None
+        self._shell_loaded = False
+
+    def close(self):
+        with self._lock:
+            self._quit()
+
+
+_warm_renderer = None
+_warm_lock = threading.Lock()
+
+
+def render_report_warm(fields, base_path, config=None):
+    """Renders a report with the process-wide WarmRenderer and saves its pages.
+
+    Args:
+        fields: Template values (see WarmRenderer.render)
+        base_path: Output path without extension (see save_report_images)
+        config: Configuration dict with the REPORT_IMAGE_* settings
+
+    Returns:
+        List of image paths if successful, None otherwise
+    """
+    global _warm_renderer
+    with _warm_lock:
+        if _warm_renderer is None:
+            _warm_renderer = WarmRenderer()
+            atexit.register(_warm_renderer.close)
+        renderer = _warm_renderer
+    image = renderer.render_image(fields)
+    if image is None:
+        return None
+    return save_report_images(image, base_path, config)
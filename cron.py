@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+# (name, min, max) for the five standard cron fields
+CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+]
+
+
+def _parse_field(field, low, high):
+    """Parses one cron field ("*", "*/15", "1-5", "0,30", "8-18/2") into a set."""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {field}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range ({low}-{high}): {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A standard five-field cron expression (minute hour day month weekday).
+
+    Weekday 0 is Sunday (7 is accepted as Sunday too). As in cron, when both
+    day-of-month and weekday are restricted, a time matches if either does.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = self.expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        parsed = [_parse_field(f, low, high) for f, (_, low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if d == 7 else d for d in weekdays}
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+
+    def matches(self, dt):
+        """Returns True if the datetime (to the minute) matches the expression."""
+        if dt.minute not in self.minutes or dt.hour not in self.hours or dt.month not in self.months:
+            return False
+        return self._day_matches(dt)
+
+    def next_after(self, dt):
+        """Returns the first matching minute strictly after `dt`."""
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Four years covers every valid combination, including Feb 29
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def __repr__(self):
+        return f"CronExpression({self.expression!r})"
+
+
+def parse_schedule(schedule):
+    """Parses a ';'-separated list of cron expressions."""
+    return [CronExpression(expr) for expr in schedule.split(';') if expr.strip()]
+
+
+def next_run_time(expressions, now=None):
+    """Returns the earliest next run time across several cron expressions."""
+    now = datetime.now() if now is None else now
+    return min(expr.next_after(now) for expr in expressions)
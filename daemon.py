@@ -0,0 +1,144 @@
+import json
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from browser_pool import BrowserPool
+from cron import parse_schedule, next_run_time
+from instrumentation import metrics
+from scraper import create_scrape_driver, load_airport_data, run_search
+
+DEFAULT_SCHEDULE = "0 9 * * *"
+DEFAULT_PORT = 8080
+
+
+class DaemonStatus:
+    """Thread-safe run status shared between the scheduler loop and the HTTP server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {
+            "started_at": datetime.now().isoformat(timespec='seconds'),
+            "state": "starting",
+            "runs_completed": 0,
+            "runs_failed": 0,
+            "last_run_started": None,
+            "last_run_finished": None,
+            "last_run_seconds": None,
+            "last_run_flights": None,
+            "last_error": None,
+            "next_run": None,
+        }
+
+    def update(self, **kwargs):
+        with self._lock:
+            self._data.update(kwargs)
+
+    def increment(self, key):
+        with self._lock:
+            self._data[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._data)
+
+
+def start_status_server(status, pool, port):
+    """Serves /health and /status as JSON, and /metrics as Prometheus text, from a background thread."""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                payload = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            if self.path == '/health':
+                body = {"status": "ok", "state": status.snapshot()["state"]}
+            elif self.path == '/status':
+                body = status.snapshot()
+                body["browser_pool"] = pool.stats()
+            else:
+                self.send_error(404)
+                return
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), StatusHandler)
+    thread = threading.Thread(target=server.serve_forever, name="status-server", daemon=True)
+    thread.start()
+    print(f"Status server listening on port {port} (/health, /status, /metrics)")
+    return server
+
+
+def run_daemon(config):
+    """Runs searches on the DAEMON_SCHEDULE cron expressions until SIGTERM/SIGINT.
+
+    The airport index and a warm scraping browser are kept between runs, so a
+    scheduled run only pays for navigation, parsing and reporting.
+    """
+    expressions = parse_schedule(config.get("DAEMON_SCHEDULE") or DEFAULT_SCHEDULE)
+    port = int(config.get("DAEMON_PORT") or DEFAULT_PORT)
+    print(f"Starting daemon with schedule: {'; '.join(e.expression for e in expressions)}")
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping after the current run...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    status = DaemonStatus()
+    pool = BrowserPool(lambda: create_scrape_driver(config), size=1)
+    server = start_status_server(status, pool, port)
+    airport_data = load_airport_data()
+
+    try:
+        # Launch the browser up front so the first scheduled run is warm too
+        try:
+            with pool.acquire():
+                pass
+        except Exception as e:
+            print(f"Warning: could not pre-launch browser: {e}")
+
+        while not stop_event.is_set():
+            next_run = next_run_time(expressions)
+            status.update(state="idle", next_run=next_run.isoformat(timespec='seconds'))
+            print(f"Next run at {next_run}")
+            if stop_event.wait(max((next_run - datetime.now()).total_seconds(), 0)):
+                break
+
+            started = time.time()
+            status.update(state="running", last_run_started=datetime.now().isoformat(timespec='seconds'))
+            try:
+                with pool.acquire() as driver:
+                    flights = run_search(config, driver=driver, airport_data=airport_data)
+                status.increment("runs_completed")
+                status.update(last_run_flights=len(flights or []), last_error=None)
+            except Exception as e:
+                traceback.print_exc()
+                status.increment("runs_failed")
+                status.update(last_error=f"{type(e).__name__}: {e}")
+            finally:
+                status.update(last_run_finished=datetime.now().isoformat(timespec='seconds'),
+                              last_run_seconds=round(time.time() - started, 1))
+    finally:
+        status.update(state="stopping")
+        server.shutdown()
+        pool.close()
+        print("Daemon stopped")
@@ -4,5 +4,5 @@ set -e
 # Activate virtual environment
 . /app/.venv/bin/activate
 
-# Run the scraper
-exec python scraper.py
\ No newline at end of file
+# Run the scraper (pass "daemon" to stay resident, see docker-compose.yml)
+exec python scraper.py "$@"
\ No newline at end of file
@@ -0,0 +1,178 @@
+import io
+import os
+import time
+
+from PIL import Image, ImageChops, features
+
+# Output encoding for report images. Instead of a fixed JPEG quality and
+# shrinking tall reports until they fit Telegram's 9000px limit (which makes
+# the text unreadable), a report is split into full-resolution pages at
+# blank rows between cards, and each page is encoded as progressive JPEG or
+# WebP at the highest quality that fits the byte budget (binary search down
+# to a readability floor).
+
+# Telegram accepts up to 10000px, use 9000px as safety margin
+MAX_HEIGHT = 9000
+MAX_WIDTH = 3000
+
+FORMATS = {"jpeg": ".jpg", "webp": ".webp"}
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_MAX_KB = 1024  # Per page
+DEFAULT_MIN_QUALITY = 60  # Text stays crisp above this
+DEFAULT_MAX_QUALITY = 90
+
+# libwebp effort: 2 is within 2% of the default (4) in size at half the time
+WEBP_METHOD = 2
+
+# Page breaks are searched this far above the height limit, for a run of
+# this many rows identical to the row above (the gaps between cards)
+BREAK_SEARCH_ROWS = 1500
+BREAK_QUIET_ROWS = 8
+BREAK_THRESHOLD = 8
+
+
+def fit_width(image):
+    """Downscales an image wider than Telegram allows; height is handled by splitting."""
+    if image.width <= MAX_WIDTH:
+        return image
+    scale = MAX_WIDTH / image.width
+    return image.resize((MAX_WIDTH, int(image.height * scale)), Image.Resampling.LANCZOS)
+
+
+def _find_break(image, top, limit):
+    """Returns the y of the quiet row run closest above `limit`, or `limit` if there is none."""
+    start = max(top + 1, limit - BREAK_SEARCH_ROWS)
+    window = image.crop((0, start - 1, image.width, limit)).convert('L')
+    # Rows that differ from the row above by more than the threshold anywhere
+    diff = ImageChops.difference(window.crop((0, 1, window.width, window.height)),
+                                 window.crop((0, 0, window.width, window.height - 1)))
+    changed = diff.point(lambda v: 255 if v > BREAK_THRESHOLD else 0)
+    rows = changed.resize((1, changed.height), Image.Resampling.BOX).tobytes()
+    run = 0
+    for offset in range(len(rows) - 1, -1, -1):
+        run = run + 1 if rows[offset] == 0 else 0
+        if run == BREAK_QUIET_ROWS:
+            return start + offset + BREAK_QUIET_ROWS // 2
+    return limit
+
+
+def split_pages(image, max_height=MAX_HEIGHT):
+    """Splits a tall image into full-resolution pages of at most max_height px.
+
+    Cuts are placed in blank gaps (e.g. between cards) where possible.
+    """
+    pages = []
+    top = 0
+    while image.height - top > max_height:
+        cut = _find_break(image, top, top + max_height)
+        pages.append(image.crop((0, top, image.width, cut)))
+        top = cut
+    pages.append(image.crop((0, top, image.width, image.height)) if top else image)
+    return pages
+
+
+def encode(image, fmt, quality):
+    """Encodes an image as progressive JPEG or WebP and returns the bytes."""
+    out = io.BytesIO()
+    if fmt == "webp":
+        image.save(out, 'WEBP', quality=quality, method=WEBP_METHOD)
+    else:
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def encode_to_budget(image, fmt, max_bytes, min_quality=DEFAULT_MIN_QUALITY, max_quality=DEFAULT_MAX_QUALITY):
+    """Binary-searches the highest quality whose output fits max_bytes.
+
+    max_quality is tried first, so a page that fits takes a single encode.
+
+    Returns:
+        (data, quality); at min_quality if even that exceeds the budget
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    data = encode(image, fmt, max_quality)
+    if len(data) <= max_bytes:
+        return data, max_quality
+    best = None
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(image, fmt, quality)
+        if len(data) <= max_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best or (encode(image, fmt, min_quality), min_quality)
+
+
+def encode_report(image, fmt=DEFAULT_FORMAT, max_bytes=DEFAULT_MAX_KB * 1024,
+                  min_quality=DEFAULT_MIN_QUALITY, max_quality=DEFAULT_MAX_QUALITY, max_height=MAX_HEIGHT):
+    """Encodes a report image as one or more pages within the byte budget.
+
+    Args:
+        image: Rendered report (PIL image)
+        fmt: "jpeg" (progressive), "webp", or "auto" to keep whichever
+            reaches the higher quality (the smaller file on a tie)
+        max_bytes: Budget per page
+        min_quality, max_quality: Quality search range
+        max_height: Page height limit
+
+    Returns:
+        List of dicts with data, format, quality, width and height, one per page
+    """
+    pages = []
+    for page in split_pages(fit_width(image), max_height):
+        candidates = []
+        for name in (("jpeg", "webp") if fmt == "auto" else (fmt,)):
+            data, quality = encode_to_budget(page, name, max_bytes, min_quality, max_quality)
+            candidates.append((-quality, len(data), name, data))
+        neg_quality, _, name, data = min(candidates)
+        pages.append({"data": data, "format": name, "quality": -neg_quality,
+                      "width": page.width, "height": page.height})
+    return pages
+
+
+def encoder_settings(config=None):
+    """Reads REPORT_IMAGE_FORMAT, REPORT_MAX_KB and REPORT_MIN_QUALITY from the config."""
+    config = config or {}
+    fmt = (config.get("REPORT_IMAGE_FORMAT") or DEFAULT_FORMAT).lower()
+    if fmt not in FORMATS and fmt != "auto":
+        print(f"Unknown REPORT_IMAGE_FORMAT {fmt!r}, using {DEFAULT_FORMAT}")
+        fmt = DEFAULT_FORMAT
+    if fmt != "jpeg" and not features.check('webp'):
+        print("Pillow was built without WebP support, using jpeg")
+        fmt = "jpeg"
+    return {
+        "fmt": fmt,
+        "max_bytes": int(float(config.get("REPORT_MAX_KB") or DEFAULT_MAX_KB) * 1024),
+        "min_quality": int(config.get("REPORT_MIN_QUALITY") or DEFAULT_MIN_QUALITY),
+    }
+
+
+def save_report_images(image, base_path, config=None):
+    """Encodes a report and writes its pages next to base_path.
+
+    A single page is written to base_path + extension, several to
+    base_path + "_p1", "_p2", ... + extension.
+
+    Returns:
+        List of written file paths, in page order
+    """
+    started = time.perf_counter()
+    pages = encode_report(image, **encoder_settings(config))
+    paths = []
+    for i, page in enumerate(pages, 1):
+        suffix = f"_p{i}" if len(pages) > 1 else ""
+        path = f"{base_path}{suffix}{FORMATS[page['format']]}"
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(page["data"])
+        paths.append(path)
+    total_kb = sum(len(p["data"]) for p in pages) / 1024
+    formats = ", ".join(f"{p['format']} q{p['quality']}" for p in pages)
+    print(f"Encoded {image.width}x{image.height} report as {len(pages)} page(s) "
+          f"({formats}; {total_kb:.1f} KB) in {time.perf_counter() - started:.2f}s")
+    return paths
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Per-stage timing for the whole pipeline. Every `stage()` block is recorded
+# in a process-wide histogram (labelled by stage and route) and, while a run
+# is active (start_run ... finish_run), appended as one JSON line to the
+# run's trace file. finish_run writes the histograms as a Prometheus text
+# file (node_exporter textfile format) and prints where the time went.
+
+DEFAULT_TRACE_DIR = "data/traces"
+DEFAULT_METRICS_FILE = "data/metrics.prom"
+METRIC_PREFIX = "ai_airticket"
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def cell_tags(cell):
+    """Returns the route/date tags for a search cell."""
+    date = cell["dep_date"] if not cell.get("ret_date") else f"{cell['dep_date']}-{cell['ret_date']}"
+    return {"route": f"{cell['origin']}-{cell['dest']}", "date": date}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class StageMetrics:
+    """Thread-safe histograms of stage durations, keyed by (stage, route)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+        self.runs = {"completed": 0, "last_seconds": None, "last_finished": None}
+
+    def observe(self, stage, route, seconds, ok=True):
+        with self._lock:
+            series = self._series.get((stage, route))
+            if series is None:
+                series = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "errors": 0}
+                self._series[(stage, route)] = series
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+            if not ok:
+                series["errors"] += 1
+
+    def record_run(self, seconds):
+        with self._lock:
+            self.runs["completed"] += 1
+            self.runs["last_seconds"] = seconds
+            self.runs["last_finished"] = time.time()
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Time spent in each pipeline stage.", f"# TYPE {name} histogram"]
+        errors = [f"# HELP {METRIC_PREFIX}_stage_errors_total Stage executions that raised.",
+                  f"# TYPE {METRIC_PREFIX}_stage_errors_total counter"]
+        with self._lock:
+            for (stage, route), series in sorted(self._series.items()):
+                labels = f'stage="{_escape(stage)}",route="{_escape(route)}"'
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f'{name}_sum{{{labels}}} {series["sum"]:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {series["count"]}')
+                errors.append(f'{METRIC_PREFIX}_stage_errors_total{{{labels}}} {series["errors"]}')
+            runs = dict(self.runs)
+        lines += errors
+        lines += [f"# HELP {METRIC_PREFIX}_runs_total Completed pipeline runs.",
+                  f"# TYPE {METRIC_PREFIX}_runs_total counter",
+                  f"{METRIC_PREFIX}_runs_total {runs['completed']}"]
+        if runs["last_seconds"] is not None:
+            lines += [f"# TYPE {METRIC_PREFIX}_last_run_seconds gauge",
+                      f"{METRIC_PREFIX}_last_run_seconds {runs['last_seconds']:.3f}",
+                      f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+                      f"{METRIC_PREFIX}_last_run_timestamp_seconds {runs['last_finished']:.0f}"]
+        return "\n".join(lines) + "\n"
+
+
+class RunTrace:
+    """JSON-lines trace file for one pipeline run, written through structlog."""
+
+    def __init__(self, trace_dir=DEFAULT_TRACE_DIR, **tags):
+        # Imported here: modules that only time stages do not need structlog
+        import structlog
+
+        os.makedirs(trace_dir, exist_ok=True)
+        self.started = time.perf_counter()
+        self.totals = {}
+        self._lock = threading.Lock()
+        self.path = os.path.join(trace_dir, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl")
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._log = structlog.wrap_logger(
+            structlog.WriteLogger(self._file),
+            processors=[
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.JSONRenderer(ensure_ascii=False),
+            ],
+        ).bind(**tags)
+
+    def event(self, event, **fields):
+        with self._lock:
+            # A stage from another thread can outlive the run
+            if not self._file.closed:
+                self._log.info(event, **fields)
+
+    def record(self, name, seconds, ok, **tags):
+        with self._lock:
+            total, count = self.totals.get(name, (0.0, 0))
+            self.totals[name] = (total + seconds, count + 1)
+        self.event("stage", stage=name, seconds=round(seconds, 4), ok=ok, **tags)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+metrics = StageMetrics()
+_run_lock = threading.Lock()
+_run = None
+
+
+def start_run(config=None, **tags):
+    """Opens a trace file for a new run; stages recorded until finish_run go into it."""
+    global _run
+    trace_dir = (config or {}).get("TRACE_DIR") or DEFAULT_TRACE_DIR
+    with _run_lock:
+        if _run is not None:
+            _run.close()
+        _run = RunTrace(trace_dir, **tags)
+        _run.event("run_started")
+        return _run.path
+
+
+def finish_run(config=None):
+    """Closes the run's trace, writes the metrics file and prints a stage summary."""
+    global _run
+    with _run_lock:
+        run, _run = _run, None
+    if run is None:
+        return
+    seconds = time.perf_counter() - run.started
+    metrics.record_run(seconds)
+    totals = dict(run.totals)
+    run.event("run_finished", seconds=round(seconds, 3),
+              stage_totals={stage: round(total, 3) for stage, (total, _) in totals.items()})
+    run.close()
+
+    metrics_file = (config or {}).get("METRICS_FILE") or DEFAULT_METRICS_FILE
+    if os.path.dirname(metrics_file):
+        os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+    temp_file = metrics_file + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(metrics.render())
+    os.replace(temp_file, metrics_file)
+
+    print(f"Run took {seconds:.1f}s; trace: {run.path}, metrics: {metrics_file}")
+    for stage, (total, count) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        print(f"  {stage:<16} {total:>9.2f}s total  {count:>5}x  {total / count:>8.3f}s avg")
+
+
+@contextmanager
+def stage(name, timings=None, **tags):
+    """Times the block as pipeline stage `name`.
+
+    Args:
+        name: Stage name, e.g. "navigate" or "llm_call"
+        timings: Optional dict that receives the seconds under `name`
+        **tags: Extra trace fields; `route` also labels the metrics
+    """
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+        metrics.observe(name, tags.get("route", ""), seconds, ok)
+        run = _run
+        if run is not None:
+            run.record(name, seconds, ok, **tags)
@@ -0,0 +1,172 @@
+import json
+
+# Prompt and structured-output request for the report's Gemini analysis.
+#
+# Offers go into the prompt as a "|"-separated table of the fields the
+# comments are about (one row per flight, or per direction of a round trip)
+# instead of indented JSON with URLs and nested keys. The reply format is
+# given as a responseSchema with responseMimeType "application/json", so the
+# model returns the JSON object itself rather than prose around a fenced
+# block, and the prompt no longer spells the format out.
+
+ONE_WAY_COLUMNS = ("#", "price", "airline", "flights", "dep", "arr", "time", "stops", "via", "plane", "bags", "seller")
+ROUND_TRIP_COLUMNS = ("#", "dir", "price", "stay", "airline", "flights", "dep", "arr", "time", "stops", "via", "bags", "seller")
+
+PROMPT_TEMPLATE = """You are a flight analysis assistant. Analyze the {count} cheapest {kind} flights below and write a summary note and one comment per {unit} in Chinese.
+
+Flights ("|"-separated, "-" = unknown{table_note}):
+{table}
+
+Each comment should cover:
+- Transfers: self-transfer (自己) or protected, layover times
+- What to watch out for: visa requirements, terminal changes, overnight layovers
+- Pros: price, timing, airline quality
+- Cons: long layover, early departure, etc.
+
+Use markdown formatting: **bold**, *italic*, - bullets. Keep summary_note under 100 Chinese characters and each comment under 150 Chinese characters."""
+
+
+def _value(value):
+    """Returns a table cell: "-" for missing values, no separators or line breaks."""
+    if value is None or value == '' or value == 'N/A' or value == []:
+        return "-"
+    if isinstance(value, (list, tuple)):
+        value = ";".join(str(item) for item in value)
+    return " ".join(str(value).replace("|", "/").split())
+
+
+def _point(point):
+    """Formats a departure/arrival dict as "date time airport"."""
+    point = point or {}
+    parts = [point.get(key) for key in ('date', 'time', 'airport')]
+    return " ".join(part for part in parts if part and part != 'N/A')
+
+
+def _via(leg):
+    """Transfer airports of a leg, with the connection time when the detail view had it."""
+    segments = leg.get('segments') or []
+    if segments:
+        via = [f"{segment['arrival']['airport']} {segment['connection']}" if segment.get('connection')
+               else segment['arrival']['airport'] for segment in segments[:-1]]
+    else:
+        via = (leg.get('transfers') or {}).get('airports') or []
+    return "/".join(via) or None
+
+
+def _leg_cells(leg):
+    """Cells shared by one-way flights and round-trip directions: airline to via."""
+    return [leg.get('airline'), leg.get('flight_code'), _point(leg.get('departure')), _point(leg.get('arrival')),
+            leg.get('duration'), (leg.get('transfers') or {}).get('count_str'), _via(leg)]
+
+
+def encode_flights(flights, is_round_trip=False):
+    """Encodes offers as a compact header + rows table for the prompt.
+
+    Only what the comments are about is kept: no source URLs, trip type
+    labels or nested keys. Round trips take two rows, "out" and "ret"; the
+    return row leaves the shared price, stay, bags and seller empty.
+
+    Returns:
+        Table as a string
+    """
+    rows = []
+    if is_round_trip:
+        rows.append(ROUND_TRIP_COLUMNS)
+        for i, flight in enumerate(flights, 1):
+            rows.append([i, "out", flight.get('price'), flight.get('stay_duration')]
+                        + _leg_cells(flight.get('outbound') or {})
+                        + [flight.get('baggage'), flight.get('provider_name')])
+            rows.append([i, "ret", "", ""] + _leg_cells(flight.get('return') or {}) + ["", ""])
+    else:
+        rows.append(ONE_WAY_COLUMNS)
+        for i, flight in enumerate(flights, 1):
+            plane = flight.get('plane_model')
+            if isinstance(plane, str) and plane.startswith('機材'):
+                plane = plane[len('機材'):]
+            rows.append([i, flight.get('price')] + _leg_cells(flight)
+                        + [plane, flight.get('baggage'), flight.get('provider_name')])
+    return "\n".join("|".join(cell if cell == "" else _value(cell) for cell in row) for row in rows)
+
+
+def comment_keys(is_round_trip):
+    """Returns the reply's comment list keys."""
+    return ("outbound_comments", "return_comments") if is_round_trip else ("flight_comments",)
+
+
+def build_prompt(flights, is_round_trip=False):
+    """Returns the analysis prompt for the report's top offers."""
+    return PROMPT_TEMPLATE.format(
+        count=len(flights),
+        kind="round-trip" if is_round_trip else "one-way",
+        unit="direction of each flight" if is_round_trip else "flight",
+        table_note="; a return row shares price, stay, bags and seller with its outbound row" if is_round_trip else "",
+        table=encode_flights(flights, is_round_trip),
+    )
+
+
+def response_schema(is_round_trip, count):
+    """Returns the Gemini responseSchema of the reply, with one comment per flight."""
+    properties = {
+        "summary_note": {
+            "type": "STRING",
+            "description": "Brief note about the flights: self-transfer requirements, best value, price differences"
+                           + (", stay duration" if is_round_trip else ""),
+        },
+    }
+    for key in comment_keys(is_round_trip):
+        direction = {"outbound_comments": "outbound ", "return_comments": "return "}.get(key, "")
+        properties[key] = {
+            "type": "ARRAY",
+            "description": f"Markdown comment on the {direction}flight of each row number, in order",
+            "items": {"type": "STRING"},
+            "minItems": count,
+            "maxItems": count,
+        }
+    return {
+        "type": "OBJECT",
+        "properties": properties,
+        "required": list(properties),
+        "propertyOrdering": list(properties),
+    }
+
+
+def build_request(flights, is_round_trip=False):
+    """Returns the generateContent request body: prompt plus JSON response schema."""
+    return {
+        "contents": [{
+            "parts": [{"text": build_prompt(flights, is_round_trip)}]
+        }],
+        "generationConfig": {
+            "responseMimeType": "application/json",
+            "responseSchema": response_schema(is_round_trip, len(flights)),
+        },
+    }
+
+
+def parse_analysis(text, is_round_trip=False):
+    """Reads the reply text into a dict with summary_note and the comment lists.
+
+    Replies are plain JSON with the response schema; a fenced ```json block
+    is still accepted for endpoints that ignore generationConfig. Keys with
+    the wrong type are left out, so the caller's defaults stay in place.
+
+    Raises:
+        ValueError: If the text holds no JSON object
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    elif "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+
+    analysis = {}
+    if isinstance(data.get("summary_note"), str) and data["summary_note"].strip():
+        analysis["summary_note"] = data["summary_note"]
+    for key in comment_keys(is_round_trip):
+        comments = data.get(key)
+        if isinstance(comments, list) and all(isinstance(comment, str) for comment in comments):
+            analysis[key] = comments
+    return analysis
@@ -0,0 +1,314 @@
+import base64
+import json
+import re
+import zoneinfo
+from datetime import datetime
+
+# The search result list is filled by background XHR/fetch calls. In network
+# capture mode the scraping driver records CDP performance logs, the JSON
+# responses are pulled with Network.getResponseBody, and offers are decoded
+# from any payload that contains a recognisable list of fares. The decoder
+# works on field-name heuristics (the key tuples below) so it can follow
+# small schema changes; anything it cannot map returns None and the caller
+# falls back to DOM parsing.
+#
+# Times in the payloads are local to each airport. A direction's total time
+# is taken from a duration field when the payload has one; otherwise both
+# ends are converted to UTC (with the timestamp's own offset, or the
+# airport's time zone from airport_index) before subtracting, so it matches
+# the elapsed time the result page shows.
+
+# Only responses from these hosts are considered
+CAPTURE_HOSTS = ("tour.ne.jp",)
+
+# Candidate keys, in order of preference
+PRICE_KEYS = ("total_price", "totalPrice", "total_amount", "totalAmount", "price", "amount", "fare")
+PROVIDER_KEYS = ("agent_name", "agentName", "provider_name", "providerName", "site_name", "siteName", "agent")
+SLICE_KEYS = ("slices", "bounds", "itineraries", "journeys")
+SEGMENT_KEYS = ("segments", "legs", "flights")
+FLIGHT_CODE_KEYS = ("flight_code", "flightCode", "flight_no", "flightNo", "flight_number", "flightNumber")
+CARRIER_KEYS = ("carrier_code", "carrierCode", "marketing_carrier", "marketingCarrier", "carrier", "airline_code")
+AIRLINE_NAME_KEYS = ("airline_name", "airlineName", "carrier_name", "carrierName", "airline")
+DEP_AIRPORT_KEYS = ("dpt_airport", "departure_airport", "departureAirport", "origin", "from")
+ARR_AIRPORT_KEYS = ("arr_airport", "arrival_airport", "arrivalAirport", "destination", "to")
+DEP_TIME_KEYS = ("dpt_datetime", "departure_datetime", "departureDateTime", "departure_time", "departureTime", "departure")
+ARR_TIME_KEYS = ("arr_datetime", "arrival_datetime", "arrivalDateTime", "arrival_time", "arrivalTime", "arrival")
+DURATION_KEYS = ("total_duration", "totalDuration", "duration", "flight_time", "flightTime", "travel_time", "travelTime")
+EQUIPMENT_KEYS = ("equipment", "aircraft", "plane_model", "aircraftName")
+BAGGAGE_KEYS = ("baggage", "baggage_info", "baggageInfo")
+
+WEEKDAYS_JA = "月火水木金土日"
+
+# ISO 8601 durations such as PT27H35M or P1DT3H35M
+ISO_DURATION = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+
+def _first(data, keys, default=None):
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return default
+
+
+def _code(value):
+    """Returns an airport/carrier code from a plain string or a {'code': ...} object."""
+    if isinstance(value, dict):
+        return _first(value, ("code", "iata", "iata_code", "iataCode"), "N/A")
+    return str(value) if value not in (None, "") else "N/A"
+
+
+def _parse_datetime(value):
+    if isinstance(value, dict):
+        value = _first(value, ("datetime", "dateTime", "at", "time"))
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _date_str(dt):
+    """Formats a datetime the way the result page shows dates, e.g. '12/27(土)'."""
+    return f"{dt.month}/{dt.day}({WEEKDAYS_JA[dt.weekday()]})"
+
+
+def _price_str(value):
+    if isinstance(value, dict):
+        value = _first(value, ("total", "amount", "value"))
+    if isinstance(value, (int, float)):
+        return f"{int(value):,}円"
+    return str(value) if value not in (None, "") else None
+
+
+def _airport_zone(code):
+    """Returns the airport's time zone, or None if it is unknown."""
+    from airport_index import get_airport_index
+    name = get_airport_index().timezone(code)
+    if name is None:
+        return None
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except zoneinfo.ZoneInfoNotFoundError:
+        return None
+
+
+def _localize(dt, airport):
+    """Returns the time in the airport's time zone.
+
+    A naive time is taken as local and gets the zone attached; a time with
+    an offset is converted, so dates and times display as local either way.
+    """
+    zone = _airport_zone(airport)
+    if zone is None:
+        return dt
+    return dt.replace(tzinfo=zone) if dt.tzinfo is None else dt.astimezone(zone)
+
+
+def _minutes(value):
+    """Reads a payload duration given in minutes or as an ISO 8601 duration."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        match = ISO_DURATION.match(value.strip())
+        if match and any(match.groups()):
+            days, hours, minutes = (int(group or 0) for group in match.groups())
+            return days * 1440 + hours * 60 + minutes
+    return None
+
+
+def _elapsed_minutes(start, end):
+    """Minutes between two times, or None if only one of them carries a time zone."""
+    if (start.tzinfo is None) != (end.tzinfo is None):
+        return None
+    return int((end - start).total_seconds() // 60)
+
+
+def _duration_str(minutes):
+    if minutes is None:
+        return "N/A"
+    return f"{minutes // 60}時間{minutes % 60}分"
+
+
+def _stay_str(start, end):
+    minutes = _elapsed_minutes(start, end)
+    if minutes is None:
+        return "N/A"
+    return f"{minutes // 1440}日{minutes % 1440 // 60}時間{minutes % 60}分"
+
+
+def _decode_segment(segment):
+    """Returns a normalised segment dict, or None if times/airports are missing."""
+    departure = _parse_datetime(_first(segment, DEP_TIME_KEYS))
+    arrival = _parse_datetime(_first(segment, ARR_TIME_KEYS))
+    if departure is None or arrival is None:
+        return None
+    dep_airport = _code(_first(segment, DEP_AIRPORT_KEYS))
+    arr_airport = _code(_first(segment, ARR_AIRPORT_KEYS))
+    code = _first(segment, FLIGHT_CODE_KEYS)
+    carrier = _first(segment, CARRIER_KEYS)
+    if code and carrier and not str(code).startswith(_code(carrier)):
+        code = f"{_code(carrier)}{code}"
+    return {
+        "flight_code": str(code) if code else "N/A",
+        "airline": _first(segment, AIRLINE_NAME_KEYS, "N/A"),
+        "dep_airport": dep_airport,
+        "arr_airport": arr_airport,
+        "departure": _localize(departure, dep_airport),
+        "arrival": _localize(arrival, arr_airport),
+        "equipment": _first(segment, EQUIPMENT_KEYS, "N/A"),
+    }
+
+
+def _decode_direction(segments, duration=None):
+    """Builds the per-direction fields shared by one-way and round-trip records.
+
+    duration is the payload's total time for the direction, if it has one.
+    """
+    segments = [s for s in (_decode_segment(s) for s in segments if isinstance(s, dict)) if s]
+    if not segments:
+        return None
+    first, last = segments[0], segments[-1]
+    transfers = len(segments) - 1
+    minutes = _minutes(duration)
+    if minutes is None:
+        minutes = _elapsed_minutes(first["departure"], last["arrival"])
+    airline = first["airline"]
+    if isinstance(airline, dict):
+        airline = _first(airline, ("name", "name_ja", "nameJa"), "N/A")
+    return {
+        "airline": airline,
+        "flight_code": ", ".join(s["flight_code"] for s in segments),
+        "departure": {"date": _date_str(first["departure"]), "time": first["departure"].strftime("%H:%M"),
+                      "airport": first["dep_airport"]},
+        "arrival": {"date": _date_str(last["arrival"]), "time": last["arrival"].strftime("%H:%M"),
+                    "airport": last["arr_airport"]},
+        "duration": _duration_str(minutes),
+        "transfers": {"count_str": f"乗継{transfers}回" if transfers else "直行便",
+                      "airports": [s["arr_airport"] for s in segments[:-1]]},
+        "_equipment": first["equipment"],
+        "_segments": [{
+            "flight_code": s["flight_code"],
+            "departure": {"date": _date_str(s["departure"]), "time": s["departure"].strftime("%H:%M"),
+                          "airport": s["dep_airport"]},
+            "arrival": {"date": _date_str(s["arrival"]), "time": s["arrival"].strftime("%H:%M"),
+                        "airport": s["arr_airport"]},
+            "connection": _duration_str(_elapsed_minutes(s["arrival"], nxt["departure"])) if nxt else None,
+        } for s, nxt in zip(segments, segments[1:] + [None])],
+        "_start": first["departure"],
+        "_end": last["arrival"],
+    }
+
+
+def _public(direction):
+    return {k: v for k, v in direction.items() if not k.startswith("_")}
+
+
+def decode_offer(offer, air_type="0"):
+    """Maps one fare object to the record shape produced by parser.parse_flight_data."""
+    price = _price_str(_first(offer, PRICE_KEYS))
+    if price is None:
+        return None
+    provider = _first(offer, PROVIDER_KEYS, "N/A")
+    if isinstance(provider, dict):
+        provider = _first(provider, ("name", "name_ja"), "N/A")
+    baggage = _first(offer, BAGGAGE_KEYS, [])
+    baggage = [str(b) for b in baggage] if isinstance(baggage, list) else [str(baggage)]
+
+    slices = _first(offer, SLICE_KEYS)
+    if isinstance(slices, list) and slices and isinstance(slices[0], dict):
+        directions = [_decode_direction(_first(s, SEGMENT_KEYS, []), _first(s, DURATION_KEYS)) for s in slices]
+    else:
+        directions = [_decode_direction(_first(offer, SEGMENT_KEYS, []), _first(offer, DURATION_KEYS))]
+    if not directions or any(d is None for d in directions):
+        return None
+
+    if air_type == "1":
+        if len(directions) < 2:
+            return None
+        outbound, inbound = directions[0], directions[1]
+        return {
+            "provider_name": provider,
+            "price": price,
+            "trip_type": "round_trip",
+            "outbound": dict(_public(outbound), segments=outbound["_segments"]),
+            "return": dict(_public(inbound), segments=inbound["_segments"]),
+            "stay_duration": _stay_str(outbound["_end"], inbound["_start"]),
+            "baggage": baggage,
+        }
+
+    direction = directions[0]
+    record = {"provider_name": provider, "price": price, "trip_type": "片道"}
+    record.update(_public(direction))
+    record["plane_model"] = direction["_equipment"]
+    record["baggage"] = baggage
+    return record
+
+
+def _find_offer_lists(node, depth=0):
+    """Yields lists of dicts that look like fare lists (price + segment/slice info)."""
+    if depth > 8:
+        return
+    if isinstance(node, list):
+        dicts = [item for item in node if isinstance(item, dict)]
+        if dicts and len(dicts) == len(node) and _first(dicts[0], PRICE_KEYS) is not None \
+                and (_first(dicts[0], SLICE_KEYS) is not None or _first(dicts[0], SEGMENT_KEYS) is not None):
+            yield dicts
+            return
+        for item in node:
+            yield from _find_offer_lists(item, depth + 1)
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _find_offer_lists(value, depth + 1)
+
+
+def decode_offers(payloads, air_type="0"):
+    """Decodes offers from captured JSON payloads.
+
+    Returns:
+        List of flight dicts, or None if no payload had a recognisable fare list
+    """
+    flights = []
+    recognised = False
+    for payload in payloads:
+        for offers in _find_offer_lists(payload):
+            decoded = [decode_offer(o, air_type) for o in offers]
+            decoded = [d for d in decoded if d]
+            if decoded:
+                recognised = True
+                flights.extend(decoded)
+    return flights if recognised else None
+
+
+def collect_json_responses(driver, hosts=CAPTURE_HOSTS):
+    """Reads the performance log and returns the JSON bodies of finished responses.
+
+    The driver must have been created with performance logging enabled
+    (create_scrape_driver(config, performance_logging=True)).
+    """
+    candidates = {}
+    finished = []
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.responseReceived":
+            response = params.get("response", {})
+            if "json" in response.get("mimeType", "") and any(h in response.get("url", "") for h in hosts):
+                candidates[params["requestId"]] = response["url"]
+        elif method == "Network.loadingFinished":
+            finished.append(params.get("requestId"))
+
+    payloads = []
+    for request_id in finished:
+        if request_id not in candidates:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            text = body["body"]
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8")
+            payloads.append(json.loads(text))
+        except Exception as e:
+            print(f"Could not read response body for {candidates[request_id]}: {e}")
+    return payloads
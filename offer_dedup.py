@@ -0,0 +1,87 @@
+import hashlib
+import json
+
+from parser import parse_price
+
+# Cross-provider deduplication. tour.ne.jp lists the same itinerary once per
+# selling provider, so the cheapest offers of a page are often one flight
+# sold three times. Offers are grouped by a hash of the itinerary (flight
+# codes, dates, times and airports of every direction) and each group is
+# collapsed into its cheapest offer, which keeps the other providers' prices
+# under "alternatives". Offers without flight codes are never merged.
+
+
+def itinerary_identity(flight):
+    """Returns what makes two offers the same flight, or None if it cannot be told.
+
+    One tuple per direction: flight codes plus departure and arrival date,
+    time and airport.
+    """
+    legs = (flight.get('outbound'), flight.get('return')) if flight.get('trip_type') == 'round_trip' else (flight,)
+    identity = []
+    for leg in legs:
+        if not leg or leg.get('flight_code') in (None, '', 'N/A'):
+            return None
+        departure, arrival = leg.get('departure') or {}, leg.get('arrival') or {}
+        identity.append((leg['flight_code'],
+                         departure.get('date'), departure.get('time'), departure.get('airport'),
+                         arrival.get('date'), arrival.get('time'), arrival.get('airport')))
+    return tuple(identity)
+
+
+def itinerary_key(flight):
+    """Returns a short hash of the offer's itinerary identity, or None (see itinerary_identity)."""
+    identity = itinerary_identity(flight)
+    if identity is None:
+        return None
+    data = json.dumps(identity, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8, person=b'itinerary').hexdigest()
+
+
+def _price_key(offer):
+    price = parse_price(offer.get('price', ''))
+    return (price is None, price or 0)
+
+
+def dedupe_offers(flights):
+    """Collapses offers of the same itinerary into the cheapest one.
+
+    The kept offer is the cheapest provider's, with an "alternatives" list of
+    {"provider_name", "price"} for the other providers, cheapest first.
+    Offers already carrying alternatives (e.g. from another cell) are merged
+    again. Groups keep the position of their first offer; unique offers are
+    returned unchanged.
+
+    Returns:
+        New list of offers
+    """
+    groups = {}
+    order = []
+    for flight in flights:
+        key = itinerary_key(flight)
+        if key is None:
+            order.append([flight])
+            continue
+        if key not in groups:
+            groups[key] = []
+            order.append(groups[key])
+        groups[key].append(flight)
+
+    result = []
+    for group in order:
+        if len(group) == 1:
+            result.append(group[0])
+            continue
+        offers = {}
+        for flight in group:
+            for offer in [flight] + flight.get('alternatives', []):
+                offers.setdefault((offer.get('provider_name'), offer.get('price')), offer)
+        cheapest = min(group, key=_price_key)
+        kept = {k: v for k, v in cheapest.items() if k != 'alternatives'}
+        alternatives = [{'provider_name': provider, 'price': price}
+                        for (provider, price), offer in sorted(offers.items(), key=lambda item: _price_key(item[1]))
+                        if (provider, price) != (kept.get('provider_name'), kept.get('price'))]
+        if alternatives:
+            kept['alternatives'] = alternatives
+        result.append(kept)
+    return result
@@ -0,0 +1,243 @@
+import fcntl
+import gzip
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from bs4 import BeautifulSoup
+
+from parser import parse_flight_data, clean_html
+from offer_dedup import dedupe_offers
+from result_store import ResultStore, cell_key
+
+# Raw page archive and bulk re-parse. With PAGE_ARCHIVE="true", every scraped
+# page's HTML (the flight-area fragments, or the whole document with
+# CAPTURE_MODE="page_source") is stored gzip-compressed under
+# data/pages/<cell key>/, and one JSON line per page in data/pages/index.jsonl
+# records the cell, URL and scrape time. Pages older than
+# PAGE_ARCHIVE_MAX_AGE_DAYS are pruned when a sweep opens the archive. The
+# coordinator and the queue workers share the archive, so saves and prunes
+# hold an flock on index.jsonl.lock: a prune's index rewrite can then never
+# drop a line another process appends meanwhile. After a
+# parser.py fix, reparse_archive runs clean_html + parse_flight_data over the
+# archive in a process pool and replaces the stored offers of each search.
+
+DEFAULT_ARCHIVE_DIR = "data/pages"
+INDEX_FILE = "index.jsonl"
+# Locked instead of the index itself, which a prune replaces with a new file
+LOCK_FILE = "index.jsonl.lock"
+PAGE_SUFFIX = ".html.gz"
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Chunks per worker process; more chunks balance uneven pages, fewer cut IPC
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_SIZE = 64
+
+
+class PageArchive:
+    """Append-only archive of scraped pages. Safe to share between threads and processes."""
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, INDEX_FILE)
+        self.lock_path = os.path.join(archive_dir, LOCK_FILE)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Holds the archive lock of this process and the flock shared with other processes."""
+        with self._lock:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, cell, html, url=None, scraped_at=None):
+        """Stores a page and returns its path relative to the archive directory."""
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        key = cell_key(cell)
+        relative_path = os.path.join(key, f"{int(scraped_at * 1000)}{PAGE_SUFFIX}")
+        path = os.path.join(self.archive_dir, relative_path)
+        entry = {"file": relative_path, "cell": cell, "url": url, "scraped_at": scraped_at}
+        # The page is written under the lock too, so a prune cannot remove its cell directory meanwhile
+        with self._locked():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                f.write(html)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return relative_path
+
+    def entries(self, since=None):
+        """Returns the index entries, oldest first, optionally only those scraped at or after `since`."""
+        if not os.path.exists(self.index_path):
+            return []
+        entries = []
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash mid-write
+                    continue
+                if since is None or entry["scraped_at"] >= since:
+                    entries.append(entry)
+        return entries
+
+    def prune(self, max_age, now=None):
+        """Deletes pages scraped more than max_age seconds ago and drops them from the index.
+
+        Returns:
+            Number of page files deleted
+        """
+        cutoff = (time.time() if now is None else now) - max_age
+        removed = 0
+        with self._locked():
+            if os.path.exists(self.index_path):
+                kept = self.entries(since=cutoff)
+                tmp_path = self.index_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for entry in kept:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.index_path)
+            try:
+                keys = os.listdir(self.archive_dir)
+            except FileNotFoundError:
+                return 0
+            # Page files are named by scrape time in ms, so files the index lost are pruned too
+            for key in keys:
+                cell_dir = os.path.join(self.archive_dir, key)
+                if not os.path.isdir(cell_dir):
+                    continue
+                for name in os.listdir(cell_dir):
+                    try:
+                        if name.endswith(PAGE_SUFFIX) and int(name[:-len(PAGE_SUFFIX)]) / 1000 < cutoff:
+                            os.remove(os.path.join(cell_dir, name))
+                            removed += 1
+                    except (ValueError, OSError):
+                        pass
+                try:
+                    os.rmdir(cell_dir)  # Only succeeds once the cell has no pages left
+                except OSError:
+                    pass
+        return removed
+
+
+def archive_enabled(config):
+    """Returns True if PAGE_ARCHIVE is set to "true"."""
+    return ((config or {}).get("PAGE_ARCHIVE") or "false").lower() == "true"
+
+
+def open_page_archive(config):
+    """Returns the PageArchive for a sweep after pruning old pages, or None if PAGE_ARCHIVE is off."""
+    if not archive_enabled(config):
+        return None
+    archive = PageArchive(config.get("PAGE_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR)
+    max_age_days = config.get("PAGE_ARCHIVE_MAX_AGE_DAYS")
+    max_age_days = float(max_age_days) if max_age_days not in (None, "") else DEFAULT_MAX_AGE_DAYS
+    if max_age_days > 0:
+        removed = archive.prune(max_age_days * 86400)
+        if removed:
+            print(f"Pruned {removed} archived pages older than {max_age_days:g} days")
+    return archive
+
+
+def parse_archived_pages(archive_dir, entries):
+    """Parses a chunk of archived pages (runs in a worker process).
+
+    Returns:
+        List of (entry, flights, error) tuples; flights is None if the page failed
+    """
+    results = []
+    for entry in entries:
+        try:
+            with gzip.open(os.path.join(archive_dir, entry["file"]), 'rt', encoding='utf-8') as f:
+                html = f.read()
+            soup = BeautifulSoup(clean_html(html), 'lxml')
+            # Same post-processing as scrape_cell, so stored offers compare equal
+            flights = dedupe_offers(parse_flight_data(soup, entry["cell"].get("air_type", "0")))
+            for flight in flights:
+                flight['source_url'] = entry.get("url")
+            results.append((entry, flights, None))
+        except Exception as e:
+            results.append((entry, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def chunk_entries(entries, workers):
+    """Splits entries into about CHUNKS_PER_WORKER chunks per worker."""
+    if not entries:
+        return []
+    size = max(1, min(MAX_CHUNK_SIZE, math.ceil(len(entries) / (workers * CHUNKS_PER_WORKER))))
+    return [entries[i:i + size] for i in range(0, len(entries), size)]
+
+
+def reparse_archive(store, archive_dir=DEFAULT_ARCHIVE_DIR, workers=None, since=None):
+    """Re-parses every archived page and replaces the offers stored for it.
+
+    Chunks of pages are parsed in a ProcessPoolExecutor; each finished chunk
+    is written to the store in one transaction as soon as it arrives.
+
+    Args:
+        store: ResultStore to update
+        archive_dir: Archive written by PageArchive
+        workers: Worker processes (default: CPU count)
+        since: Only pages scraped at or after this epoch time
+
+    Returns:
+        Stats dict: pages, failed, offers, changed (searches whose offers
+        differ from the stored ones), seconds, pages_per_second
+    """
+    archive = PageArchive(archive_dir)
+    entries = archive.entries(since)
+    workers = max(1, workers or os.cpu_count() or 1)
+    chunks = chunk_entries(entries, workers)
+    stats = {"pages": 0, "failed": 0, "offers": 0, "changed": 0}
+    print(f"Re-parsing {len(entries)} archived pages in {len(chunks)} chunks with {workers} workers...")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_archived_pages, archive_dir, chunk) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), 1):
+            parsed = []
+            for entry, flights, error in future.result():
+                if flights is None:
+                    stats["failed"] += 1
+                    print(f"  Failed to re-parse {entry['file']}: {error}")
+                    continue
+                parsed.append((entry["cell"], flights, entry["scraped_at"]))
+                stats["offers"] += len(flights)
+            stats["changed"] += store.replace_searches(parsed)
+            stats["pages"] += len(parsed)
+            if done % 10 == 0 or done == len(futures):
+                elapsed = time.perf_counter() - started
+                print(f"  {stats['pages'] + stats['failed']}/{len(entries)} pages "
+                      f"({(stats['pages'] + stats['failed']) / elapsed:.1f} pages/s)")
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    stats["pages_per_second"] = round(stats["pages"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def run_reparse(config):
+    """Command entry point: `python scraper.py reparse`."""
+    archive_dir = config.get("PAGE_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+    workers = int(config["REPARSE_WORKERS"]) if config.get("REPARSE_WORKERS") else None
+    store = ResultStore()
+    try:
+        stats = reparse_archive(store, archive_dir, workers)
+    finally:
+        store.close()
+    print(f"Re-parsed {stats['pages']} pages ({stats['failed']} failed, {stats['offers']} offers, "
+          f"{stats['changed']} searches changed) in {stats['seconds']}s: {stats['pages_per_second']} pages/s")
+    return stats
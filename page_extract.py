@@ -0,0 +1,205 @@
+import json
+import time
+
+from bs4 import BeautifulSoup
+from parser import parse_flight_data, clean_html, parse_price
+from parse_cache import card_key
+
+# In-page extraction: instead of shipping the whole document (~1.6 MB with
+# scripts, styles and ads) over the WebDriver wire with driver.page_source,
+# one execute_script call returns only the outerHTML of each top-level
+# div.flight-area. Wrapped in a minimal document, the fragments parse to the
+# same records as the full page, because parse_flight_data only ever looks
+# inside flight-area cards.
+
+FLIGHT_AREA_SELECTOR = "div.flight-area"
+
+EXTRACT_FLIGHT_AREAS_SCRIPT = """
+return Array.from(document.querySelectorAll(arguments[0]))
+    .filter(el => !(el.parentElement && el.parentElement.closest(arguments[0])))
+    .map(el => el.outerHTML);
+"""
+
+
+def extract_flight_area_html(driver):
+    """Returns the outerHTML of every top-level flight-area card on the page."""
+    return driver.execute_script(EXTRACT_FLIGHT_AREAS_SCRIPT, FLIGHT_AREA_SELECTOR) or []
+
+
+def fragments_to_html(fragments):
+    """Wraps card fragments in a minimal document for clean_html/parse_flight_data."""
+    return "<html><body>" + "".join(fragments) + "</body></html>"
+
+
+def parse_cards(fragments, air_type="0", cache=None):
+    """Parses card fragments, reusing records cached for identical cards.
+
+    Args:
+        fragments: outerHTML of top-level flight-area cards
+        air_type: "0" for one-way, "1" for round-trip
+        cache: Optional ParseCache (see parse_cache.py); without one the
+            fragments are parsed as a single document
+
+    Returns:
+        Flights in card order
+    """
+    if cache is None:
+        return parse_flight_data(BeautifulSoup(clean_html(fragments_to_html(fragments)), 'lxml'), air_type)
+    keys = [card_key(fragment, air_type) for fragment in fragments]
+    cards = [cache.get(key) for key in keys]
+    misses = {}
+    for key, fragment, records in zip(keys, fragments, cards):
+        if records is None:
+            misses.setdefault(key, fragment)
+    if misses:
+        # One document for all new cards, each in its own wrapper div
+        soup = BeautifulSoup(clean_html(fragments_to_html([f"<div>{f}</div>" for f in misses.values()])), 'lxml')
+        parsed = {}
+        for key, wrapper in zip(misses, soup.body.find_all('div', recursive=False)):
+            parsed[key] = parse_flight_data(wrapper, air_type)
+            cache.put(key, parsed[key])
+        # Copies, so duplicate cards never share record dicts
+        cards = [records if records is not None else json.loads(json.dumps(parsed[key]))
+                 for key, records in zip(keys, cards)]
+    return [flight for records in cards for flight in records]
+
+
+# Incremental extraction: a MutationObserver installed right after navigation
+# queues every flight-area card as it is attached. Cards are filled in after
+# insertion, so a queued card is only handed out (once) when its total price
+# has rendered. The scraper drains the queue every second.
+
+INSTALL_CARD_OBSERVER_SCRIPT = """
+const selector = arguments[0];
+if (window.__flightCardObserver) { window.__flightCardObserver.disconnect(); }
+window.__flightCardPending = new Set();
+const queueCards = root => {
+    if (root.nodeType !== 1) return;
+    if (root.matches(selector)) window.__flightCardPending.add(root);
+    root.querySelectorAll(selector).forEach(el => window.__flightCardPending.add(el));
+};
+queueCards(document.body);
+window.__flightCardObserver = new MutationObserver(mutations => {
+    for (const m of mutations) m.addedNodes.forEach(queueCards);
+});
+window.__flightCardObserver.observe(document.body, {childList: true, subtree: true});
+return window.__flightCardPending.size;
+"""
+
+DRAIN_CARDS_SCRIPT = """
+const selector = arguments[0];
+const pending = window.__flightCardPending;
+if (!pending) return null;
+const ready = [];
+for (const el of Array.from(pending)) {
+    if (!el.isConnected) { pending.delete(el); continue; }
+    if (el.parentElement && el.parentElement.closest(selector)) { pending.delete(el); continue; }
+    if (el.querySelector('.flight-summary-total-price')) {
+        ready.push(el.outerHTML);
+        pending.delete(el);
+    }
+}
+return ready;
+"""
+
+# Defaults for the observer wait strategy (seconds)
+DEFAULT_MAX_WAIT = 55
+DEFAULT_STABLE_SECONDS = 8
+DEFAULT_STABLE_TOP_N = 3
+POLL_INTERVAL = 1.0
+
+
+def install_card_observer(driver):
+    """Starts buffering flight-area cards in the page; returns the count already present."""
+    return driver.execute_script(INSTALL_CARD_OBSERVER_SCRIPT, FLIGHT_AREA_SELECTOR)
+
+
+def drain_cards(driver):
+    """Returns the outerHTML of cards that finished rendering since the last drain."""
+    return driver.execute_script(DRAIN_CARDS_SCRIPT, FLIGHT_AREA_SELECTOR) or []
+
+
+def _offer_identity(flight):
+    if flight.get('trip_type') == 'round_trip':
+        legs = (flight['outbound'], flight['return'])
+    else:
+        legs = (flight,)
+    return (flight.get('price'),) + tuple(
+        (leg.get('flight_code'), leg['departure'].get('time'), leg['arrival'].get('time')) for leg in legs
+    )
+
+
+def sort_by_price(flights):
+    """Sorts flights cheapest first; unparseable prices go last, order otherwise kept."""
+    return sorted(flights, key=lambda f: (parse_price(f.get('price', '')) is None,
+                                          parse_price(f.get('price', '')) or 0))
+
+
+class StabilityTracker:
+    """Decides when the cheapest `top_n` offers have stopped changing.
+
+    `update` is called with all offers parsed so far; the result counts as
+    stable once the cheapest top_n identities are unchanged for
+    `stable_seconds`.
+    """
+
+    def __init__(self, top_n=DEFAULT_STABLE_TOP_N, stable_seconds=DEFAULT_STABLE_SECONDS):
+        self.top_n = top_n
+        self.stable_seconds = stable_seconds
+        self._signature = None
+        self._since = None
+
+    def update(self, flights, now=None):
+        now = time.time() if now is None else now
+        signature = tuple(_offer_identity(f) for f in sort_by_price(flights)[:self.top_n])
+        if signature != self._signature:
+            self._signature = signature
+            self._since = now
+        return self.is_stable(now)
+
+    def is_stable(self, now=None):
+        now = time.time() if now is None else now
+        return bool(self._signature) and now - self._since >= self.stable_seconds
+
+
+def collect_cards_until_stable(driver, air_type, max_wait=DEFAULT_MAX_WAIT,
+                               stable_seconds=DEFAULT_STABLE_SECONDS, top_n=DEFAULT_STABLE_TOP_N,
+                               on_batch=None, cache=None):
+    """Parses cards as they stream in and stops once the cheapest offers settle.
+
+    Args:
+        driver: WebDriver that has just navigated to a result page
+        air_type: "0" for one-way, "1" for round-trip
+        max_wait: Upper bound in seconds (the old fixed sleep)
+        stable_seconds: How long the cheapest `top_n` offers must stay unchanged
+        top_n: Number of cheapest offers that must be stable
+        on_batch: Optional callable receiving each newly parsed batch of flights
+        cache: Optional ParseCache for the card records (see parse_cards)
+
+    Returns:
+        Flights sorted cheapest first (possibly empty)
+    """
+    install_card_observer(driver)
+    tracker = StabilityTracker(top_n, stable_seconds)
+    started = time.time()
+    seen_fragments = set()
+    flights = []
+
+    while True:
+        fragments = [f for f in drain_cards(driver) if f not in seen_fragments]
+        if fragments:
+            seen_fragments.update(fragments)
+            batch = parse_cards(fragments, air_type, cache)
+            flights.extend(batch)
+            if on_batch and batch:
+                on_batch(batch)
+        elapsed = time.time() - started
+        if tracker.update(flights):
+            print(f"Cheapest {top_n} offers stable after {elapsed:.1f}s ({len(flights)} offers)")
+            break
+        if elapsed >= max_wait:
+            print(f"Stopped waiting after {elapsed:.1f}s ({len(flights)} offers)")
+            break
+        time.sleep(POLL_INTERVAL)
+
+    return sort_by_price(flights)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import parser
+
+# Per-card parse cache. Consecutive scrapes of a route return mostly the same
+# flight-area cards, so parsed records are cached under a blake2b hash of the
+# card's HTML, taken before clean_html/BeautifulSoup ever see it. Attributes
+# other than class are dropped first, since clean_html removes them anyway
+# (whitespace is kept: the parser splits some texts on newlines). The key also
+# covers air_type and a fingerprint of parser.py, so a parser fix never
+# returns records from the old parser.
+#
+# Each process keeps a bounded in-memory LRU. With a database path, records
+# are also written to SQLite (WAL), which several processes can share; the
+# database is trimmed to the same bound by last use.
+
+DEFAULT_MAX_ENTRIES = 5000
+
+# Trim the database every this many writes
+PRUNE_EVERY = 200
+
+with open(parser.__file__, 'rb') as _f:
+    PARSER_FINGERPRINT = hashlib.blake2b(_f.read(), digest_size=8).hexdigest()
+
+TAG_RE = re.compile(r'<([^\s>/]+)([^>]*)>')
+CLASS_ATTR_RE = re.compile(r'''\sclass\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)''', re.IGNORECASE)
+
+
+def _strip_attributes(match):
+    cls = CLASS_ATTR_RE.search(match.group(2))
+    return f"<{match.group(1)}{' class=' + cls.group(1) if cls else ''}>"
+
+
+def normalize_card_html(html):
+    """Reduces a card's HTML to what the parser depends on: tags, classes and text."""
+    return TAG_RE.sub(_strip_attributes, html).strip()
+
+
+def card_key(html, air_type="0"):
+    """Returns the cache key of a card fragment for the given air_type."""
+    digest = hashlib.blake2b(digest_size=16, person=b'flight-card')
+    digest.update(f"{PARSER_FINGERPRINT}:{air_type}:".encode())
+    digest.update(normalize_card_html(html).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Bounded LRU of parsed card records, optionally backed by SQLite.
+
+    Values are the list of records parse_flight_data returned for the card
+    (stored as JSON, so every hit is a fresh copy the caller may modify).
+    Thread-safe; across processes, share the database path instead of the
+    object.
+
+    Args:
+        max_entries: Cards kept in memory (and in the database)
+        db_path: Optional SQLite file shared across runs and processes
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+        self.max_entries = max(1, int(max_entries))
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0}
+
+    def _db(self):
+        # A connection must not cross a fork; worker processes open their own
+        if self.db_path is None:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards (key TEXT PRIMARY KEY, records TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_used ON cards (used)")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _remember(self, key, data):
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, key):
+        """Returns the cached records for a key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            else:
+                db = self._db()
+                row = db.execute("SELECT records FROM cards WHERE key = ?", (key,)).fetchone() if db else None
+                if row is not None:
+                    data = row[0]
+                    db.execute("UPDATE cards SET used = ? WHERE key = ?", (time.time(), key))
+                    db.commit()
+                    self._remember(key, data)
+                    self.stats["disk_hits"] += 1
+            if data is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+        return json.loads(data)
+
+    def put(self, key, records):
+        """Caches the records parsed from one card."""
+        data = json.dumps(records, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, data)
+            db = self._db()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO cards (key, records, used) VALUES (?, ?, ?)",
+                           (key, data, time.time()))
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    db.execute("DELETE FROM cards WHERE key IN "
+                               "(SELECT key FROM cards ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                               (self.max_entries,))
+                db.commit()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_parse_cache(config=None):
+    """Returns this process's shared ParseCache for the config, or None if PARSE_CACHE is "false"."""
+    config = config or {}
+    if (config.get("PARSE_CACHE") or "true").lower() != "true":
+        return None
+    max_entries = int(config.get("PARSE_CACHE_SIZE") or DEFAULT_MAX_ENTRIES)
+    db_path = config.get("PARSE_CACHE_DB") or None
+    with _caches_lock:
+        cache = _caches.get((max_entries, db_path))
+        if cache is None:
+            cache = _caches[(max_entries, db_path)] = ParseCache(max_entries, db_path)
+        return cache
@@ -163,11 +163,15 @@ def parse_round_trip_flight_data(soup: BeautifulSoup) -> list[dict]:
             # Not a valid round trip, skip
             continue
 
+        # One pass over the detail view serves both directions
+        segment_index = _build_segment_index(flight_area)
+        directions = segment_index + [None] * (2 - len(segment_index))
+
         # Parse outbound flight (往路)
-        outbound = _parse_single_direction(sch_headers[0], sch_items[0], flight_area)
+        outbound = _parse_single_direction(sch_headers[0], sch_items[0], directions[0])
 
         # Parse return flight (復路)
-        return_flight = _parse_single_direction(sch_headers[1], sch_items[1], flight_area)
+        return_flight = _parse_single_direction(sch_headers[1], sch_items[1], directions[1])
 
         flight_data = {
             "provider_name": provider_name,
@@ -183,16 +187,83 @@ def parse_round_trip_flight_data(soup: BeautifulSoup) -> list[dict]:
     return parsed_flights
 
 
-def _parse_single_direction(header_item: dict, sch_item: dict, flight_area: dict) -> dict:
+def _text(tag) -> str:
+    return tag.text.strip() if tag else 'N/A'
+
+
+def _build_segment_index(flight_area) -> list[dict]:
+    """Indexes the detail view of a card per direction in a single pass.
+
+    The .sch-dtl-container holds one .sch-dtl-item per direction, and each
+    item one <dl> per flight segment: a departure <dt>/<dd class="airport">
+    pair (with the flight code) followed by an arrival pair whose <dd> is
+    "airport transfer" (with the connection time) or "airport end".
+
+    Returns:
+        One dict per direction, in page order, with flight_codes,
+        transfer_airports and segments (flight_code, departure, arrival,
+        connection time after the segment or None)
+    """
+    container = flight_area.find('div', class_='sch-dtl-container')
+    if container is None:
+        return []
+
+    directions = []
+    for dtl_item in container.find_all('div', class_='sch-dtl-item', recursive=False):
+        flight_codes, transfer_airports, segments = [], [], []
+        for segment_dl in dtl_item.find_all('dl', recursive=False):
+            points = []
+            for dt in segment_dl.find_all('dt', recursive=False):
+                dd = dt.find_next_sibling('dd')
+                point = {
+                    "date": _text(dt.find('span', class_='date')),
+                    "time": _text(dt.find('b', recursive=False)),
+                    "airport": _text(dd.find('a', class_='airport')) if dd else 'N/A',
+                }
+                points.append((point, dd))
+            if not points:
+                continue
+
+            departure, departure_dd = points[0]
+            arrival, arrival_dd = points[-1]
+            code_tag = departure_dd.find('span', class_='sch-dtl-desc-flt-code') if departure_dd else None
+            flight_code = code_tag.text.strip() if code_tag else 'N/A'
+            if code_tag:
+                flight_codes.append(flight_code)
+
+            connection = None
+            if arrival_dd is not None and 'transfer' in (arrival_dd.get('class') or []):
+                if arrival["airport"] != 'N/A':
+                    transfer_airports.append(arrival["airport"])
+                term = arrival_dd.find('span', class_='sch-term')
+                connection_tag = term.find('b', recursive=False) if term else None
+                connection = connection_tag.text.strip() if connection_tag and connection_tag.text.strip() else None
+
+            segments.append({
+                "flight_code": flight_code,
+                "departure": departure,
+                "arrival": arrival,
+                "connection": connection,
+            })
+        directions.append({
+            "flight_codes": flight_codes,
+            "transfer_airports": transfer_airports,
+            "segments": segments,
+        })
+    return directions
+
+
+def _parse_single_direction(header_item, sch_item, direction_index: dict | None) -> dict:
     """Parse a single direction (outbound or return) for round-trip flights.
 
     Args:
         header_item: The .sch-header BeautifulSoup element for this direction
         sch_item: The .sch-item BeautifulSoup element for this direction
-        flight_area: The parent flight_area element (for finding nested details)
+        direction_index: This direction's entry from _build_segment_index, or
+            None if the card has no detail view for it
 
     Returns:
-        dict with keys: airline, flight_code, departure, arrival, duration, transfers
+        dict with keys: airline, flight_code, departure, arrival, duration, transfers, segments
     """
     # Get airline name
     airline_name_tag = header_item.find('span', class_='sch-airline-name-sup')
@@ -230,29 +301,15 @@ def _parse_single_direction(header_item: dict, sch_item: dict, flight_area: dict
 
     # Get transfer info
     transfers_str = 'N/A'
-    transfer_airports = []
     transfer_tag = flt_term.find('span', class_='flt-term-transit') if flt_term else None
     if transfer_tag:
         transfers_str = transfer_tag.text.strip()
 
-    # Get flight codes from this direction's detailed view
-    # The detailed view is in .sch-dtl-container - we need to find the one for this direction
-    flight_codes = []
-    # Find flight codes in the main sch-item area (simplified)
-    # In detailed HTML, codes are in .sch-dtl-desc-flt-code within the flight detail container
-    flight_code_tags = flight_area.find_all('span', class_='sch-dtl-desc-flt-code')
-    # For round trip, we split codes appropriately - first half for outbound, second for return
-    # This is a simplified approach; ideally we'd parse per direction
-    flight_codes = [tag.text.strip() for tag in flight_code_tags]
+    # Flight codes and transfer airports of this direction's legs only
+    direction_index = direction_index or {"flight_codes": [], "transfer_airports": [], "segments": []}
+    flight_codes = direction_index["flight_codes"]
     flight_code = ', '.join(flight_codes) if flight_codes else 'N/A'
 
-    # Get transfer airports from detailed view
-    transfer_tags = flight_area.find_all('dd', class_='airport transfer')
-    for tag in transfer_tags:
-        airport_name_tag = tag.find('a', class_='airport')
-        if airport_name_tag:
-            transfer_airports.append(airport_name_tag.text.strip())
-
     return {
         "airline": airline_name,
         "flight_code": flight_code,
@@ -269,6 +326,15 @@ def _parse_single_direction(header_item: dict, sch_item: dict, flight_area: dict
         "duration": duration,
         "transfers": {
             "count_str": transfers_str,
-            "airports": transfer_airports
-        }
-    }
\ No newline at end of file
+            "airports": list(direction_index["transfer_airports"])
+        },
+        "segments": direction_index["segments"]
+    }
+
+def parse_price(price: str) -> int | None:
+    """Converts a price string such as "86,344円" to an integer number of yen.
+
+    Returns None when the string holds no digits (e.g. 'N/A').
+    """
+    digits = ''.join(ch for ch in str(price) if ch.isdigit())
+    return int(digits) if digits else None
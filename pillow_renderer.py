@@ -0,0 +1,469 @@
+import os
+import re
+from functools import lru_cache
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from image_encoder import save_report_images
+
+# Chrome-free report renderer: lays out the same header, flight cards,
+# round-trip connector and footer as template.html directly with Pillow.
+# All layout values below are CSS pixels from template.html; they are
+# multiplied by SCALE (the 2x device scale factor of the Chrome path), so a
+# report is 780 CSS px = 1560 px wide either way.
+
+SCALE = 2
+PAGE_WIDTH = 780
+BODY_PADDING = 10
+CONTAINER_WIDTH = 720
+LINE_HEIGHT = 1.6
+
+# Font candidates in order of preference: (path, face index in .ttc)
+REGULAR_FONTS = [
+    ("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc", 2),  # 2 = Simplified Chinese
+    ("/usr/share/fonts/truetype/wqy/wqy-microhei.ttc", 0),
+]
+BOLD_FONTS = [
+    ("/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc", 2),
+] + REGULAR_FONTS
+EMOJI_FONT = "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf"
+EMOJI_BITMAP_SIZE = 109  # The only size NotoColorEmoji (CBDT) can be loaded at
+
+WHITE = (255, 255, 255)
+HEADER_GRADIENT = ((0x66, 0x7e, 0xea), (0x76, 0x4b, 0xa2))
+CARD_GRADIENTS = [
+    ((0xc0, 0x39, 0x2f), (0x8e, 0x44, 0xad)),
+    ((0x29, 0x80, 0xb9), (0x16, 0xa0, 0x85)),
+    ((0x27, 0xae, 0x60), (0xd3, 0x54, 0x00)),
+]
+OUTBOUND_GRADIENT = ((0x27, 0xae, 0x60), (0xd3, 0x54, 0x00))
+RETURN_GRADIENT = ((0x8e, 0x44, 0xad), (0x29, 0x80, 0xb9))
+STAY_GRADIENT = ((0xf3, 0x9c, 0x12), (0xe7, 0x4c, 0x3c))
+
+# A latin word (with its trailing spaces), a run of spaces, or any single
+# character with an optional emoji variation selector
+TOKEN_RE = re.compile(r"[A-Za-z0-9À-ɏ.,:;!?%()\[\]\-'\"/+&@#$*=_~]+\s*|\s+|.\ufe0f?", re.S)
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+BULLET_RE = re.compile(r"^\s*(?:[-*+]|(\d+)[.)])\s+")
+
+
+def _is_emoji(char):
+    cp = ord(char[0])
+    return cp >= 0x1F000 or 0x2600 <= cp <= 0x27BF or 0x2300 <= cp <= 0x23FF or 0x2B00 <= cp <= 0x2BFF
+
+
+@lru_cache(maxsize=None)
+def _font(size_px, bold=False):
+    for path, index in (BOLD_FONTS if bold else REGULAR_FONTS):
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size_px, index=index)
+    return ImageFont.load_default(size_px)
+
+
+@lru_cache(maxsize=None)
+def _emoji_font():
+    if os.path.exists(EMOJI_FONT):
+        return ImageFont.truetype(EMOJI_FONT, EMOJI_BITMAP_SIZE)
+    return None
+
+
+@lru_cache(maxsize=512)
+def _emoji_image(cluster, size_px):
+    """Returns the emoji as an RGBA image size_px high, or None without the emoji font."""
+    font = _emoji_font()
+    if font is None:
+        return None
+    canvas = Image.new("RGBA", (EMOJI_BITMAP_SIZE * 2, EMOJI_BITMAP_SIZE * 2), (0, 0, 0, 0))
+    ImageDraw.Draw(canvas).text((0, 0), cluster, font=font, embedded_color=True)
+    bbox = canvas.getbbox()
+    if bbox is None:
+        return None
+    glyph = canvas.crop(bbox)
+    width = max(1, round(glyph.width * size_px / glyph.height))
+    return glyph.resize((width, size_px), Image.Resampling.LANCZOS)
+
+
+def parse_markdown(text):
+    """Turns an AI comment into blocks of rich text.
+
+    Returns:
+        List of (bullet, runs): bullet is "•", "1." etc. or None for a
+        paragraph; runs is a list of (text, bold). Italics are shown upright.
+    """
+    blocks = []
+    for raw in (text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        bullet = None
+        match = BULLET_RE.match(line)
+        if match:
+            bullet = f"{match.group(1)}." if match.group(1) else "•"
+            line = line[match.end():]
+        heading = line.startswith('#')
+        line = line.lstrip('#').strip()
+
+        runs = []
+        pos = 0
+        for m in BOLD_RE.finditer(line):
+            if m.start() > pos:
+                runs.append((line[pos:m.start()], heading))
+            runs.append((m.group(1) or m.group(2), True))
+            pos = m.end()
+        if pos < len(line):
+            runs.append((line[pos:], heading))
+        # Drop single-marker emphasis (*italic*, _italic_)
+        runs = [(re.sub(r"(?<!\w)[*_](\S(?:.*?\S)?)[*_](?!\w)", r"\1", t), b) for t, b in runs]
+        blocks.append((bullet, runs))
+    return blocks
+
+
+def _gradient(size, colors):
+    """Returns a 135deg gradient image; the blend mask is built small and upscaled."""
+    small = (max(2, size[0] // 16), max(2, size[1] // 16))
+    horizontal = Image.linear_gradient("L").rotate(90).resize(small, Image.Resampling.BILINEAR)
+    vertical = Image.linear_gradient("L").resize(small, Image.Resampling.BILINEAR)
+    mask = ImageChops.add(horizontal, vertical, scale=2).resize(size, Image.Resampling.BILINEAR)
+    return Image.composite(Image.new("RGB", size, colors[1]), Image.new("RGB", size, colors[0]), mask)
+
+
+class _Canvas:
+    """Draw target in CSS pixels. With image=None only the layout is computed."""
+
+    def __init__(self, image=None, scale=SCALE):
+        self.image = image
+        self.scale = scale
+        self.draw = ImageDraw.Draw(image) if image is not None else None
+
+    def px(self, value):
+        return int(round(value * self.scale))
+
+    def box(self, x, y, w, h):
+        return (self.px(x), self.px(y), self.px(x + w), self.px(y + h))
+
+    # Measuring
+
+    def token_width(self, token, size, bold):
+        if _is_emoji(token):
+            return size * 1.15
+        return _font(self.px(size), bold).getlength(token) / self.scale
+
+    def runs_width(self, runs, size):
+        return sum(self.token_width(tok, size, bold) for text, bold in runs for tok in TOKEN_RE.findall(text))
+
+    def wrap(self, runs, size, max_width):
+        """Greedy line breaking; CJK breaks between any characters, latin between words."""
+        lines, line, width = [], [], 0.0
+        for text, bold in runs:
+            for token in TOKEN_RE.findall(text):
+                token_width = self.token_width(token, size, bold)
+                if line and width + token_width > max_width and not token.isspace():
+                    lines.append(line)
+                    line, width = [], 0.0
+                if not line and token.isspace():
+                    continue
+                line.append((token, bold))
+                width += token_width
+        if line:
+            lines.append(line)
+        return lines or [[]]
+
+    # Drawing
+
+    def text_line(self, x, y, tokens, size, fill, line_height=LINE_HEIGHT):
+        """Draws one line of (token, bold) pairs, vertically centred in its line box."""
+        if self.draw is None:
+            return
+        middle = self.px(y + size * line_height / 2)
+        cursor = x
+        for token, bold in tokens:
+            if _is_emoji(token):
+                emoji = _emoji_image(token, self.px(size * 1.1))
+                if emoji is not None:
+                    self.image.paste(emoji, (self.px(cursor), middle - emoji.height // 2), emoji)
+                else:
+                    self.draw.text((self.px(cursor), middle), token, font=_font(self.px(size), bold),
+                                   fill=fill, anchor="lm")
+            else:
+                self.draw.text((self.px(cursor), middle), token, font=_font(self.px(size), bold),
+                               fill=fill, anchor="lm")
+            cursor += self.token_width(token, size, bold)
+
+    def paragraph(self, x, y, width, runs, size, fill, align="left", line_height=LINE_HEIGHT):
+        """Draws wrapped rich text and returns its height."""
+        lines = self.wrap(runs, size, width)
+        for i, tokens in enumerate(lines):
+            offset = 0
+            if align == "center":
+                offset = (width - sum(self.token_width(t, size, b) for t, b in tokens)) / 2
+            self.text_line(x + offset, y + i * size * line_height, tokens, size, fill, line_height)
+        return len(lines) * size * line_height
+
+    def gradient(self, x, y, w, h, colors, radius=0):
+        """Fills a rounded box with a 135deg (top-left to bottom-right) gradient."""
+        if self.draw is None:
+            return
+        box = self.box(x, y, w, h)
+        size = (box[2] - box[0], box[3] - box[1])
+        self.image.paste(_gradient(size, colors), box[:2], self._round_mask(size, radius))
+
+    def shade(self, x, y, w, h, alpha, radius=0, color=(0, 0, 0)):
+        """Blends a translucent rounded box over what is already drawn (rgba(0,0,0,alpha))."""
+        if self.draw is None:
+            return
+        box = self.box(x, y, w, h)
+        region = self.image.crop(box)
+        blended = Image.blend(region, Image.new("RGB", region.size, color), alpha)
+        self.image.paste(blended, box[:2], self._round_mask(region.size, radius))
+
+    def rect(self, x, y, w, h, fill, radius=0):
+        if self.draw is not None:
+            self.draw.rounded_rectangle(self.box(x, y, w, h), radius=self.px(radius), fill=fill)
+
+    def _round_mask(self, size, radius):
+        if not radius:
+            return None
+        mask = Image.new("L", size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle((0, 0, size[0] - 1, size[1] - 1), radius=self.px(radius), fill=255)
+        return mask
+
+
+def _plain(text, bold=False):
+    return [(str(text), bold)]
+
+
+def _draw_flight_header(c, x, y, w, left, price):
+    """'#1 Airline' on the left and the price on the right; returns the height."""
+    left_w = c.runs_width(_plain(left, True), 20.8)
+    price_w = c.runs_width(_plain(price, True), 25.6) if price else 0
+    if price and left_w + price_w + 10 <= w:
+        height = 25.6 * LINE_HEIGHT
+        c.text_line(x, y + (height - 20.8 * LINE_HEIGHT) / 2, c.wrap(_plain(left, True), 20.8, w)[0], 20.8, WHITE)
+        c.text_line(x + w - price_w, y, c.wrap(_plain(price, True), 25.6, w)[0], 25.6, WHITE)
+    else:
+        height = c.paragraph(x, y, w, _plain(left, True), 20.8, WHITE)
+        if price:
+            height += 10 + c.paragraph(x, y + height + 10, w, _plain(price, True), 25.6, WHITE)
+    # Bottom border (1px rgba(255,255,255,0.3)) after 10px padding
+    c.shade(x, y + height + 10, w, 1, 0.3, color=WHITE)
+    return height + 11
+
+
+def _draw_route(c, x, y, w, leg):
+    """Departure and arrival airports with the plane between them; returns the height."""
+    inner_x, inner_w = x + 15, w - 30
+    half = (inner_w - 40) / 2
+    code_h = 19.2 * LINE_HEIGHT
+    name_h = 12.8 * LINE_HEIGHT
+    height = 15 + 10 + code_h + name_h + 10 + 15
+    c.shade(x, y, w, height, 0.2, radius=8)
+    top = y + 15 + 10
+    for col, point in ((0, leg['departure']), (1, leg['arrival'])):
+        col_x = inner_x + col * (half + 40)
+        c.paragraph(col_x, top, half, _plain(point.get('airport', ''), True), 19.2, WHITE, align="center")
+        when = f"{point.get('date', '')} {point.get('time', '')}".strip()
+        c.paragraph(col_x, top + code_h, half, _plain(when), 12.8, WHITE, align="center")
+    c.paragraph(inner_x + half, top + (code_h + name_h - 24 * LINE_HEIGHT) / 2, 40, _plain("✈️"), 24, WHITE,
+                align="center")
+    return height
+
+
+def _draw_details(c, x, y, w, items):
+    """Stacked detail boxes (label over value); returns the height."""
+    cursor = y
+    for label, value in items:
+        label_h = 13.6 * LINE_HEIGHT
+        lines = c.wrap(_plain(value), 15.2, w - 24)
+        box_h = 12 + label_h + 3 + len(lines) * 15.2 * LINE_HEIGHT + 12
+        c.shade(x, cursor, w, box_h, 0.2, radius=8)
+        c.paragraph(x + 12, cursor + 12, w - 24, _plain(label, True), 13.6, WHITE)
+        c.paragraph(x + 12, cursor + 12 + label_h + 3, w - 24, _plain(value), 15.2, WHITE)
+        cursor += box_h + 12
+    return cursor - 12 - y
+
+
+def _draw_comment(c, x, y, w, title, comment):
+    """The AI comment box with markdown paragraphs and bullets; returns the height."""
+    blocks = parse_markdown(comment)
+    inner_x, inner_w = x + 15, w - 30
+
+    def layout(canvas):
+        cursor = y + 15
+        cursor += canvas.paragraph(inner_x, cursor, inner_w, _plain(title, True), 15.2, WHITE) + 10
+        for i, (bullet, runs) in enumerate(blocks):
+            if bullet:
+                canvas.paragraph(inner_x + 4, cursor, 16, _plain(bullet), 14.4, WHITE)
+                cursor += canvas.paragraph(inner_x + 20, cursor, inner_w - 20, runs, 14.4, WHITE) + 3
+            else:
+                cursor += canvas.paragraph(inner_x, cursor, inner_w, runs, 14.4, WHITE)
+                if i < len(blocks) - 1:
+                    cursor += 8
+        return cursor + 15 - y
+
+    height = layout(_Canvas(None, c.scale))
+    c.shade(x, y, w, height, 0.25, radius=10)
+    layout(c)
+    return height
+
+
+def _draw_card(c, x, y, w, colors, header_left, price, leg, details, comment_title=None, comment="",
+               extra_details=()):
+    """One flight card; returns the height including its bottom margin."""
+    def layout(canvas):
+        inner_x, inner_w = x + 20, w - 40
+        cursor = y + 20
+        cursor += _draw_flight_header(canvas, inner_x, cursor, inner_w, header_left, price) + 15
+        cursor += _draw_route(canvas, inner_x, cursor, inner_w, leg) + 15
+        cursor += _draw_details(canvas, inner_x, cursor, inner_w, details)
+        if comment:
+            cursor += 15 + _draw_comment(canvas, inner_x, cursor + 15, inner_w, comment_title, comment)
+        if extra_details:
+            cursor += 15 + _draw_details(canvas, inner_x, cursor + 15, inner_w, extra_details)
+        return cursor + 20 - y
+
+    height = layout(_Canvas(None, c.scale))
+    if c.draw is not None:
+        c.gradient(x, y, w, height, colors, radius=12)
+        layout(c)
+    return height + 20
+
+
+def _one_way_details(flight):
+    items = [("⏱️ 飞行时长", flight.get('duration', '')),
+             ("🔄 中转", flight.get('transfers', {}).get('count_str', ''))]
+    if flight.get('plane_model'):
+        items.append(("✈️ 机型", flight['plane_model']))
+    if flight.get('baggage'):
+        items.append(("🎒 行李", ', '.join(flight['baggage'])))
+    if flight.get('provider_name'):
+        items.append(("🏢 销售商", flight['provider_name']))
+    return items
+
+
+def _leg_details(leg):
+    return [("⏱️ 飞行时长", leg.get('duration', '')),
+            ("🔄 中转", leg.get('transfers', {}).get('count_str', ''))]
+
+
+def _draw_stay_connector(c, x, y, w, stay_duration):
+    """The '🏨 停留 …' pill and arrow between outbound and return cards; returns the height."""
+    text = _plain(f"🏨 停留 {stay_duration}", True)
+    pill_w = min(c.runs_width(text, 15.2) + 40, w)
+    pill_h = 15.2 * LINE_HEIGHT + 20
+    # padding: 10px 0 and margin: -10px 0 10px 0 cancel out at the top
+    c.gradient(x + (w - pill_w) / 2, y, pill_w, pill_h, STAY_GRADIENT, radius=25)
+    c.paragraph(x, y + 10, w, text, 15.2, WHITE, align="center")
+    c.paragraph(x, y + pill_h + 5, w, _plain("⬇️"), 24, (0x7f, 0x8c, 0x8d), align="center")
+    return pill_h + 5 + 24 * LINE_HEIGHT + 10 + 10
+
+
+def _draw_report(c, report):
+    """Lays out the whole report; returns the page height in CSS px."""
+    x = (PAGE_WIDTH - CONTAINER_WIDTH) / 2
+    w = CONTAINER_WIDTH
+    y = BODY_PADDING
+
+    def container(canvas):
+        cursor = y
+        # Header
+        header_h = 20 + 28.8 * LINE_HEIGHT + 5 + 16 * LINE_HEIGHT + 20
+        canvas.gradient(x, cursor, w, header_h, HEADER_GRADIENT)
+        canvas.paragraph(x + 20, cursor + 20, w - 40, _plain("✈️ 航班查询报告"), 28.8, WHITE, align="center")
+        canvas.paragraph(x + 20, cursor + 20 + 28.8 * LINE_HEIGHT + 5, w - 40,
+                         _plain(f"从 {report['origin_airport_name']} 到 {report['destination_airport_name']}"),
+                         16, WHITE, align="center")
+        cursor += header_h
+
+        # Date bar
+        date_h = 12 + 15.2 * LINE_HEIGHT + 12
+        canvas.rect(x, cursor, w, date_h, (0xf8, 0xf9, 0xfa))
+        canvas.rect(x, cursor + date_h - 1, w, 1, (0xde, 0xe2, 0xe6))
+        canvas.paragraph(x, cursor + 12, w, _plain(f"📅 今天是 {report['today_date']}"), 15.2,
+                         (0x49, 0x50, 0x57), align="center")
+        cursor += date_h
+
+        # Flight cards
+        inner_x, inner_w = x + 20, w - 40
+        cursor += 20
+        cursor += canvas.paragraph(inner_x, cursor, inner_w, _plain("🎯 最便宜的三个航班"), 24,
+                                   (0x49, 0x50, 0x57), align="center") + 20
+        for i, flight in enumerate(report['flights']):
+            if report['is_round_trip']:
+                outbound, inbound = flight['outbound'], flight['return']
+                cursor += _draw_card(canvas, inner_x, cursor, inner_w, OUTBOUND_GRADIENT,
+                                     f"#{i + 1} 往路 {outbound['airline']}", flight['price'], outbound,
+                                     _leg_details(outbound), "💡 往路点评", _at(report.get('outbound_comments'), i))
+                cursor += _draw_stay_connector(canvas, inner_x, cursor, inner_w, flight.get('stay_duration', 'N/A'))
+                extra = []
+                if flight.get('baggage'):
+                    extra.append(("🎒 行李", ', '.join(flight['baggage'])))
+                if flight.get('provider_name'):
+                    extra.append(("🏢 销售商", flight['provider_name']))
+                cursor += _draw_card(canvas, inner_x, cursor, inner_w, RETURN_GRADIENT,
+                                     f"復路 {inbound['airline']}", None, inbound,
+                                     _leg_details(inbound), "💡 返程点评", _at(report.get('return_comments'), i),
+                                     extra_details=extra)
+            else:
+                cursor += _draw_card(canvas, inner_x, cursor, inner_w, CARD_GRADIENTS[i % len(CARD_GRADIENTS)],
+                                     f"#{i + 1} {flight['airline']}", flight['price'], flight,
+                                     _one_way_details(flight), "💡 航班点评", _at(report.get('flight_comments'), i))
+        cursor += 20
+
+        # Footer
+        note = [("💡 ", False), ("备注：", True), (f" {report['summary_note']}", False)]
+        note_h = len(canvas.wrap(note, 13.68, w - 40)) * 13.68 * 1.5
+        link = _plain("🌐 点此链接查看详情", True)
+        link_w = canvas.runs_width(link, 12.96) + 40
+        link_h = 12.96 * LINE_HEIGHT + 20
+        footer_h = 20 + note_h + 15 + link_h + 40
+        canvas.rect(x, cursor, w, footer_h, (0x34, 0x3a, 0x40))
+        canvas.paragraph(x + 20, cursor + 20, w - 40, note, 13.68, WHITE, align="center", line_height=1.5)
+        link_y = cursor + 20 + note_h + 15
+        canvas.gradient(x + (w - link_w) / 2, link_y, link_w, link_h, HEADER_GRADIENT, radius=20)
+        canvas.paragraph(x, link_y + 10, w, link, 12.96, WHITE, align="center")
+        cursor += footer_h
+        return cursor
+
+    container_bottom = container(_Canvas(None, c.scale))
+    page_height = container_bottom + 20 + BODY_PADDING
+    if c.draw is not None:
+        # The page background gradient is the canvas itself (see render_report)
+        c.rect(x, y, w, container_bottom - y, WHITE, radius=15)
+        container(c)
+    return page_height
+
+
+def _at(items, index):
+    return items[index] if items and index < len(items) else ""
+
+
+def render_report(report, scale=SCALE):
+    """Draws a report and returns it as an RGB image.
+
+    Args:
+        report: dict with origin_airport_name, destination_airport_name,
+            today_date, flights (top flights), is_round_trip, summary_note and
+            the markdown comments (flight_comments, or outbound_comments and
+            return_comments for round trips)
+        scale: Device pixels per CSS pixel
+    """
+    height = _draw_report(_Canvas(None, scale), report)
+    image = _gradient((int(round(PAGE_WIDTH * scale)), int(round(height * scale))), HEADER_GRADIENT)
+    _draw_report(_Canvas(image, scale), report)
+    return image
+
+
+def render_report_images(report, base_path, config=None):
+    """Renders a report without a browser and saves it with image_encoder.
+
+    Tall reports become several full-resolution pages instead of being
+    downscaled (see save_report_images).
+
+    Returns:
+        List of image paths if successful, None otherwise
+    """
+    try:
+        return save_report_images(render_report(report), base_path, config)
+    except Exception as e:
+        print(f"Error rendering report with Pillow: {type(e).__name__}: {e}")
+        return None
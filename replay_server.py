@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Offline replay of tour.ne.jp result pages.
+
+Serves recorded search pages (debug.html for one-way, flight.html for
+round-trip searches) on the same /w_air/list/ path as the real site, so the
+whole scrape path can run without touching tour.ne.jp:
+
+    python replay_server.py --port 8090 --latency 1.5 --inject-interval 0.5
+    SEARCH_BASE_URL="http://127.0.0.1:8090" python scraper.py
+
+The recorded pages' own scripts are stripped (they would try to reload live
+results). With an inject interval, the flight cards are removed from the
+served document and a small script inserts them a few at a time, so the
+readiness strategies (fixed sleep vs. MutationObserver) see results stream
+in the way they do on the live page.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bs4 import BeautifulSoup
+
+# Recorded page served for each air_type
+DEFAULT_PAGES = {"0": "debug.html", "1": "flight.html"}
+DEFAULT_PORT = 8090
+
+INJECT_SCRIPT = """
+(function () {
+  const cards = %(cards)s;
+  const batchSize = %(batch_size)d;
+  let next = 0;
+  function injectBatch() {
+    for (let i = 0; i < batchSize && next < cards.length; i++, next++) {
+      const slot = document.querySelector('[data-replay-slot="' + next + '"]');
+      const holder = document.createElement('div');
+      holder.innerHTML = cards[next];
+      slot.replaceWith(...holder.childNodes);
+    }
+    if (next < cards.length) setTimeout(injectBatch, %(interval_ms)d);
+  }
+  setTimeout(injectBatch, %(interval_ms)d);
+})();
+"""
+
+
+def build_replay_page(html, inject_interval=0, batch_size=1):
+    """Prepares a recorded page for replay.
+
+    Scripts are always removed. If inject_interval (seconds) is positive,
+    each top-level flight-area card is replaced by an empty slot and
+    re-inserted by INJECT_SCRIPT, batch_size cards every inject_interval.
+
+    Returns:
+        (html, card_count)
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    for script in soup.find_all('script'):
+        script.decompose()
+
+    cards = [el for el in soup.find_all('div', class_='flight-area')
+             if el.find_parent('div', class_='flight-area') is None]
+    if inject_interval <= 0 or not cards:
+        return str(soup), len(cards)
+
+    fragments = []
+    for i, card in enumerate(cards):
+        fragments.append(str(card))
+        card.replace_with(soup.new_tag('div', attrs={"data-replay-slot": str(i)}))
+
+    script = soup.new_tag('script')
+    # "</" must not appear inside an inline script
+    script.string = INJECT_SCRIPT % {
+        "cards": json.dumps(fragments, ensure_ascii=False).replace("</", "<\\/"),
+        "batch_size": max(int(batch_size), 1),
+        "interval_ms": int(inject_interval * 1000),
+    }
+    (soup.body or soup).append(script)
+    return str(soup), len(cards)
+
+
+class ReplayServer:
+    """Threaded HTTP server that answers /w_air/list/ with recorded pages.
+
+    Args:
+        pages: Mapping of air_type to recorded HTML file
+        port: Port to listen on (0 picks a free one)
+        latency: Seconds to wait before answering a search page request
+        inject_interval: Seconds between card batches (0 serves pages as recorded)
+        batch_size: Cards inserted per batch
+    """
+
+    def __init__(self, pages=None, host="127.0.0.1", port=DEFAULT_PORT, latency=0.0,
+                 inject_interval=0.0, batch_size=1):
+        self.latency = latency
+        self.pages = {}
+        self.card_counts = {}
+        for air_type, path in (pages or DEFAULT_PAGES).items():
+            with open(path, 'r', encoding='utf-8') as f:
+                html, count = build_replay_page(f.read(), inject_interval, batch_size)
+            self.pages[air_type] = html.encode('utf-8')
+            self.card_counts[air_type] = count
+        self._lock = threading.Lock()
+        self.stats = {"pages_served": 0, "not_found": 0}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _make_handler(self):
+        replay = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                air_type = parse_qs(parsed.query).get("air_type", ["0"])[0]
+                page = replay.pages.get(air_type)
+                if not parsed.path.startswith("/w_air/list") or page is None:
+                    replay._count("not_found")
+                    self.send_error(404)
+                    return
+                if replay.latency > 0:
+                    time.sleep(replay.latency)
+                replay._count("pages_served")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ReplayHandler
+
+    def start(self):
+        """Serves from a background thread and returns self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded tour.ne.jp result pages for offline scraping.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each page response")
+    parser.add_argument("--inject-interval", type=float, default=0.0,
+                        help="seconds between card batches (0 serves the recorded page as is)")
+    parser.add_argument("--batch-size", type=int, default=2, help="cards inserted per batch")
+    parser.add_argument("--one-way-page", default=DEFAULT_PAGES["0"])
+    parser.add_argument("--round-trip-page", default=DEFAULT_PAGES["1"])
+    args = parser.parse_args()
+
+    server = ReplayServer({"0": args.one_way_page, "1": args.round_trip_page}, args.host, args.port,
+                          args.latency, args.inject_interval, args.batch_size)
+    print(f"Replay server listening on {server.base_url} "
+          f"(cards: {server.card_counts}, latency {args.latency}s, inject every {args.inject_interval}s)")
+    print(f'Point the scraper at it with SEARCH_BASE_URL="{server.base_url}"')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# The scraper only reads the text of `div.flight-area`, so images, fonts,
+# media, ads, trackers and analytics are dead weight. Blocking happens in two
+# layers: Chrome prefs that disable images, and CDP `Network.setBlockedURLs`
+# with wildcard URL patterns for everything else.
+
+# Wildcard patterns (CDP syntax: '*' matches any characters) blocked by default.
+# Extensions end in '*' so that query strings (logo.png?v=3) match too.
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    # Images, fonts and media
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.avif*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.mp4*", "*.webm*", "*.mp3*",
+    # Analytics, tag managers and ads
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*adservice.google.*",
+    "*js.fout.jp*", "*criteo.*", "*yimg.jp/images/listing*", "*yjtag*",
+    "*facebook.net*", "*facebook.com/tr*", "*connect.facebook.*",
+    "*platform.twitter.com*", "*ads-twitter.com*", "*analytics.twitter.com*",
+    "*clarity.ms*", "*hotjar.com*", "*bat.bing.com*", "*tiktok.com*", "*line-scdn.net*",
+    # Embedded maps and videos
+    "*maps.googleapis.com*", "*youtube.com/embed*", "*ytimg.com*",
+]
+
+
+def _split_patterns(value):
+    return [p.strip() for p in (value or "").split(',') if p.strip()]
+
+
+def blocking_enabled(config):
+    return (config.get("RESOURCE_BLOCKING") or "false").lower() == "true"
+
+
+def blocked_url_patterns(config):
+    """Returns the URL patterns to block for this config.
+
+    BLOCKED_URL_PATTERNS (comma-separated) adds patterns to the defaults;
+    ALLOWED_URL_PATTERNS removes patterns, so a default that breaks the page
+    can be switched off without code changes.
+    """
+    patterns = DEFAULT_BLOCKED_URL_PATTERNS + _split_patterns(config.get("BLOCKED_URL_PATTERNS"))
+    allowed = set(_split_patterns(config.get("ALLOWED_URL_PATTERNS")))
+    seen = set()
+    result = []
+    for pattern in patterns:
+        if pattern not in allowed and pattern not in seen:
+            seen.add(pattern)
+            result.append(pattern)
+    return result
+
+
+def apply_blocking_options(chrome_options):
+    """Adds Chrome prefs/flags that stop image loading at the renderer level."""
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.managed_default_content_settings.media_stream": 2,
+    })
+
+
+def enable_request_blocking(driver, patterns):
+    """Blocks matching requests in the driver's current and future pages via CDP."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Redis server, for the distributed work queue.
+
+Speaks the Redis protocol (RESP2) and implements the commands RedisWorkQueue
+uses (lists, hashes, sorted sets and WATCH/MULTI/EXEC transactions) on
+in-memory dicts, so a coordinator and workers can share a queue without
+installing Redis:
+
+    python resp_server.py --port 6390
+    WORK_QUEUE_URL="redis://127.0.0.1:6390/0" python scraper.py worker
+
+Data is not persisted; use a real Redis (or a compatible server) for
+anything that must survive a restart.
+"""
+
+import argparse
+import socketserver
+import threading
+
+DEFAULT_PORT = 6390
+
+
+class SimpleString(str):
+    """A "+OK"-style status reply."""
+
+
+class ReplyError(Exception):
+    """Sent to the client as a "-ERR" reply."""
+
+
+NULL_ARRAY = object()
+
+
+def encode(value):
+    """Encodes a reply value as RESP2."""
+    if value is NULL_ARRAY:
+        return b"*-1\r\n"
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, SimpleString):
+        return f"+{value}\r\n".encode('utf-8')
+    if isinstance(value, ReplyError):
+        return f"-ERR {value}\r\n".encode('utf-8')
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return f":{value}\r\n".encode('utf-8')
+    if isinstance(value, (list, tuple)):
+        return f"*{len(value)}\r\n".encode('utf-8') + b"".join(encode(item) for item in value)
+    data = value if isinstance(value, bytes) else str(value).encode('utf-8')
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def read_command(rfile):
+    """Reads one command (a RESP array of bulk strings, or an inline command).
+
+    Returns:
+        List of str arguments, or None at end of stream
+    """
+    line = rfile.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode('utf-8').split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int(rfile.readline()[1:])
+        args.append(rfile.read(length + 2)[:-2].decode('utf-8'))
+    return args
+
+
+def _score(bound):
+    if bound in ("-inf", "+inf", "inf"):
+        return float(bound.replace("+", ""))
+    return float(bound.lstrip("("))
+
+
+class Zset(dict):
+    """Sorted set value (member -> score)."""
+
+
+class Database:
+    """In-memory keyspace; every command runs under one lock."""
+
+    WRITES = {"RPUSH", "LPOP", "HSET", "HSETNX", "HDEL", "ZADD", "ZREM"}
+
+    def __init__(self):
+        self.data = {}
+        self.versions = {}
+        self.lock = threading.RLock()
+
+    def _get(self, key, kind):
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise ReplyError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _touch(self, *keys):
+        for key in keys:
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _drop_empty(self, key):
+        if key in self.data and not self.data[key]:
+            del self.data[key]
+
+    def version(self, key):
+        return self.versions.get(key, 0)
+
+    def execute(self, args):
+        name = args[0].upper()
+        handler = getattr(self, "cmd_" + name.lower(), None)
+        if handler is None:
+            raise ReplyError(f"unknown command '{args[0]}'")
+        with self.lock:
+            if name == "DEL":
+                self._touch(*args[1:])
+            elif name in self.WRITES and len(args) > 1:
+                self._touch(args[1])
+            return handler(*args[1:])
+
+    # Server
+    def cmd_ping(self, message=None):
+        return SimpleString("PONG") if message is None else message
+
+    def cmd_echo(self, message):
+        return message
+
+    def cmd_select(self, db):
+        return SimpleString("OK")
+
+    def cmd_client(self, *args):
+        return SimpleString("OK")
+
+    def cmd_flushdb(self, *args):
+        self._touch(*self.data)
+        self.data.clear()
+        return SimpleString("OK")
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    # Lists
+    def cmd_rpush(self, key, *values):
+        items = self._get(key, list)
+        if items is None:
+            items = self.data[key] = []
+        items.extend(values)
+        return len(items)
+
+    def cmd_lpop(self, key):
+        items = self._get(key, list)
+        if not items:
+            return None
+        value = items.pop(0)
+        self._drop_empty(key)
+        return value
+
+    def cmd_lindex(self, key, index):
+        items = self._get(key, list) or []
+        index = int(index)
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def cmd_llen(self, key):
+        return len(self._get(key, list) or [])
+
+    def cmd_lrange(self, key, start, stop):
+        items = self._get(key, list) or []
+        stop = int(stop)
+        return items[int(start):None if stop == -1 else stop + 1]
+
+    # Hashes
+    def cmd_hset(self, key, *pairs):
+        fields = self._get(key, dict)
+        if fields is None:
+            fields = self.data[key] = {}
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def cmd_hsetnx(self, key, field, value):
+        if field in (self._get(key, dict) or {}):
+            return 0
+        return self.cmd_hset(key, field, value)
+
+    def cmd_hget(self, key, field):
+        return (self._get(key, dict) or {}).get(field)
+
+    def cmd_hmget(self, key, *fields):
+        values = self._get(key, dict) or {}
+        return [values.get(field) for field in fields]
+
+    def cmd_hdel(self, key, *fields):
+        values = self._get(key, dict) or {}
+        removed = sum(values.pop(field, None) is not None for field in fields)
+        self._drop_empty(key)
+        return removed
+
+    def cmd_hexists(self, key, field):
+        return field in (self._get(key, dict) or {})
+
+    def cmd_hlen(self, key):
+        return len(self._get(key, dict) or {})
+
+    def cmd_hgetall(self, key):
+        return [item for pair in (self._get(key, dict) or {}).items() for item in pair]
+
+    # Sorted sets (dict of member -> score)
+    def cmd_zadd(self, key, *pairs):
+        members = self._get(key, Zset)
+        if members is None:
+            members = self.data[key] = Zset()
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in members
+            members[member] = float(score)
+        return added
+
+    def cmd_zrem(self, key, *members):
+        values = self._get(key, Zset) or {}
+        removed = sum(values.pop(member, None) is not None for member in members)
+        self._drop_empty(key)
+        return removed
+
+    def cmd_zscore(self, key, member):
+        score = (self._get(key, Zset) or {}).get(member)
+        return None if score is None else repr(score)
+
+    def cmd_zcard(self, key):
+        return len(self._get(key, Zset) or {})
+
+    def cmd_zrangebyscore(self, key, low, high, *options):
+        values = self._get(key, Zset) or {}
+        low_value, high_value = _score(low), _score(high)
+        found = []
+        for member, score in sorted(values.items(), key=lambda item: (item[1], item[0])):
+            above = score > low_value if low.startswith("(") else score >= low_value
+            below = score < high_value if high.startswith("(") else score <= high_value
+            if above and below:
+                found.append(member)
+        return found
+
+
+class RespServer:
+    """Threaded TCP server answering Redis-protocol commands from a Database.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.db = Database()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_handler(), bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def _make_handler(self):
+        db = self.db
+
+        class RespHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                watched = {}
+                queued = None
+                while True:
+                    try:
+                        args = read_command(self.rfile)
+                    except (ConnectionError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    if not args:
+                        continue
+                    name = args[0].upper()
+                    try:
+                        if name == "QUIT":
+                            self.wfile.write(encode(SimpleString("OK")))
+                            return
+                        if name == "WATCH":
+                            with db.lock:
+                                watched.update((key, db.version(key)) for key in args[1:])
+                            reply = SimpleString("OK")
+                        elif name == "UNWATCH":
+                            watched.clear()
+                            reply = SimpleString("OK")
+                        elif name == "MULTI":
+                            queued = []
+                            reply = SimpleString("OK")
+                        elif name == "DISCARD":
+                            queued = None
+                            watched.clear()
+                            reply = SimpleString("OK")
+                        elif name == "EXEC":
+                            if queued is None:
+                                raise ReplyError("EXEC without MULTI")
+                            with db.lock:
+                                if any(db.version(key) != version for key, version in watched.items()):
+                                    reply = NULL_ARRAY
+                                else:
+                                    reply = []
+                                    for command in queued:
+                                        try:
+                                            reply.append(db.execute(command))
+                                        except ReplyError as e:
+                                            reply.append(e)
+                            queued = None
+                            watched.clear()
+                        elif queued is not None:
+                            queued.append(args)
+                            reply = SimpleString("QUEUED")
+                        else:
+                            reply = db.execute(args)
+                    except ReplyError as e:
+                        reply = e
+                    except (TypeError, ValueError) as e:
+                        reply = ReplyError(f"wrong arguments for '{args[0]}': {e}")
+                    self.wfile.write(encode(reply))
+
+        return RespHandler
+
+    def start(self):
+        """Serves from a background thread and returns self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a minimal in-memory Redis-protocol server for the work queue.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    server = RespServer(args.host, args.port)
+    print(f"RESP server listening on {server.url}")
+    print(f'Point the coordinator and workers at it with WORK_QUEUE_URL="{server.url}"')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from parser import parse_price
+
+DEFAULT_DB_PATH = 'data/price_history.db'
+
+
+def cell_key(cell):
+    """Returns the stable identity string of a search cell.
+
+    A cell is one (origin, destination, departure date[, return date]) search,
+    e.g. "TYO-SIN-20260101" or "TYO-SIN-20260101-20260110" for round trips.
+    """
+    key = f"{cell['origin']}-{cell['dest']}-{cell['dep_date']}"
+    if cell.get('air_type') == "1" and cell.get('ret_date'):
+        key += f"-{cell['ret_date']}"
+    return key
+
+
+def flight_price(flight):
+    """Returns the integer price of a parsed flight, or None if unknown."""
+    return parse_price(flight.get('price', ''))
+
+
+class ResultStore:
+    """SQLite-backed history of scraped search results.
+
+    Every completed scrape of a cell is recorded as one row in `searches`
+    (with its cheapest price) plus one row per offer in `offers`, so later
+    stages can look at price history and the freshest results per cell.
+    One store may be shared between threads; access is serialised by a lock.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.RLock()
+        self._create_tables()
+
+    def _create_tables(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS searches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cell_key TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                dest TEXT NOT NULL,
+                dep_date TEXT NOT NULL,
+                ret_date TEXT,
+                air_type TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                offer_count INTEGER NOT NULL,
+                min_price INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_searches_cell
+                ON searches (cell_key, scraped_at);
+            CREATE INDEX IF NOT EXISTS idx_searches_route
+                ON searches (origin, dest, dep_date, air_type);
+            CREATE TABLE IF NOT EXISTS offers (
+                search_id INTEGER NOT NULL REFERENCES searches(id),
+                position INTEGER NOT NULL,
+                price INTEGER,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_offers_search ON offers (search_id);
+        """)
+        self.conn.commit()
+
+    def _insert_search(self, cell, flights, scraped_at):
+        prices = [p for p in (flight_price(f) for f in flights) if p is not None]
+        cursor = self.conn.execute(
+            "INSERT INTO searches (cell_key, origin, dest, dep_date, ret_date, air_type,"
+            " scraped_at, offer_count, min_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (cell_key(cell), cell['origin'], cell['dest'], cell['dep_date'],
+             cell.get('ret_date'), cell.get('air_type', "0"), scraped_at,
+             len(flights), min(prices) if prices else None)
+        )
+        search_id = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT INTO offers (search_id, position, price, data) VALUES (?, ?, ?, ?)",
+            [(search_id, i, flight_price(f), json.dumps(f, ensure_ascii=False))
+             for i, f in enumerate(flights)]
+        )
+        return search_id
+
+    def record_search(self, cell, flights, scraped_at=None):
+        """Stores the flights found for a cell and returns the new search id."""
+        with self.lock:
+            scraped_at = time.time() if scraped_at is None else scraped_at
+            search_id = self._insert_search(cell, flights, scraped_at)
+            self.conn.commit()
+            return search_id
+
+    def replace_searches(self, results):
+        """Replaces the offers of earlier searches (e.g. after re-parsing) in one transaction.
+
+        Args:
+            results: Iterable of (cell, flights, scraped_at); a search is
+                matched by cell key and scraped_at, and inserted if missing
+
+        Returns:
+            Number of searches whose offers changed or that were inserted
+        """
+        changed = 0
+        with self.lock:
+            for cell, flights, scraped_at in results:
+                ids = [row[0] for row in self.conn.execute(
+                    "SELECT id FROM searches WHERE cell_key = ? AND scraped_at = ?",
+                    (cell_key(cell), scraped_at)
+                ).fetchall()]
+                if len(ids) == 1:
+                    old = [data for (data,) in self.conn.execute(
+                        "SELECT data FROM offers WHERE search_id = ? ORDER BY position", (ids[0],)
+                    ).fetchall()]
+                    if old == [json.dumps(f, ensure_ascii=False) for f in flights]:
+                        continue
+                for search_id in ids:
+                    self.conn.execute("DELETE FROM offers WHERE search_id = ?", (search_id,))
+                    self.conn.execute("DELETE FROM searches WHERE id = ?", (search_id,))
+                self._insert_search(cell, flights, scraped_at)
+                changed += 1
+            self.conn.commit()
+        return changed
+
+    def price_history(self, key, limit=20):
+        """Returns up to `limit` most recent (scraped_at, min_price) pairs, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT scraped_at, min_price FROM searches WHERE cell_key = ?"
+                " ORDER BY scraped_at DESC LIMIT ?",
+                (key, limit)
+            ).fetchall()
+            return list(reversed(rows))
+
+    def last_scraped_at(self, key):
+        """Returns the timestamp of the latest scrape of a cell, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MAX(scraped_at) FROM searches WHERE cell_key = ?", (key,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def latest_flights(self, key):
+        """Returns (scraped_at, flights) for the latest scrape of a cell, or (None, None)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, scraped_at FROM searches WHERE cell_key = ?"
+                " ORDER BY scraped_at DESC LIMIT 1",
+                (key,)
+            ).fetchone()
+            if not row:
+                return None, None
+            search_id, scraped_at = row
+            offers = self.conn.execute(
+                "SELECT data FROM offers WHERE search_id = ? ORDER BY position", (search_id,)
+            ).fetchall()
+            return scraped_at, [json.loads(data) for (data,) in offers]
+
+    def latest_searches(self, dest=None, air_type=None):
+        """Returns the latest search row per cell as dicts, cheapest first.
+
+        Args:
+            dest: Only cells to this destination if given
+            air_type: Only one-way ("0") or round-trip ("1") cells if given
+        """
+        query = (
+            "SELECT s.cell_key, s.origin, s.dest, s.dep_date, s.ret_date, s.air_type,"
+            " s.scraped_at, s.offer_count, s.min_price FROM searches s"
+            " JOIN (SELECT cell_key, MAX(scraped_at) AS latest FROM searches GROUP BY cell_key) l"
+            " ON s.cell_key = l.cell_key AND s.scraped_at = l.latest"
+            " WHERE s.min_price IS NOT NULL"
+        )
+        params = []
+        if dest:
+            query += " AND s.dest = ?"
+            params.append(dest)
+        if air_type:
+            query += " AND s.air_type = ?"
+            params.append(air_type)
+        query += " ORDER BY s.min_price"
+        columns = ["cell_key", "origin", "dest", "dep_date", "ret_date", "air_type",
+                   "scraped_at", "offer_count", "min_price"]
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self):
+        self.conn.close()
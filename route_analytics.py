@@ -0,0 +1,212 @@
+import os
+import time
+from datetime import datetime
+
+from result_store import ResultStore
+
+# Cross-route "where can I go cheapest" analytics over the result store. The
+# store already reduces every search to its cheapest offer when recording it,
+# so the summary only groups searches: the cheapest current price of every
+# (origin, destination, departure date, trip type) group is kept in a
+# `route_summary` table next to the searches, with the id of the last search
+# folded into it. A run recomputes only the groups scraped since then, in one
+# set-based INSERT ... SELECT, and the report tables are GROUP BY queries over
+# the summary. See bench_route_analytics.py.
+
+DEFAULT_REPORT_PATH = 'data/route_summary.md'
+
+# Rows per report table
+DEFAULT_TOP = 10
+
+AIR_TYPE_NAMES = {"0": "One-way", "1": "Round-trip"}
+
+# Cheapest search of each group among the latest search of every cell; SQLite
+# takes the bare columns of a MIN() aggregate from the row holding the minimum
+GROUP_SELECT = (
+    "SELECT s.origin, s.dest, s.dep_date, s.air_type, s.ret_date, s.cell_key, s.scraped_at,"
+    " MIN(s.min_price), SUM(s.offer_count), COUNT(*) FROM searches s{join}"
+    " WHERE s.min_price IS NOT NULL"
+    " AND s.scraped_at = (SELECT MAX(scraped_at) FROM searches WHERE cell_key = s.cell_key)"
+    " GROUP BY s.origin, s.dest, s.dep_date, s.air_type"
+)
+
+
+class RouteSummary:
+    """Cheapest current offer per (origin, destination, departure date, trip type).
+
+    Only the latest search of each cell counts, so a route's price is what
+    was on sale when it was last scraped. Round-trip cells of the same
+    outbound date (different return dates) are one group.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        with store.lock:
+            store.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS route_summary (
+                    origin TEXT NOT NULL,
+                    dest TEXT NOT NULL,
+                    dep_date TEXT NOT NULL,
+                    air_type TEXT NOT NULL,
+                    ret_date TEXT,
+                    cell_key TEXT NOT NULL,
+                    scraped_at REAL NOT NULL,
+                    min_price INTEGER NOT NULL,
+                    offer_count INTEGER NOT NULL,
+                    cells INTEGER NOT NULL,
+                    PRIMARY KEY (origin, dest, dep_date, air_type)
+                );
+                CREATE TABLE IF NOT EXISTS route_summary_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    last_search_id INTEGER NOT NULL
+                );
+            """)
+            store.conn.commit()
+
+    def last_search_id(self):
+        """Returns the id of the last search folded into the summary, 0 if none."""
+        with self.store.lock:
+            row = self.store.conn.execute("SELECT last_search_id FROM route_summary_state").fetchone()
+            return row[0] if row else 0
+
+    def update(self):
+        """Folds the searches recorded since the last update into the summary.
+
+        The first update, or one where every group changed (e.g. after a
+        re-parse), rebuilds the whole summary.
+
+        Returns:
+            Number of groups recomputed
+        """
+        conn = self.store.conn
+        with self.store.lock:
+            last_id = self.last_search_id()
+            changed = conn.execute(
+                "SELECT DISTINCT origin, dest, dep_date, air_type FROM searches WHERE id > ?", (last_id,)
+            ).fetchall()
+            if not changed:
+                return 0
+            max_id = conn.execute("SELECT MAX(id) FROM searches").fetchone()[0]
+            total = conn.execute("SELECT COUNT(*) FROM route_summary").fetchone()[0]
+            if last_id == 0 or len(changed) >= total:
+                conn.execute("DELETE FROM route_summary")
+                conn.execute("INSERT INTO route_summary " + GROUP_SELECT.format(join=""))
+            else:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS changed_routes"
+                             " (origin TEXT, dest TEXT, dep_date TEXT, air_type TEXT)")
+                conn.execute("DELETE FROM changed_routes")
+                conn.executemany("INSERT INTO changed_routes VALUES (?, ?, ?, ?)", changed)
+                conn.execute("DELETE FROM route_summary WHERE (origin, dest, dep_date, air_type) IN"
+                             " (SELECT origin, dest, dep_date, air_type FROM changed_routes)")
+                conn.execute("INSERT INTO route_summary " + GROUP_SELECT.format(
+                    join=" JOIN changed_routes c ON c.origin = s.origin AND c.dest = s.dest"
+                         " AND c.dep_date = s.dep_date AND c.air_type = s.air_type"))
+            conn.execute("INSERT OR REPLACE INTO route_summary_state (id, last_search_id) VALUES (0, ?)",
+                         (max_id,))
+            conn.commit()
+            return len(changed)
+
+    def _query(self, columns, group_by, order_by, air_type, origins, today, limit):
+        query = (f"SELECT {', '.join(columns)}, MIN(min_price), ret_date, scraped_at, COUNT(*)"
+                 " FROM route_summary WHERE air_type = ? AND dep_date >= ?")
+        params = [air_type, today]
+        if origins:
+            query += f" AND origin IN ({', '.join('?' * len(origins))})"
+            params += list(origins)
+        query += f" GROUP BY {group_by} ORDER BY {order_by} LIMIT ?"
+        params.append(limit)
+        names = list(columns) + ["min_price", "ret_date", "scraped_at", "count"]
+        with self.store.lock:
+            return [dict(zip(names, row)) for row in self.store.conn.execute(query, params).fetchall()]
+
+    def cheapest_destinations(self, air_type="0", origins=None, today=None, limit=DEFAULT_TOP):
+        """Returns the cheapest route of each upcoming departure date, by date.
+
+        Each row has dep_date, origin, dest, min_price, ret_date, scraped_at
+        and count (routes searched for that date).
+        """
+        today = today or datetime.now().strftime("%Y%m%d")
+        return self._query(("dep_date", "origin", "dest"), "dep_date", "dep_date",
+                           air_type, origins, today, limit)
+
+    def cheapest_dates(self, air_type="0", origins=None, today=None, limit=DEFAULT_TOP):
+        """Returns the cheapest upcoming departure date of each route, cheapest first.
+
+        Each row has origin, dest, dep_date, min_price, ret_date, scraped_at
+        and count (dates searched for that route).
+        """
+        today = today or datetime.now().strftime("%Y%m%d")
+        return self._query(("origin", "dest", "dep_date"), "origin, dest", "MIN(min_price), dep_date",
+                           air_type, origins, today, limit)
+
+
+def _format_date(dep_date):
+    return f"{dep_date[:4]}-{dep_date[4:6]}-{dep_date[6:]}"
+
+
+def _format_route(row):
+    route = f"{row['origin']}-{row['dest']}"
+    if row.get('ret_date'):
+        route += f" ⇄{_format_date(row['ret_date'])[5:]}"
+    return route
+
+
+def _format_age(scraped_at, now):
+    hours = (now - scraped_at) / 3600
+    return f"{hours:.0f}h" if hours < 48 else f"{hours / 24:.0f}d"
+
+
+def format_summary(summary, top=DEFAULT_TOP, origins=None, now=None):
+    """Formats the summary as compact Markdown tables, two per trip type.
+
+    Returns:
+        The report text
+    """
+    now = time.time() if now is None else now
+    today = datetime.fromtimestamp(now).strftime("%Y%m%d")
+    lines = [f"# Cheapest routes ({datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M')})"]
+    for air_type, name in AIR_TYPE_NAMES.items():
+        by_date = summary.cheapest_destinations(air_type, origins, today, top)
+        if not by_date:
+            continue
+        lines += ["", f"## {name}: cheapest destination per date", "",
+                  "| Date | Route | Price | Routes | Age |", "|---|---|---:|---:|---:|"]
+        for row in by_date:
+            lines.append(f"| {_format_date(row['dep_date'])} | {_format_route(row)} | {row['min_price']:,}円"
+                         f" | {row['count']} | {_format_age(row['scraped_at'], now)} |")
+        lines += ["", f"## {name}: cheapest date per destination", "",
+                  "| Route | Date | Price | Dates | Age |", "|---|---|---:|---:|---:|"]
+        for row in summary.cheapest_dates(air_type, origins, today, top):
+            lines.append(f"| {_format_route(row)} | {_format_date(row['dep_date'])} | {row['min_price']:,}円"
+                         f" | {row['count']} | {_format_age(row['scraped_at'], now)} |")
+    if len(lines) == 1:
+        lines += ["", "No upcoming results in the store."]
+    return "\n".join(lines) + "\n"
+
+
+def run_route_analytics(config, store=None, report_path=DEFAULT_REPORT_PATH):
+    """Updates the route summary and writes the report (`python scraper.py analytics`).
+
+    Only routes from ROUTE_REPORT_ORIGINS (comma-separated) are listed if set.
+
+    Returns:
+        The report text
+    """
+    own_store = store is None
+    store = store or ResultStore()
+    try:
+        summary = RouteSummary(store)
+        started = time.perf_counter()
+        updated = summary.update()
+        print(f"Route summary: {updated} groups updated in {(time.perf_counter() - started) * 1000:.0f} ms")
+        origins = [code.strip() for code in (config.get("ROUTE_REPORT_ORIGINS") or "").split(",") if code.strip()]
+        report = format_summary(summary, int(config.get("ROUTE_REPORT_TOP") or DEFAULT_TOP), origins)
+    finally:
+        if own_store:
+            store.close()
+    if os.path.dirname(report_path):
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(report)
+    print(report)
+    return report
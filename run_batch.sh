@@ -6,6 +6,10 @@
 # This script runs the air ticket scraper once using Docker Compose.
 # It's designed to be executed daily via crontab.
 #
+# ALTERNATIVE: the daemon service keeps Chrome warm and schedules runs itself
+# (DAEMON_SCHEDULE in .env), so no crontab entry is needed:
+#   docker compose --profile daemon up -d ai-air-ticket-daemon
+#
 # CRONTAB SETUP:
 # Add this script to your crontab to run daily at a specific time.
 # Example: Run every day at 9:00 AM
@@ -0,0 +1,187 @@
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from result_store import cell_key
+
+DEFAULT_STATE_PATH = 'data/scheduler_queue.json'
+
+# Seconds a single cell scrape is assumed to take before we have measured one
+DEFAULT_CELL_SECONDS = 60.0
+
+# Age (hours) at which an observation counts as fully stale, and the cap on
+# the staleness factor so that never-scraped cells don't dominate forever
+STALE_AFTER_HOURS = 24.0
+MAX_STALENESS = 3.0
+
+# Coefficient of variation that counts as "very volatile"
+VOLATILE_CV = 0.1
+
+# Score bonus per run a pending cell has been deferred (starvation guard)
+DEFERRAL_BONUS = 0.25
+
+# Score factor for cells added for a nearby airport (see airport_index.py),
+# so alternatives are scraped after the configured routes they belong to
+NEARBY_WEIGHT = 0.5
+
+
+def days_to_departure(cell, now):
+    """Returns days from `now` (epoch seconds) until the cell's departure date."""
+    departure = datetime.strptime(cell['dep_date'], "%Y%m%d")
+    return (departure.timestamp() - now) / 86400
+
+
+def price_volatility(prices):
+    """Returns a 0..2 volatility factor from a list of observed minimum prices.
+
+    Cells with fewer than two observations get 1.0 so they are explored.
+    """
+    prices = [p for p in prices if p]
+    if len(prices) < 2:
+        return 1.0
+    cv = statistics.pstdev(prices) / statistics.mean(prices)
+    return min(cv / VOLATILE_CV, 2.0)
+
+
+def score_cell(cell, store, now=None):
+    """Scores how valuable it is to scrape a cell right now.
+
+    The score is staleness * (1 + urgency + volatility):
+    - staleness grows with the age of the last observation (0 when just scraped)
+    - urgency grows as departure approaches (1.0 on the day, ~0.5 two weeks out)
+    - volatility is the recent price coefficient of variation, normalised
+
+    Cells for a nearby airport (with "nearby_of") are weighted by NEARBY_WEIGHT.
+
+    Returns None for cells whose departure date has already passed.
+    """
+    now = time.time() if now is None else now
+    days = days_to_departure(cell, now)
+    if days < -1:
+        return None
+
+    key = cell_key(cell)
+    last = store.last_scraped_at(key)
+    if last is None:
+        staleness = MAX_STALENESS
+    else:
+        staleness = min((now - last) / 3600 / STALE_AFTER_HOURS, MAX_STALENESS)
+
+    urgency = 1.0 / (1.0 + max(days, 0) / 14)
+    volatility = price_volatility([p for _, p in store.price_history(key)])
+    score = staleness * (1 + urgency + volatility)
+    return score * NEARBY_WEIGHT if cell.get('nearby_of') else score
+
+
+class CellScheduler:
+    """Orders search cells by score and scrapes them within a time budget.
+
+    Cells that did not fit in the budget (or failed) are written to a JSON
+    queue file together with how many runs they have been deferred, so the
+    next cron invocation picks them up with a small priority bonus.
+    """
+
+    def __init__(self, store, state_path=DEFAULT_STATE_PATH):
+        self.store = store
+        self.state_path = state_path
+        self.pending = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: could not read scheduler queue {self.state_path}: {e}")
+            return {}
+        return {entry['key']: entry for entry in state.get('pending', [])}
+
+    def save_state(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        state = {
+            'updated_at': time.time(),
+            'pending': sorted(self.pending.values(), key=lambda e: -e.get('score', 0)),
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def enqueue(self, cell, boost=0.0):
+        """Adds a cell to the persisted queue, e.g. on an on-demand request."""
+        key = cell_key(cell)
+        entry = self.pending.setdefault(key, {'key': key, 'cell': cell, 'deferred': 0})
+        entry['boost'] = max(entry.get('boost', 0.0), boost)
+        self.save_state()
+
+    def plan(self, cells, now=None):
+        """Returns [(score, cell)] for configured plus queued cells, best first."""
+        now = time.time() if now is None else now
+        candidates = {cell_key(c): c for c in cells}
+        for key, entry in self.pending.items():
+            candidates.setdefault(key, entry['cell'])
+
+        planned = []
+        for key, cell in candidates.items():
+            score = score_cell(cell, self.store, now)
+            if score is None:
+                self.pending.pop(key, None)
+                continue
+            entry = self.pending.get(key, {})
+            score += entry.get('deferred', 0) * DEFERRAL_BONUS + entry.get('boost', 0.0)
+            planned.append((score, cell))
+        planned.sort(key=lambda item: -item[0])
+        return planned
+
+    def run(self, cells, scrape_fn, time_budget=None):
+        """Scrapes cells in priority order until the time budget (seconds) is spent.
+
+        Args:
+            cells: Configured search cells for this run
+            scrape_fn: Callable taking a cell and returning a list of flights,
+                or None if the scrape failed
+            time_budget: Seconds available for this run, None for unlimited
+
+        Returns:
+            List of all flights scraped in this run
+        """
+        planned = self.plan(cells)
+        print(f"Scheduler: {len(planned)} cells planned"
+              + (f", budget {time_budget:.0f}s" if time_budget else ""))
+
+        started = time.time()
+        durations = []
+        all_flights = []
+        for position, (score, cell) in enumerate(planned):
+            key = cell_key(cell)
+            elapsed = time.time() - started
+            estimate = statistics.mean(durations) if durations else DEFAULT_CELL_SECONDS
+            if time_budget is not None and elapsed + estimate > time_budget:
+                print(f"Scheduler: time budget reached, deferring {len(planned) - position} cells")
+                for deferred_score, deferred_cell in planned[position:]:
+                    self._defer(deferred_cell, deferred_score)
+                break
+
+            print(f"Scheduler: scraping {key} (score {score:.2f})")
+            cell_started = time.time()
+            flights = scrape_fn(cell)
+            durations.append(time.time() - cell_started)
+
+            if flights is None:
+                self._defer(cell, score)
+                continue
+            self.pending.pop(key, None)
+            all_flights.extend(flights)
+
+        self.save_state()
+        return all_flights
+
+    def _defer(self, cell, score):
+        key = cell_key(cell)
+        entry = self.pending.setdefault(key, {'key': key, 'cell': cell, 'deferred': 0})
+        entry['deferred'] += 1
+        entry['score'] = score
@@ -1,26 +1,15 @@
 import os
-import os
+import sys
 from dotenv import load_dotenv
 import json
 import time
 import glob
 from datetime import datetime
-import requests
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from parser import parse_flight_data, clean_html
-from telegram_bot import send_telegram_message
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-import base64
-import io
-import markdown
-from PIL import Image
+from instrumentation import stage, cell_tags, start_run, finish_run
+
+# Heavy modules (selenium, BeautifulSoup, Pillow, markdown, requests) are
+# imported by the stage that needs them, so a cache-only or delivery-only
+# run never loads the scraping stack. See bench_startup.py.
 
 def load_config():
     """
@@ -38,7 +27,51 @@ def load_config():
     config['DEPARTURE_DATES'] = os.environ.get('DEPARTURE_DATES')
     config['RETURN_DATES'] = os.environ.get('RETURN_DATES')  # For round trip
     config['AIR_TYPE'] = os.environ.get('AIR_TYPE')
+    config['NEARBY_RADIUS_KM'] = os.environ.get('NEARBY_RADIUS_KM')  # Also search airports this close (0/unset: off)
+    config['NEARBY_MAX_AIRPORTS'] = os.environ.get('NEARBY_MAX_AIRPORTS')  # Per origin/destination
+    config['NEARBY_EXPAND'] = os.environ.get('NEARBY_EXPAND')  # "origin", "destination" or "both"
     config['USE_CACHE'] = os.environ.get('USE_CACHE')
+    config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED')
+    config['WORK_QUEUE_URL'] = os.environ.get('WORK_QUEUE_URL')  # Shared cell queue, e.g. redis://host:6379/0 or data/work_queue.db
+    config['WORK_QUEUE_LEASE_SECONDS'] = os.environ.get('WORK_QUEUE_LEASE_SECONDS')  # Requeue a cell whose worker is silent this long
+    config['WORK_QUEUE_MAX_ATTEMPTS'] = os.environ.get('WORK_QUEUE_MAX_ATTEMPTS')  # Leases per cell before it counts as failed
+    config['WORKER_IDLE_EXIT'] = os.environ.get('WORKER_IDLE_EXIT')  # Seconds without work before a worker exits (unset: never)
+    config['ROUTE_ANALYTICS'] = os.environ.get('ROUTE_ANALYTICS')  # "true" updates the route summary after each scrape
+    config['ROUTE_REPORT_TOP'] = os.environ.get('ROUTE_REPORT_TOP')  # Rows per summary table
+    config['ROUTE_REPORT_ORIGINS'] = os.environ.get('ROUTE_REPORT_ORIGINS')  # Only list these origins, comma-separated
+    config['SCRAPE_TIME_BUDGET'] = os.environ.get('SCRAPE_TIME_BUDGET')  # Seconds per run
+    config['RESUME_WINDOW'] = os.environ.get('RESUME_WINDOW')  # Seconds an interrupted sweep can be resumed (default: 21600, "0": off)
+    config['DAEMON_SCHEDULE'] = os.environ.get('DAEMON_SCHEDULE')  # Cron expressions, ';'-separated
+    config['DAEMON_PORT'] = os.environ.get('DAEMON_PORT')
+    config['API_PORT'] = os.environ.get('API_PORT')
+    config['API_CACHE_MAX_AGE'] = os.environ.get('API_CACHE_MAX_AGE')  # Seconds
+    config['BROWSER_POOL_SIZE'] = os.environ.get('BROWSER_POOL_SIZE')
+    config['BOT_SCRAPES_PER_HOUR'] = os.environ.get('BOT_SCRAPES_PER_HOUR')  # Per chat
+    config['RESOURCE_BLOCKING'] = os.environ.get('RESOURCE_BLOCKING')
+    config['BLOCKED_URL_PATTERNS'] = os.environ.get('BLOCKED_URL_PATTERNS')  # Extra patterns, comma-separated
+    config['ALLOWED_URL_PATTERNS'] = os.environ.get('ALLOWED_URL_PATTERNS')  # Default patterns to unblock
+    config['CAPTURE_MODE'] = os.environ.get('CAPTURE_MODE')  # "dom", "page_source" or "network"
+    config['SEARCH_BASE_URL'] = os.environ.get('SEARCH_BASE_URL')  # e.g. http://127.0.0.1:8090 for replay_server.py
+    config['TRACE_DIR'] = os.environ.get('TRACE_DIR')  # Per-run JSON-lines traces
+    config['METRICS_FILE'] = os.environ.get('METRICS_FILE')  # Prometheus text file
+    config['BROWSER_MAX_RSS_MB'] = os.environ.get('BROWSER_MAX_RSS_MB')  # Restart Chrome above this RSS
+    config['BROWSER_MAX_NAVIGATIONS'] = os.environ.get('BROWSER_MAX_NAVIGATIONS')  # Restart Chrome after N pages
+    config['SCRAPE_WAIT_STRATEGY'] = os.environ.get('SCRAPE_WAIT_STRATEGY')  # "sleep" or "observer"
+    config['SCRAPE_MAX_WAIT'] = os.environ.get('SCRAPE_MAX_WAIT')  # Seconds
+    config['SCRAPE_STABLE_SECONDS'] = os.environ.get('SCRAPE_STABLE_SECONDS')
+    config['SCRAPE_STABLE_TOP_N'] = os.environ.get('SCRAPE_STABLE_TOP_N')
+    config['RENDER_ENGINE'] = os.environ.get('RENDER_ENGINE')  # "chrome" or "pillow"
+    config['DEBUG_REPORT_HTML'] = os.environ.get('DEBUG_REPORT_HTML')  # Also save each report as HTML
+    config['REPORT_IMAGE_FORMAT'] = os.environ.get('REPORT_IMAGE_FORMAT')  # "jpeg", "webp" or "auto"
+    config['REPORT_MAX_KB'] = os.environ.get('REPORT_MAX_KB')  # Size budget per report page
+    config['REPORT_MIN_QUALITY'] = os.environ.get('REPORT_MIN_QUALITY')
+    config['PAGE_ARCHIVE'] = os.environ.get('PAGE_ARCHIVE')  # "true" enables the raw page archive
+    config['PAGE_ARCHIVE_DIR'] = os.environ.get('PAGE_ARCHIVE_DIR')
+    config['PAGE_ARCHIVE_MAX_AGE_DAYS'] = os.environ.get('PAGE_ARCHIVE_MAX_AGE_DAYS')  # Archived pages kept this long ("0" keeps all)
+    config['REPARSE_WORKERS'] = os.environ.get('REPARSE_WORKERS')  # Processes for `scraper.py reparse`
+    config['PARSE_CACHE'] = os.environ.get('PARSE_CACHE')  # "false" parses every card again
+    config['PARSE_CACHE_SIZE'] = os.environ.get('PARSE_CACHE_SIZE')  # Cards kept
+    config['PARSE_CACHE_DB'] = os.environ.get('PARSE_CACHE_DB')  # SQLite file to keep parsed cards across runs
     config['TELEGRAM_BOT_TOKEN'] = os.environ.get('TELEGRAM_BOT_TOKEN')
     config['TELEGRAM_CHAT_ID'] = os.environ.get('TELEGRAM_CHAT_ID')
     
@@ -48,16 +81,21 @@ def load_config():
     return config
 
 def render_html_to_png(html_file_path, png_file_path, config):
-    """Render HTML file to JPG using headless Chrome with mobile optimization.
+    """Render HTML file to report images using headless Chrome with mobile optimization.
 
     Args:
         html_file_path: Path to the HTML file to render
-        png_file_path: Path where the JPG will be saved (note: param name kept for compatibility)
-        config: Configuration dict (not currently used, but kept for compatibility)
+        png_file_path: Output path; its extension is replaced by the encoder's
+            (note: param name kept for compatibility)
+        config: Configuration dict with the REPORT_IMAGE_* settings
 
     Returns:
-        Path to the JPG file if successful, None otherwise
+        List of image paths (one per page) if successful, None otherwise
     """
+    from PIL import Image
+    from image_encoder import save_report_images
+    from chrome_render import create_render_driver
+
     driver = None
     # Temporary PNG path for Selenium screenshot
     temp_png_path = png_file_path.replace('.jpg', '.png').replace('.jpeg', '.png')
@@ -65,32 +103,8 @@ def render_html_to_png(html_file_path, png_file_path, config):
         temp_png_path = png_file_path + '_temp.png'
 
     try:
-        # Setup Chrome options for headless rendering
-        chrome_options = Options()
-
-        # Essential options for Docker and headless environments
-        chrome_options.add_argument("--headless=new")  # Use new headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-extensions")
-
-        # Mobile viewport - 2x resolution for high quality
-        chrome_options.add_argument("--window-size=780,1688")
-        chrome_options.add_argument("--force-device-scale-factor=2")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (iPhone; CPU iPhone OS 14_7_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1")
-
-        # Additional rendering options
-        chrome_options.add_argument("--hide-scrollbars")
-        chrome_options.add_argument("--ignore-certificate-errors")
-        chrome_options.add_argument("--disable-logging")
-        chrome_options.add_argument("--log-level=3")
-        chrome_options.add_argument("--disable-dev-tools")
-
-        # Create driver
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_script_timeout(30)
-        driver.set_page_load_timeout(30)
+        # Headless Chrome with a mobile viewport at 2x (see chrome_render.py)
+        driver = create_render_driver()
 
         # Get absolute path for the HTML file and convert to file:// URL
         abs_html_path = os.path.abspath(html_file_path)
@@ -129,56 +143,36 @@ def render_html_to_png(html_file_path, png_file_path, config):
         time.sleep(0.5)
 
         # Take full page screenshot as PNG (Selenium only supports PNG)
-        driver.save_screenshot(temp_png_path)
+        with stage("screenshot"):
+            driver.save_screenshot(temp_png_path)
 
-        # Convert PNG to JPG with moderate quality
+        # Encode the PNG within the size budget, split into pages if it is too tall
         if os.path.exists(temp_png_path):
-            img = Image.open(temp_png_path)
-            original_width, original_height = img.size
-            print(f"Original image dimensions: {original_width}x{original_height}")
-
-            # Convert to RGB (JPG doesn't support transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Resize if dimensions exceed Telegram's hard limits
-            # Telegram accepts up to 10000px, use 9000px as safety margin
-            MAX_HEIGHT = 9000
-            MAX_WIDTH = 3000
-
-            if original_height > MAX_HEIGHT or original_width > MAX_WIDTH:
-                # Calculate scale factor (use the smaller ratio to fit within bounds)
-                height_ratio = MAX_HEIGHT / original_height
-                width_ratio = MAX_WIDTH / original_width
-                scale = min(height_ratio, width_ratio)
-
-                new_width = int(original_width * scale)
-                new_height = int(original_height * scale)
-                print(f"Resizing image to: {new_width}x{new_height} (scale: {scale:.2f})")
-
-                # Use high-quality resampling
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Save as JPG with moderate quality (sendDocument avoids Telegram compression)
-            img.save(png_file_path, 'JPEG', quality=75, optimize=True)
-
-            # Delete temporary PNG file
-            os.remove(temp_png_path)
-
-        # Verify file was created
-        if os.path.exists(png_file_path) and os.path.getsize(png_file_path) > 0:
-            file_size_kb = os.path.getsize(png_file_path) / 1024
-            print(f"JPG screenshot saved: {png_file_path} ({file_size_kb:.1f} KB)")
-            return png_file_path
-        else:
-            print(f"Error: JPG file was not created or is empty")
-            return None
+            with stage("image_encode"):
+                with Image.open(temp_png_path) as img:
+                    original_width, original_height = img.size
+                    print(f"Original image dimensions: {original_width}x{original_height}")
+
+                    # Flatten transparency onto white (JPG doesn't support it)
+                    if img.mode in ('RGBA', 'LA', 'P'):
+                        img = img.convert('RGBA')
+                        background = Image.new('RGB', img.size, (255, 255, 255))
+                        background.paste(img, mask=img.split()[-1])
+                        img = background
+                    elif img.mode != 'RGB':
+                        img = img.convert('RGB')
+
+                    image_paths = save_report_images(img, os.path.splitext(png_file_path)[0], config)
+
+                # Delete temporary PNG file
+                os.remove(temp_png_path)
+
+            # Verify files were created
+            if image_paths and all(os.path.getsize(path) > 0 for path in image_paths):
+                return image_paths
+
+        print(f"Error: image file was not created or is empty")
+        return None
 
     except Exception as e:
         print(f"Error rendering HTML to JPG: {type(e).__name__}: {e}")
@@ -437,6 +431,7 @@ def normalize_flight_data(flights):
                 'price': flight.get('price', 'N/A'),
                 'trip_type': flight.get('trip_type', 'N/A'),
                 'airline': flight.get('airline', 'N/A'),
+                'flight_code': flight.get('flight_code', 'N/A'),
                 'departure': flight.get('departure', {'date': '', 'time': 'N/A', 'airport': 'N/A'}),
                 'arrival': flight.get('arrival', {'date': '', 'time': 'N/A', 'airport': 'N/A'}),
                 'duration': flight.get('duration', 'N/A'),
@@ -449,8 +444,20 @@ def normalize_flight_data(flights):
     return normalized
 
 
-def generate_report(flights, config, airport_data):
-    """Generates a modern HTML webpage report and renders it as PNG using headless Chrome."""
+def get_render_engine(config):
+    """Returns the configured RENDER_ENGINE: "chrome" (default) or "pillow" (see pillow_renderer.py)."""
+    return ((config or {}).get("RENDER_ENGINE") or "chrome").lower()
+
+def debug_report_html_enabled(config):
+    """Returns True if DEBUG_REPORT_HTML asks for each report to be saved as an HTML file too."""
+    return (config.get('DEBUG_REPORT_HTML') or 'false').lower() == 'true'
+
+def generate_report(flights, config, airport_data=None):
+    """Generates a modern HTML webpage report and renders it as JPG (headless Chrome, or Pillow with RENDER_ENGINE="pillow").
+
+    airport_data (see load_airport_data) may be None, in which case only
+    the report's two airports are looked up in the CSV.
+    """
     if not flights:
         print("No flights to generate a report for.")
         return
@@ -470,84 +477,19 @@ def generate_report(flights, config, airport_data):
         origin_airport_code = top_3_flights[0]['departure']['airport']
         destination_airport_code = top_3_flights[0]['arrival']['airport']
 
+    if airport_data is None:
+        airport_data = load_airport_data(codes={origin_airport_code, destination_airport_code})
     origin_airport_name = airport_data.get(origin_airport_code, origin_airport_code)
     destination_airport_name = airport_data.get(destination_airport_code, destination_airport_code)
 
     today_date = datetime.now().strftime('%Y年 %m月 %d日')
+    report_tags = {"route": f"{origin_airport_code}-{destination_airport_code}"}
 
     # Get the source URL from the first flight in top_3_flights
     report_url = top_3_flights[0].get('source_url', '#')
 
-    # Generate summary and flight comments via LLM
-    if is_round_trip:
-        # Round trip prompt - separate comments for outbound and return
-        prompt_template = """You are a flight analysis assistant. Analyze the round-trip flight data and provide a detailed summary and individual flight comments in Chinese.
-
-DATA:
-```json
-{json_flights_data}
-```
-
-OUTPUT FORMAT (valid JSON only, no markdown):
-```json
-{{
-    "summary_note": "Brief note about the round-trip flights (e.g., self-transfer requirements, best value recommendations, stay duration)",
-    "outbound_comments": [
-        "Comment for outbound flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
-        "Comment for outbound flight 2 in markdown format",
-        "Comment for outbound flight 3 in markdown format"
-    ],
-    "return_comments": [
-        "Comment for return flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
-        "Comment for return flight 2 in markdown format",
-        "Comment for return flight 3 in markdown format"
-    ]
-}}
-```
-
-IMPORTANT: Each flight comment should include:
-- Transfer information (if any): self-transfer or protected transfer
-- What travelers should watch out for: layover time, visa requirements, terminal changes
-- Pros: price, timing, airline quality
-- Cons: long layover, early departure, etc.
-
-Use markdown formatting: **bold**, *italic*, - bullets, numbered lists.
-
-Keep the summary_note concise (under 100 Chinese characters). Keep each flight comment under 150 Chinese characters."""
-    else:
-        # One-way prompt
-        prompt_template = """You are a flight analysis assistant. Analyze the flight data and provide a detailed summary and individual flight comments in Chinese.
-
-DATA:
-```json
-{json_flights_data}
-```
-
-OUTPUT FORMAT (valid JSON only, no markdown):
-```json
-{{
-    "summary_note": "Brief note about the flights (e.g., self-transfer requirements, best value recommendations, price differences)",
-    "flight_comments": [
-        "Comment for flight 1 in markdown format - discuss transfer info, what to watch out for, pros/cons",
-        "Comment for flight 2 in markdown format - discuss transfer info, what to watch out for, pros/cons",
-        "Comment for flight 3 in markdown format - discuss transfer info, what to watch out for, pros/cons"
-    ]
-}}
-```
-
-IMPORTANT: Each flight comment should include:
-- Transfer information (if any): self-transfer or protected transfer
-- What travelers should watch out for: layover time, visa requirements, terminal changes
-- Pros: price, timing, airline quality
-- Cons: long layover, early departure, etc.
-
-Use markdown formatting: **bold**, *italic*, - bullets, numbered lists.
-
-Keep the summary_note concise (under 100 Chinese characters). Keep each flight comment under 150 Chinese characters."""
-
-    prompt = prompt_template.format(
-        json_flights_data=json.dumps(top_3_flights, indent=2, ensure_ascii=False)
-    )
+    # Generate summary and flight comments via LLM (compact table prompt, JSON reply schema; see llm_prompt.py)
+    from llm_prompt import build_request, parse_analysis
 
     api_host = config.get("GEMINI_API_ENDPOINT")
     api_key = config.get("GEMINI_API_KEY")
@@ -555,11 +497,7 @@ Keep the summary_note concise (under 100 Chinese characters). Keep each flight c
 
     url = f"{api_host}/models/{model}:generateContent?key={api_key}"
     headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
+    data = build_request(top_3_flights, is_round_trip)
 
     # Default summary and comments
     summary_note = "以上为最便宜的三个航班选项，请根据个人需求选择。"
@@ -570,18 +508,16 @@ Keep the summary_note concise (under 100 Chinese characters). Keep each flight c
         flight_comments = ["暂无详细信息", "暂无详细信息", "暂无详细信息"]
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
-        result = response.json()
+        if not api_host or not api_key:
+            raise ValueError("GEMINI_API_ENDPOINT or GEMINI_API_KEY not configured")
+        import requests
+        with stage("llm_call", **report_tags):
+            response = requests.post(url, headers=headers, json=data, timeout=60)
+            response.raise_for_status()
+            result = response.json()
         llm_response = result['candidates'][0]['content']['parts'][0]['text']
 
-        # Extract JSON from response
-        if '```json' in llm_response:
-            json_str = llm_response.split('```json')[1].split('```')[0].strip()
-        else:
-            json_str = llm_response.strip()
-
-        summary_data = json.loads(json_str)
+        summary_data = parse_analysis(llm_response, is_round_trip)
         summary_note = summary_data.get('summary_note', summary_note)
 
         if is_round_trip:
@@ -595,91 +531,120 @@ Keep the summary_note concise (under 100 Chinese characters). Keep each flight c
     except Exception as e:
         print(f"LLM analysis failed: {e}, using default summary")
 
-    # Generate flight cards HTML with comments
-    flight_cards_html = ""
-    if is_round_trip:
-        # Round trip cards
-        for i, flight in enumerate(top_3_flights):
-            outbound_comment_md = outbound_comments[i] if i < len(outbound_comments) else ""
-            outbound_comment_html = markdown.markdown(outbound_comment_md) if outbound_comment_md else ""
-            return_comment_md = return_comments[i] if i < len(return_comments) else ""
-            return_comment_html = markdown.markdown(return_comment_md) if return_comment_md else ""
-            flight_cards_html += generate_round_trip_flight_card_html(
-                flight, i, outbound_comment_html, return_comment_html
-            )
-    else:
-        # One-way cards
-        for i, flight in enumerate(top_3_flights):
-            comment_md = flight_comments[i] if i < len(flight_comments) else ""
-            comment_html = markdown.markdown(comment_md) if comment_md else ""
-            flight_cards_html += generate_flight_card_html(flight, i, comment_html)
-
-    # Load HTML template and fill with data
-    template_path = os.path.join(os.path.dirname(__file__), 'template.html')
-    try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            html_template = f.read()
-    except FileNotFoundError:
-        print(f"Error: template.html not found at {template_path}")
-        return
-
-    # Replace placeholders
-    report_html = html_template.format(
-        origin_airport_name=origin_airport_name,
-        destination_airport_name=destination_airport_name,
-        today_date=today_date,
-        flight_cards=flight_cards_html,
-        summary_note=summary_note,
-        report_url=report_url
-    )
+    with stage("template_fill", **report_tags):
+        import markdown
+        # Generate flight cards HTML with comments
+        flight_cards_html = ""
+        if is_round_trip:
+            # Round trip cards
+            for i, flight in enumerate(top_3_flights):
+                outbound_comment_md = outbound_comments[i] if i < len(outbound_comments) else ""
+                outbound_comment_html = markdown.markdown(outbound_comment_md) if outbound_comment_md else ""
+                return_comment_md = return_comments[i] if i < len(return_comments) else ""
+                return_comment_html = markdown.markdown(return_comment_md) if return_comment_md else ""
+                flight_cards_html += generate_round_trip_flight_card_html(
+                    flight, i, outbound_comment_html, return_comment_html
+                )
+        else:
+            # One-way cards
+            for i, flight in enumerate(top_3_flights):
+                comment_md = flight_comments[i] if i < len(flight_comments) else ""
+                comment_html = markdown.markdown(comment_md) if comment_md else ""
+                flight_cards_html += generate_flight_card_html(flight, i, comment_html)
+
+        report_fields = {
+            "origin_airport_name": origin_airport_name,
+            "destination_airport_name": destination_airport_name,
+            "today_date": today_date,
+            "flight_cards": flight_cards_html,
+            "summary_note": summary_note,
+            "report_url": report_url,
+        }
 
     # Save and render
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     html_filename = f"data/flight_report_{origin_airport_code}_{destination_airport_code}_{timestamp}.html"
-    jpg_filename = f"data/flight_report_{origin_airport_code}_{destination_airport_code}_{timestamp}.jpg"
+    image_base = f"data/flight_report_{origin_airport_code}_{destination_airport_code}_{timestamp}"
 
     os.makedirs("data", exist_ok=True)
 
-    with open(html_filename, 'w', encoding='utf-8') as f:
-        f.write(report_html)
+    def save_report_html():
+        # Fill template.html into a standalone file (debugging and the cold render fallback)
+        template_path = os.path.join(os.path.dirname(__file__), 'template.html')
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                html_template = f.read()
+        except FileNotFoundError:
+            print(f"Error: template.html not found at {template_path}")
+            return None
+        with open(html_filename, 'w', encoding='utf-8') as f:
+            f.write(html_template.format(**report_fields))
+        print(f"HTML report saved to: {html_filename}")
+        return html_filename
 
-    print(f"HTML report saved to: {html_filename}")
+    html_path = save_report_html() if debug_report_html_enabled(config) else None
 
     # Check if Telegram is configured
     telegram_token = config.get('TELEGRAM_BOT_TOKEN')
     telegram_chat_id = config.get('TELEGRAM_CHAT_ID')
     telegram_enabled = telegram_token and telegram_chat_id and telegram_token.strip() and telegram_chat_id.strip()
 
-    # Render HTML as JPG using headless Chrome
+    # Render as images: report injected into a warm template tab in headless Chrome, or drawn with Pillow
     try:
-        jpg_path = render_html_to_png(html_filename, jpg_filename, config)
-        if jpg_path:
-            print(f"JPG screenshot saved to: {jpg_path}")
+        with stage("render", **report_tags):
+            if get_render_engine(config) == "pillow":
+                from pillow_renderer import render_report_images
+                report_data = {
+                    "origin_airport_name": origin_airport_name,
+                    "destination_airport_name": destination_airport_name,
+                    "today_date": today_date,
+                    "flights": top_3_flights,
+                    "is_round_trip": is_round_trip,
+                    "summary_note": summary_note,
+                    "report_url": report_url,
+                }
+                if is_round_trip:
+                    report_data.update(outbound_comments=outbound_comments, return_comments=return_comments)
+                else:
+                    report_data["flight_comments"] = flight_comments
+                image_paths = render_report_images(report_data, image_base, config)
+            else:
+                from chrome_render import render_report_warm
+                image_paths = render_report_warm(report_fields, image_base, config)
+                if not image_paths:
+                    print("Warm render failed, rendering the report file in a new browser")
+                    html_path = html_path or save_report_html()
+                    if html_path:
+                        image_paths = render_html_to_png(html_path, f"{image_base}.jpg", config)
+        if image_paths:
+            print(f"Report images saved to: {', '.join(image_paths)}")
 
             if telegram_enabled:
-                # Send JPG to Telegram as document (no compression)
+                # Send each page to Telegram as a document (no compression)
                 from telegram_bot import send_telegram_document
-                filename = f"flight_report_{origin_airport_code}_{destination_airport_code}.jpg"
-                send_telegram_document(jpg_path, config, caption=f"🛫 航班报告: {origin_airport_name} → {destination_airport_name} ({today_date})", filename=filename)
-
-                # Clean up HTML file after successful JPG generation
-                try:
-                    os.remove(html_filename)
-                    print(f"Cleaned up HTML file: {html_filename}")
-                except OSError:
-                    pass
+                caption = f"🛫 航班报告: {origin_airport_name} → {destination_airport_name} ({today_date})"
+                with stage("telegram_upload", **report_tags):
+                    for i, image_path in enumerate(image_paths, 1):
+                        page = f"_p{i}" if len(image_paths) > 1 else ""
+                        filename = f"flight_report_{origin_airport_code}_{destination_airport_code}{page}{os.path.splitext(image_path)[1]}"
+                        page_caption = f"{caption} ({i}/{len(image_paths)})" if len(image_paths) > 1 else caption
+                        send_telegram_document(image_path, config, caption=page_caption, filename=filename)
             else:
                 print("Telegram not configured (TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID missing)")
                 print(f"Report files saved to data folder:")
-                print(f"  - HTML: {html_filename}")
-                print(f"  - JPG:  {jpg_filename}")
+                if html_path:
+                    print(f"  - HTML: {html_path}")
+                for image_path in image_paths:
+                    print(f"  - Image: {image_path}")
         else:
-            print("JPG generation failed, HTML file preserved for debugging")
+            print("Image generation failed" + (f", HTML file preserved for debugging: {html_path}" if html_path else ""))
 
     except Exception as chrome_error:
         print(f"Chrome screenshot failed: {chrome_error}")
-        print(f"HTML file saved to: {html_filename}")
+        if html_path:
+            print(f"HTML file saved to: {html_path}")
         if telegram_enabled:
+            from telegram_bot import send_telegram_message
             text_summary = f"🛫 航班报告: {origin_airport_name} → {destination_airport_name} ({today_date})"
             send_telegram_message(text_summary, config)
 
@@ -708,14 +673,92 @@ def get_flights_from_cache():
         print(f"Could not parse json from file: {e}")
         return None
 
-def scrape_flights(config):
-    """Scrapes flight data from the website."""
+def build_search_cells(config):
+    """Expands the configured destinations and dates into search cells.
+
+    Each cell is a dict with origin, dest, dep_date, ret_date and air_type.
+    With NEARBY_RADIUS_KM set, cells for airports near the origin and/or
+    destination are appended (see airport_index.expand_cells).
+    """
     origin = config.get("ORIGIN")
     destinations = config.get("DESTINATIONS", "").split(',')
     departure_dates = config.get("DEPARTURE_DATES", "").split(',')
     return_dates = config.get("RETURN_DATES", "").split(',') if config.get("RETURN_DATES") else None
     air_type = config.get("AIR_TYPE", "0")
 
+    cells = []
+    for dest in destinations:
+        for i, dep_date in enumerate(departure_dates):
+            ret_date = None
+            # For round trip, we need a return date
+            if air_type == "1":
+                # If return_dates is provided, use corresponding index, otherwise use first return date
+                if return_dates and i < len(return_dates):
+                    ret_date = return_dates[i]
+                elif return_dates:
+                    ret_date = return_dates[0]  # Use first return date for all
+                else:
+                    # Default: use same date list for return (assume paired)
+                    ret_date = dep_date  # This shouldn't happen, but fallback
+            cells.append({
+                "origin": origin,
+                "dest": dest,
+                "dep_date": dep_date,
+                "ret_date": ret_date,
+                "air_type": air_type,
+            })
+    if config.get("NEARBY_RADIUS_KM"):
+        from airport_index import expand_cells
+        cells = expand_cells(cells, config)
+    return cells
+
+DEFAULT_SEARCH_BASE_URL = "https://www.tour.ne.jp"
+
+def build_search_url(cell, base_url=None):
+    """Builds the tour.ne.jp search URL for a search cell.
+
+    base_url replaces the scheme and host, e.g. to point at replay_server.py.
+    """
+    origin, dest, dep_date = cell["origin"], cell["dest"], cell["dep_date"]
+    if cell["air_type"] == "1":
+        # Round trip URL format (dates in dpt_date, NOT in slice_info)
+        # ?dpt_airport=|DEST&dst_airport=DEST|&slice_info=ORIG-air.DEST|air.DEST-ORIG#dpt_date=DEP|RET
+        dpt_airport = f"|{dest}"
+        dst_airport = f"{dest}|"
+        slice_info = f"{origin}-air.{dest}|air.{dest}-{origin}"
+        dpt_date_param = f"{dep_date}|{cell['ret_date']}"
+    else:
+        # One-way URL format
+        dpt_airport = ""
+        dst_airport = ""
+        slice_info = f"{origin}-{dest}"
+        dpt_date_param = dep_date
+
+    base_url = (base_url or DEFAULT_SEARCH_BASE_URL).rstrip('/')
+    url = f"{base_url}/w_air/list/?air_type={cell['air_type']}"
+    if dpt_airport:
+        url += f"&dpt_airport={dpt_airport}"
+    if dst_airport:
+        url += f"&dst_airport={dst_airport}"
+    url += f"&slice_info={slice_info}#dpt_date={dpt_date_param}&page_from=index"
+    return url
+
+def create_scrape_driver(config=None, performance_logging=False):
+    """Launches the headless Chrome used for scraping tour.ne.jp.
+
+    With RESOURCE_BLOCKING="true", images are disabled and ads, trackers,
+    fonts and media are blocked via CDP (see resource_blocking.py).
+
+    Args:
+        config: Configuration dict
+        performance_logging: Record CDP network events, readable with
+            driver.get_log("performance")
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from resource_blocking import blocking_enabled, blocked_url_patterns, apply_blocking_options, enable_request_blocking
+
+    config = config or {}
     chrome_options = Options()
     # 1. Essential for Docker and Headless environments
     chrome_options.add_argument("--headless")
@@ -731,93 +774,356 @@ def scrape_flights(config):
     chrome_options.add_argument("--enable-logging")
     chrome_options.add_argument("--v=1")
 
+    # Network capture mode reads response bodies from the performance log
+    if performance_logging or get_capture_mode(config) == "network":
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    use_blocking = blocking_enabled(config)
+    if use_blocking:
+        apply_blocking_options(chrome_options)
+
+    with stage("browser_launch"):
+        driver = webdriver.Chrome(options=chrome_options)
+    if use_blocking:
+        enable_request_blocking(driver, blocked_url_patterns(config))
+    return driver
+
+def save_cell_results(cell, flights):
+    """Writes a cell's flights to a markdown cache file in data/."""
+    origin, dest, dep_date, ret_date = cell["origin"], cell["dest"], cell["dep_date"], cell["ret_date"]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # For round trip, include return date in filename
+    if cell["air_type"] == "1":
+        filename = f"data/{origin}-{dest}-{dep_date}_to_{ret_date}-{timestamp}.md"
+    else:
+        filename = f"data/{origin}-{dest}-{dep_date}-{timestamp}.md"
+    os.makedirs("data", exist_ok=True)
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        if cell["air_type"] == "1":
+            f.write(f"# Flight Search Results for {origin} to {dest}\nDeparture: {dep_date}, Return: {ret_date}\n\n")
+        else:
+            f.write(f"# Flight Search Results for {origin} to {dest} on {dep_date}\n\n")
+        f.write("```json\n")
+        f.write(json.dumps(flights, indent=2, ensure_ascii=False))
+        f.write("\n```\n")
+
+    print(f"Saved {len(flights)} flight results to {filename}")
+
+def get_capture_mode(config):
+    """Returns the configured CAPTURE_MODE.
+
+    - "dom" (default): extract only the flight-area cards in the browser
+    - "page_source": serialise and parse the whole document
+    - "network": decode fare JSON responses, falling back to "dom"
+    """
+    return ((config or {}).get("CAPTURE_MODE") or "dom").lower()
+
+def get_wait_strategy(config):
+    """Returns the configured SCRAPE_WAIT_STRATEGY.
+
+    - "sleep" (default): wait SCRAPE_MAX_WAIT seconds, then read the page once
+    - "observer": parse cards as they render and stop as soon as the
+      cheapest SCRAPE_STABLE_TOP_N offers are unchanged for
+      SCRAPE_STABLE_SECONDS (see page_extract.collect_cards_until_stable)
+    """
+    return ((config or {}).get("SCRAPE_WAIT_STRATEGY") or "sleep").lower()
+
+def read_page_html(driver, capture_mode):
+    """Returns (html, fragments) to parse for the current page.
+
+    Unless capture_mode is "page_source", only the flight-area fragments are
+    pulled from the browser, which is an order of magnitude less data than
+    driver.page_source. Falls back to page_source (with fragments None) if
+    no card is found.
+    """
+    from page_extract import extract_flight_area_html, fragments_to_html
+
+    if capture_mode != "page_source":
+        fragments = extract_flight_area_html(driver)
+        if fragments:
+            return fragments_to_html(fragments), fragments
+    return driver.page_source, None
+
+def scrape_cell(driver, cell, store=None, config=None, on_batch=None, timings=None, archive=None,
+                cache_file=True):
+    """Scrapes a single search cell with an already running driver.
+
+    With CAPTURE_MODE="network", offers are decoded from the page's JSON
+    responses (see network_capture.py) and the rendered DOM is only parsed
+    when no recognisable fare payload was captured. See get_capture_mode.
+    With SCRAPE_WAIT_STRATEGY="observer", on_batch (if given) receives each
+    batch of flights as soon as its cards have rendered. If timings is a
+    dict, the seconds spent in each stage (see instrumentation.py) are
+    stored in it. Cards seen before are not parsed again unless
+    PARSE_CACHE="false" (see parse_cache.py). If archive (a PageArchive)
+    is given, the page's HTML is archived for later re-parsing, even when
+    no flight was found. Offers of the same itinerary from several
+    providers are merged into the cheapest (see offer_dedup.py). The
+    markdown cache file in data/ is skipped with cache_file=False.
+
+    Returns:
+        List of flights (possibly empty), or None if the scrape failed
+    """
+    from bs4 import BeautifulSoup
+    from parser import parse_flight_data, clean_html
+    from page_extract import collect_cards_until_stable, parse_cards
+    from parse_cache import get_parse_cache
+    from network_capture import collect_json_responses, decode_offers
+    from offer_dedup import dedupe_offers
+
+    config = config or {}
+    capture_mode = get_capture_mode(config)
+    parse_cache = get_parse_cache(config)
+    wait_strategy = get_wait_strategy(config)
+    max_wait = float(config.get("SCRAPE_MAX_WAIT") or 55)
+    if cell["air_type"] == "1":
+        print(f"Scraping round trip: {cell['origin']} -> {cell['dest']} on {cell['dep_date']}, returning on {cell['ret_date']}...")
+    else:
+        print(f"Scraping for {cell['origin']} -> {cell['dest']} on {cell['dep_date']}...")
+
+    url = build_search_url(cell, config.get("SEARCH_BASE_URL"))
+    tags = cell_tags(cell)
+    try:
+        if capture_mode == "network":
+            # Drop log entries from earlier pages
+            driver.get_log("performance")
+        with stage("navigate", timings, **tags):
+            driver.get(url)
+
+        # WebDriverWait is disabled , it will crash in docker
+        # WebDriverWait(driver, 240).until(
+        #     EC.presence_of_element_located((By.CLASS_NAME, "flight-area"))
+        # )
+        observed = None
+        with stage("wait", timings, **tags):
+            if wait_strategy == "observer":
+                observed = collect_cards_until_stable(
+                    driver, cell["air_type"], max_wait=max_wait,
+                    stable_seconds=float(config.get("SCRAPE_STABLE_SECONDS") or 8),
+                    top_n=int(config.get("SCRAPE_STABLE_TOP_N") or 3),
+                    on_batch=on_batch, cache=parse_cache,
+                )
+            else:
+                time.sleep(max_wait)
+
+        flights = None
+        if capture_mode == "network":
+            with stage("network_decode", timings, **tags):
+                flights = decode_offers(collect_json_responses(driver), cell["air_type"])
+            if flights is None:
+                print("Fare payload not recognised in network responses, falling back to DOM parsing")
+
+        if flights is None and observed:
+            flights = observed
+
+        html_content, fragments = None, None
+        if flights is None or archive is not None:
+            with stage("page_source", timings, **tags):
+                html_content, fragments = read_page_html(driver, capture_mode)
+        if flights is None and fragments and parse_cache is not None:
+            with stage("parse", timings, **tags):
+                flights = parse_cards(fragments, cell["air_type"], parse_cache)
+        if flights is None:
+            with stage("clean_html", timings, **tags):
+                cleaned_html = clean_html(html_content)
+            with stage("parse", timings, **tags):
+                soup = BeautifulSoup(cleaned_html, 'lxml')
+                flights = parse_flight_data(soup, cell["air_type"])
+
+        scraped_at = time.time()
+        if archive is not None and html_content:
+            with stage("archive", timings, **tags):
+                archive.save(cell, html_content, url, scraped_at)
+
+        if not flights:
+            print("No flight data found.")
+            # Recorded anyway, so the scheduler and the search cache see the cell as fresh
+            if store is not None:
+                with stage("save", timings, **tags):
+                    store.record_search(cell, [], scraped_at)
+            return []
+        with stage("dedup", timings, **tags):
+            offers = len(flights)
+            flights = dedupe_offers(flights)
+        if len(flights) < offers:
+            print(f"Merged {offers - len(flights)} duplicate offers from other providers ({len(flights)} itineraries)")
+        for flight in flights:
+            flight['source_url'] = url
+
+        with stage("save", timings, **tags):
+            if cache_file:
+                save_cell_results(cell, flights)
+            if store is not None:
+                store.record_search(cell, flights, scraped_at)
+        return flights
+
+    except Exception as e:
+        print(f"An error occurred while scraping {url}: {e}")
+        return None
+
+# Driver recycling limits (the container runs with shm_size 2gb)
+DEFAULT_BROWSER_MAX_RSS_MB = 1500
+DEFAULT_BROWSER_MAX_NAVIGATIONS = 50
+
+def create_watchdog(config, driver=None):
+    """Returns a DriverWatchdog for the scraping browser with the configured limits."""
+    from browser_pool import DriverWatchdog
+    return DriverWatchdog(
+        lambda: create_scrape_driver(config), driver=driver,
+        max_rss_mb=float(config.get("BROWSER_MAX_RSS_MB") or DEFAULT_BROWSER_MAX_RSS_MB),
+        max_navigations=int(config.get("BROWSER_MAX_NAVIGATIONS") or DEFAULT_BROWSER_MAX_NAVIGATIONS),
+    )
+
+def scrape_flights(config, driver=None):
+    """Scrapes flight data from the website.
+
+    With SCHEDULER_ENABLED="true", cells are scraped in priority order
+    (see scheduler.py) within SCRAPE_TIME_BUDGET seconds; otherwise every
+    configured cell is scraped in order. The browser is restarted when it
+    exceeds BROWSER_MAX_RSS_MB or BROWSER_MAX_NAVIGATIONS, and a failed
+    cell is retried once on a fresh browser (see DriverWatchdog). With
+    PAGE_ARCHIVE="true", pages are archived for re-parsing. Progress is
+    checkpointed per cell, so rerunning an interrupted sweep within
+    RESUME_WINDOW seconds only scrapes the cells that are left (see
+    checkpoint.py).
+
+    Args:
+        config: Configuration dict
+        driver: Already running WebDriver to reuse (e.g. from the daemon's
+            browser pool); a new one is launched and closed if None
+    """
+    from result_store import ResultStore
+    from scheduler import CellScheduler
+    from parse_cache import get_parse_cache
+    from page_archive import open_page_archive
+    from offer_dedup import dedupe_offers
+    from work_queue import open_work_queue, run_coordinator, DEFAULT_LEASE_SECONDS
+    from checkpoint import open_checkpoint
+
+    cells = build_search_cells(config)
+    store = ResultStore()
+    checkpoint = open_checkpoint(cells, config)
+    resumed_flights = []
+    if checkpoint is not None and checkpoint.resumed:
+        # Cells done before the interruption come from the store
+        resumed_flights = checkpoint.resumed_flights(store)
+        cells = checkpoint.remaining(cells)
+    archive = open_page_archive(config)
+    use_scheduler = (config.get("SCHEDULER_ENABLED") or "false").lower() == "true"
+    time_budget = float(config["SCRAPE_TIME_BUDGET"]) if config.get("SCRAPE_TIME_BUDGET") else None
+
+    watchdog = create_watchdog(config, driver)
+    queue = open_work_queue(config)
+
+    def scrape(cell):
+        flights = watchdog.run(lambda d: scrape_cell(d, cell, store, config, archive=archive))
+        if flights is not None and checkpoint is not None:
+            checkpoint.complete(cell)
+        return flights
+
     all_flights = []
-    with webdriver.Chrome(options=chrome_options) as driver:
-        for dest in destinations:
-            for i, dep_date in enumerate(departure_dates):
-                # For round trip, we need a return date
-                if air_type == "1":
-                    # If return_dates is provided, use corresponding index, otherwise use first return date
-                    if return_dates and i < len(return_dates):
-                        ret_date = return_dates[i]
-                    elif return_dates:
-                        ret_date = return_dates[0]  # Use first return date for all
-                    else:
-                        # Default: use same date list for return (assume paired)
-                        ret_date = dep_date  # This shouldn't happen, but fallback
-
-                    # Round trip URL format (dates in dpt_date, NOT in slice_info)
-                    # ?dpt_airport=|DEST&dst_airport=DEST|&slice_info=ORIG-air.DEST|air.DEST-ORIG#dpt_date=DEP|RET
-                    dpt_airport = f"|{dest}"
-                    dst_airport = f"{dest}|"
-                    slice_info = f"{origin}-air.{dest}|air.{dest}-{origin}"
-                    dpt_date_param = f"{dep_date}|{ret_date}"
-                    print(f"Scraping round trip: {origin} -> {dest} on {dep_date}, returning on {ret_date}...")
-                else:
-                    # One-way URL format
-                    dpt_airport = ""
-                    dst_airport = ""
-                    slice_info = f"{origin}-{dest}"
-                    dpt_date_param = dep_date
-                    print(f"Scraping for {origin} -> {dest} on {dep_date}...")
-
-                # Build URL
-                url = f"https://www.tour.ne.jp/w_air/list/?air_type={air_type}"
-                if dpt_airport:
-                    url += f"&dpt_airport={dpt_airport}"
-                if dst_airport:
-                    url += f"&dst_airport={dst_airport}"
-                url += f"&slice_info={slice_info}#dpt_date={dpt_date_param}&page_from=index"
-
-                driver.get(url)
-
-                try:
-                    # WebDriverWait is disabled , it will crash in docker
-                    # WebDriverWait(driver, 240).until(
-                    #     EC.presence_of_element_located((By.CLASS_NAME, "flight-area"))
-                    # )
-                    time.sleep(55)
-
-                    html_content = driver.page_source
-                    cleaned_html = clean_html(html_content)
-
-                    soup = BeautifulSoup(cleaned_html, 'lxml')
-                    flights = parse_flight_data(soup, air_type)
-
-                    if not flights:
-                        print("No flight data found.")
-                        continue
-                    for flight in flights:
-                        flight['source_url'] = url
+    try:
+        if queue is not None:
+            # Cells scraped by workers are recorded here when their results come back
+            def record(cell, flights, scraped_at):
+                record_queued_result(store, cell, flights, scraped_at)
+                if checkpoint is not None:
+                    checkpoint.complete(cell, scraped_at)
+
+            if use_scheduler:
+                cells = [cell for _, cell in CellScheduler(store).plan(cells)]
+            all_flights = run_coordinator(queue, cells, scrape, record,
+                                          float(config.get("WORK_QUEUE_LEASE_SECONDS") or DEFAULT_LEASE_SECONDS),
+                                          time_budget)
+        elif use_scheduler:
+            scheduler = CellScheduler(store)
+            all_flights = scheduler.run(cells, scrape, time_budget)
+        else:
+            for cell in cells:
+                flights = scrape(cell)
+                if flights:
                     all_flights.extend(flights)
+    finally:
+        watchdog.close()
+        store.close()
+        if queue is not None:
+            queue.close()
+    if checkpoint is not None:
+        checkpoint.finish()
+    print(f"Browser watchdog: {watchdog.stats}")
+    parse_cache = get_parse_cache(config)
+    if parse_cache is not None:
+        print(f"Parse cache: {parse_cache.stats}")
+    # Nearby-airport cells can find the same itinerary as the cell they came from
+    return dedupe_offers(resumed_flights + all_flights)
+
+def scrape_queued_cell(driver, cell, config, archive=None):
+    """Scrapes a cell for the work queue.
+
+    Nothing is written to data/: the coordinator stores the result and
+    writes the cache file (see record_queued_result), so a cell is saved
+    once even when workers share the coordinator's data/ directory.
+    """
+    return scrape_cell(driver, cell, None, config, archive=archive, cache_file=False)
+
+
+def record_queued_result(store, cell, flights, scraped_at):
+    """Stores a cell a worker scraped: its cache file (if it found flights) and its search."""
+    if flights:
+        save_cell_results(cell, flights)
+    store.record_search(cell, flights, scraped_at)
+
 
-                    # Save results
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    # For round trip, include return date in filename
-                    if air_type == "1":
-                        filename = f"data/{origin}-{dest}-{dep_date}_to_{ret_date}-{timestamp}.md"
-                    else:
-                        filename = f"data/{origin}-{dest}-{dep_date}-{timestamp}.md"
-                    os.makedirs("data", exist_ok=True)
-
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        if air_type == "1":
-                            f.write(f"# Flight Search Results for {origin} to {dest}\nDeparture: {dep_date}, Return: {ret_date}\n\n")
-                        else:
-                            f.write(f"# Flight Search Results for {origin} to {dest} on {dep_date}\n\n")
-                        f.write("```json\n")
-                        f.write(json.dumps(flights, indent=2, ensure_ascii=False))
-                        f.write("\n```\n")
-
-                    print(f"Saved {len(flights)} flight results to {filename}")
-
-                except Exception as e:
-                    print(f"An error occurred while scraping {url}: {e}")
-    return all_flights
-
-def load_airport_data(file_path='iata-icao.csv'):
-    """Loads airport data from the CSV file."""
+def run_scrape_worker(config):
+    """Scrapes cells from the WORK_QUEUE_URL queue until SIGTERM/SIGINT (`python scraper.py worker`).
+
+    With WORKER_IDLE_EXIT set, the worker also stops after that many
+    seconds without a queued cell.
+    """
+    import signal
+    import threading
+    from page_archive import open_page_archive
+    from work_queue import open_work_queue, run_worker, DEFAULT_LEASE_SECONDS
+
+    queue = open_work_queue(config)
+    if queue is None:
+        print("Error: WORK_QUEUE_URL is not set.")
+        return
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping after the current cell...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    archive = open_page_archive(config)
+    watchdog = create_watchdog(config)
+    idle_exit = float(config["WORKER_IDLE_EXIT"]) if config.get("WORKER_IDLE_EXIT") else None
+    try:
+        run_worker(queue, lambda cell: watchdog.run(lambda d: scrape_queued_cell(d, cell, config, archive)),
+                   lease_seconds=float(config.get("WORK_QUEUE_LEASE_SECONDS") or DEFAULT_LEASE_SECONDS),
+                   idle_exit=idle_exit, stop_event=stop_event)
+    finally:
+        watchdog.close()
+        queue.close()
+    print(f"Browser watchdog: {watchdog.stats}")
+
+def load_airport_data(file_path='iata-icao.csv', codes=None):
+    """Loads airport data from the CSV file.
+
+    Args:
+        file_path: CSV with the IATA code and airport name in columns 3 and 5
+        codes: Optional IATA codes to look up; reading stops once all are
+            found (a report needs two names, not all ~9000)
+
+    Returns:
+        dict of IATA code -> airport name
+    """
     airport_data = {}
+    wanted = set(codes) if codes is not None else None
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             # Skip header
@@ -827,26 +1133,70 @@ def load_airport_data(file_path='iata-icao.csv'):
                 if len(parts) >= 5:
                     iata = parts[2].strip().strip('\"')
                     airport_name = parts[4].strip().strip('\"')
-                    if iata:
+                    if iata and (wanted is None or iata in wanted):
                         airport_data[iata] = airport_name
+                        if wanted is not None and len(airport_data) == len(wanted):
+                            break
     except FileNotFoundError:
         print("Warning: iata-icao.csv file not found.")
     return airport_data
 
+def run_search(config, driver=None, airport_data=None):
+    """Runs one search: scrape (or read the cache) and generate the report.
+
+    Args:
+        config: Configuration dict
+        driver: Optional warm WebDriver to scrape with
+        airport_data: Optional preloaded airport names (see load_airport_data);
+            otherwise only the report's airports are read from the CSV
+
+    Returns:
+        The list of flights found
+    """
+    use_cache = (config.get("USE_CACHE") or "false").lower() == "true"
+
+    start_run(config, origin=config.get("ORIGIN"), destinations=config.get("DESTINATIONS"))
+    try:
+        flights = None
+        if use_cache:
+            flights = get_flights_from_cache()
+        else:
+            with stage("scrape_total"):
+                flights = scrape_flights(config, driver)
+            if (config.get("ROUTE_ANALYTICS") or "false").lower() == "true":
+                from route_analytics import run_route_analytics
+                with stage("route_analytics"):
+                    run_route_analytics(config)
+
+        if flights:
+            with stage("report_total"):
+                generate_report(flights, config, airport_data)
+        return flights
+    finally:
+        finish_run(config)
+
 def main():
     """Main function to process flight data."""
     config = load_config()
-    use_cache = config.get("USE_CACHE", "false").lower() == "true"
-
-    flights = None
-    if use_cache:
-        flights = get_flights_from_cache()
-    else:
-        flights = scrape_flights(config)
-
-    if flights:
-        airport_data = load_airport_data()
-        generate_report(flights, config, airport_data)
+    run_search(config)
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        from daemon import run_daemon
+        run_daemon(load_config())
+    elif len(sys.argv) > 1 and sys.argv[1] == "api":
+        from api_server import run_api_server
+        run_api_server(load_config())
+    elif len(sys.argv) > 1 and sys.argv[1] == "bot":
+        from telegram_commands import run_telegram_bot
+        run_telegram_bot(load_config())
+    elif len(sys.argv) > 1 and sys.argv[1] == "reparse":
+        from page_archive import run_reparse
+        run_reparse(load_config())
+    elif len(sys.argv) > 1 and sys.argv[1] == "worker":
+        run_scrape_worker(load_config())
+    elif len(sys.argv) > 1 and sys.argv[1] == "analytics":
+        from route_analytics import run_route_analytics
+        run_route_analytics(load_config())
+    else:
+        main()
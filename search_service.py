@@ -0,0 +1,122 @@
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from page_archive import PageArchive, DEFAULT_ARCHIVE_DIR, archive_enabled
+from result_store import cell_key
+from scraper import scrape_cell
+
+# Results younger than this (seconds) are served from the store
+DEFAULT_MAX_AGE = 3600
+
+# Seconds a caller waits for a queued or running scrape
+DEFAULT_WAIT_TIMEOUT = 600
+
+AIRPORT_CODE_RE = re.compile(r"^[A-Z]{3}$")
+DATE_RE = re.compile(r"^\d{8}$")
+
+
+def build_cell(origin, dest, dep_date, ret_date=None, air_type="0"):
+    """Validates search parameters and returns a search cell dict.
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    origin = (origin or "").strip().upper()
+    dest = (dest or "").strip().upper()
+    air_type = str(air_type or "0")
+    if not AIRPORT_CODE_RE.match(origin) or not AIRPORT_CODE_RE.match(dest):
+        raise ValueError("origin and dest must be 3-letter airport or city codes")
+    if not DATE_RE.match(dep_date or ""):
+        raise ValueError("dep_date must be YYYYMMDD")
+    if air_type not in ("0", "1"):
+        raise ValueError("air_type must be 0 (one-way) or 1 (round-trip)")
+    if air_type == "1":
+        if not DATE_RE.match(ret_date or ""):
+            raise ValueError("ret_date (YYYYMMDD) is required for round trips")
+    else:
+        ret_date = None
+    return {"origin": origin, "dest": dest, "dep_date": dep_date, "ret_date": ret_date, "air_type": air_type}
+
+
+class SearchService:
+    """Answers searches from the result store, scraping only when results are stale.
+
+    Concurrent requests for the same cell are coalesced into one scrape
+    (single-flight): the first caller starts it and later callers wait on the
+    same future. Scrapes are queued onto a thread pool sized to the browser
+    pool, so at most `pool.size` Chrome instances are ever busy.
+    """
+
+    def __init__(self, store, pool, max_age=DEFAULT_MAX_AGE, config=None):
+        self.store = store
+        self.config = config
+        self.pool = pool
+        self.max_age = max_age
+        self.archive = PageArchive((config or {}).get("PAGE_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR) \
+            if archive_enabled(config) else None
+        self._executor = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"cache_hits": 0, "scrapes": 0, "coalesced": 0}
+
+    def cached(self, cell, max_age=None):
+        """Returns (scraped_at, flights) if the store holds fresh results, else (None, None)."""
+        max_age = self.max_age if max_age is None else max_age
+        scraped_at, flights = self.store.latest_flights(cell_key(cell))
+        if scraped_at is None or time.time() - scraped_at > max_age:
+            return None, None
+        return scraped_at, flights
+
+    def submit(self, cell):
+        """Starts (or joins) a scrape of the cell and returns (future, coalesced)."""
+        key = cell_key(cell)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, True
+            future = Future()
+            self._in_flight[key] = future
+            self.stats["scrapes"] += 1
+        self._executor.submit(self._run_scrape, key, cell, future)
+        return future, False
+
+    def _run_scrape(self, key, cell, future):
+        try:
+            with self.pool.acquire() as driver:
+                flights = scrape_cell(driver, cell, self.store, self.config, archive=self.archive)
+            if flights is None:
+                raise RuntimeError(f"Scrape failed for {key}")
+            future.set_result((time.time(), flights))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def search(self, cell, max_age=None, timeout=DEFAULT_WAIT_TIMEOUT):
+        """Returns fresh results for a cell, scraping (once) if necessary.
+
+        Returns:
+            dict with cell_key, scraped_at, cached, coalesced and flights
+        """
+        scraped_at, flights = self.cached(cell, max_age)
+        if scraped_at is not None:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return {"cell_key": cell_key(cell), "scraped_at": scraped_at, "cached": True,
+                    "coalesced": False, "flights": flights}
+
+        future, coalesced = self.submit(cell)
+        scraped_at, flights = future.result(timeout=timeout)
+        return {"cell_key": cell_key(cell), "scraped_at": scraped_at, "cached": False,
+                "coalesced": coalesced, "flights": flights}
+
+    def in_flight(self):
+        with self._lock:
+            return sorted(self._in_flight)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
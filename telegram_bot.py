@@ -1,3 +1,5 @@
+import mimetypes
+
 import requests
 
 def send_telegram_message(message, config):
@@ -84,7 +86,8 @@ def send_telegram_document(file_path, config, caption="🛫 航班报告已生
 
     try:
         with open(file_path, 'rb') as file:
-            files = {'document': (filename, file, 'image/jpeg')}
+            mime_type = mimetypes.guess_type(filename)[0] or 'image/jpeg'
+            files = {'document': (filename, file, mime_type)}
             data = {
                 'chat_id': chat_id,
                 'caption': caption,
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from browser_pool import BrowserPool
+from result_store import ResultStore, cell_key
+from scraper import create_scrape_driver
+from search_service import SearchService, build_cell, AIRPORT_CODE_RE, DEFAULT_MAX_AGE
+
+# Scrapes a single chat may trigger per hour
+DEFAULT_SCRAPES_PER_HOUR = 5
+
+# Offers listed per reply
+MAX_LISTED_OFFERS = 5
+
+HELP_TEXT = (
+    "✈️ *航班查询机器人*\n\n"
+    "/search `TYO SIN 20260101` - 单程查询\n"
+    "/search `TYO SIN 20260101 20260110` - 往返查询\n"
+    "/cheapest `SIN` - 已缓存数据中飞往该目的地最便宜的日期\n\n"
+    "缓存数据足够新时立即回复，否则会安排一次新的抓取。"
+)
+
+
+class RateLimiter:
+    """Per-key token bucket: `capacity` actions, refilled evenly over `period` seconds."""
+
+    def __init__(self, capacity, period=3600.0):
+        self.capacity = capacity
+        self.period = period
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """Consumes one token for `key` and returns True, or returns False if empty."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.capacity), now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.capacity / self.period)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            return True
+
+
+def _format_age(scraped_at, now=None):
+    minutes = int(((time.time() if now is None else now) - scraped_at) / 60)
+    if minutes < 60:
+        return f"{minutes}分钟前"
+    if minutes < 60 * 48:
+        return f"{minutes // 60}小时前"
+    return f"{minutes // 1440}天前"
+
+
+def _format_leg(leg):
+    return (f"{leg['departure']['airport']} {leg['departure']['time']} → "
+            f"{leg['arrival']['airport']} {leg['arrival']['time']}"
+            f" ({leg['duration']}, {leg['transfers']['count_str']})")
+
+
+def format_flights_message(cell, scraped_at, flights, limit=MAX_LISTED_OFFERS, now=None):
+    """Formats the cheapest offers of a search cell as a Telegram Markdown message."""
+    title = f"🛫 *{cell['origin']} → {cell['dest']}* {cell['dep_date']}"
+    if cell.get('ret_date'):
+        title += f" ⇄ {cell['ret_date']}"
+    lines = [title, f"_数据更新于{_format_age(scraped_at, now)}_", ""]
+    if not flights:
+        lines.append("未找到航班。")
+    for i, flight in enumerate(flights[:limit]):
+        if flight.get('trip_type') == 'round_trip':
+            lines.append(f"{i + 1}. *{flight['price']}* {flight['outbound']['airline']}")
+            lines.append(f"   去: {_format_leg(flight['outbound'])}")
+            lines.append(f"   回: {_format_leg(flight['return'])}")
+        else:
+            lines.append(f"{i + 1}. *{flight['price']}* {flight.get('airline', 'N/A')}")
+            lines.append(f"   {_format_leg(flight)}")
+    return "\n".join(lines)
+
+
+def format_cheapest_message(dest, rows, limit=MAX_LISTED_OFFERS):
+    """Formats the cheapest cached cells to a destination."""
+    if not rows:
+        return f"暂无飞往 {dest} 的缓存数据，请先使用 /search 查询。"
+    lines = [f"💰 *飞往 {dest} 最便宜的日期*", ""]
+    for i, row in enumerate(rows[:limit]):
+        dates = row['dep_date'] + (f" ⇄ {row['ret_date']}" if row['ret_date'] else "")
+        lines.append(f"{i + 1}. *{row['min_price']:,}円* {row['origin']}→{row['dest']} {dates}"
+                     f" _({_format_age(row['scraped_at'])})_")
+    return "\n".join(lines)
+
+
+class FlightBot:
+    """Telegram command handlers backed by the result store.
+
+    Cached results are answered immediately. Stale or missing cells are
+    scraped through the shared SearchService (so identical requests from
+    several chats share one scrape) and the result is sent when ready.
+    """
+
+    def __init__(self, service, scrape_limiter):
+        self.service = service
+        self.scrape_limiter = scrape_limiter
+
+    async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.effective_message.reply_text(HELP_TEXT, parse_mode="Markdown")
+
+    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        message = update.effective_message
+        args = context.args or []
+        if len(args) not in (3, 4):
+            await message.reply_text("用法: /search TYO SIN 20260101 [返程日期]")
+            return
+        try:
+            ret_date = args[3] if len(args) == 4 else None
+            cell = build_cell(args[0], args[1], args[2], ret_date, "1" if ret_date else "0")
+        except ValueError as e:
+            await message.reply_text(f"参数错误: {e}")
+            return
+
+        scraped_at, flights = await asyncio.to_thread(self.service.cached, cell)
+        if scraped_at is not None:
+            await message.reply_text(format_flights_message(cell, scraped_at, flights), parse_mode="Markdown")
+            return
+
+        # Show stale data while a fresh scrape runs
+        stale_at, stale_flights = await asyncio.to_thread(self.service.store.latest_flights, cell_key(cell))
+        if stale_at is not None:
+            await message.reply_text(format_flights_message(cell, stale_at, stale_flights) + "\n\n_数据较旧_",
+                                     parse_mode="Markdown")
+
+        if not self.scrape_limiter.allow(update.effective_chat.id):
+            await message.reply_text("⏳ 查询过于频繁，请稍后再试。")
+            return
+
+        future, coalesced = self.service.submit(cell)
+        await message.reply_text("🔍 正在查询最新价格" + ("（已有相同查询进行中）" if coalesced else "") + "，请稍候…")
+        try:
+            scraped_at, flights = await asyncio.wrap_future(future)
+        except Exception as e:
+            await message.reply_text(f"❌ 查询失败: {e}")
+            return
+        await message.reply_text(format_flights_message(cell, scraped_at, flights), parse_mode="Markdown")
+
+    async def cheapest(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        args = context.args or []
+        if len(args) != 1:
+            await update.effective_message.reply_text("用法: /cheapest SIN")
+            return
+        dest = args[0].strip().upper()
+        # Checked like /search does; the code also goes into a Markdown reply
+        if not AIRPORT_CODE_RE.match(dest):
+            await update.effective_message.reply_text("参数错误: dest must be a 3-letter airport or city code")
+            return
+        rows = await asyncio.to_thread(self.service.store.latest_searches, dest)
+        await update.effective_message.reply_text(format_cheapest_message(dest, rows), parse_mode="Markdown")
+
+
+def run_telegram_bot(config):
+    """Runs the interactive bot with long polling until interrupted."""
+    bot_token = config.get("TELEGRAM_BOT_TOKEN")
+    if not bot_token:
+        print("Error: TELEGRAM_BOT_TOKEN is not set, cannot start the bot.")
+        return
+
+    max_age = float(config.get("API_CACHE_MAX_AGE") or DEFAULT_MAX_AGE)
+    scrapes_per_hour = int(config.get("BOT_SCRAPES_PER_HOUR") or DEFAULT_SCRAPES_PER_HOUR)
+    pool_size = int(config.get("BROWSER_POOL_SIZE") or 1)
+
+    store = ResultStore()
+    pool = BrowserPool(lambda: create_scrape_driver(config), size=pool_size)
+    service = SearchService(store, pool, max_age=max_age, config=config)
+    bot = FlightBot(service, RateLimiter(scrapes_per_hour))
+
+    application = Application.builder().token(bot_token).concurrent_updates(True).build()
+    application.add_handler(CommandHandler(["start", "help"], bot.help))
+    application.add_handler(CommandHandler("search", bot.search))
+    application.add_handler(CommandHandler("cheapest", bot.cheapest))
+
+    print(f"Telegram bot polling (cache max age {max_age:.0f}s, {scrapes_per_hour} scrapes/chat/hour)")
+    try:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        service.close()
+        pool.close()
+        store.close()
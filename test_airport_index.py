@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the spatial airport index and nearby-airport cell expansion.
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from airport_index import AirportIndex, expand_cells, get_airport_index, haversine_km, load_airports
+from result_store import ResultStore
+from scheduler import score_cell
+from scraper import build_search_cells
+
+
+def airport(code, lat, lon, name=None):
+    return {"iata": code, "name": name or f"{code} Airport", "country_code": "XX", "lat": lat, "lon": lon}
+
+
+def test_radius_queries_match_a_full_scan():
+    airports = load_airports()
+    index = get_airport_index()
+    rng = random.Random(0)
+    for _ in range(300):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        radius = rng.choice([20, 150, 800, 5000])
+        expected = sorted(a["iata"] for a in airports if haversine_km(lat, lon, a["lat"], a["lon"]) <= radius)
+        assert sorted(a["iata"] for _, a in index.within(lat, lon, radius)) == expected
+
+
+def test_antimeridian_and_poles():
+    index = AirportIndex([airport("EAS", 0, 179.9), airport("WES", 0, -179.9), airport("POL", 89.9, 45),
+                          airport("OPP", 89.9, -135)])
+    assert [a["iata"] for _, a in index.within(0, 179.95, 50)] == ["EAS", "WES"]
+    assert sorted(a["iata"] for _, a in index.within(89.95, 0, 50)) == ["OPP", "POL"]
+
+
+def test_timezone_is_the_nearest_zone_of_the_country():
+    index = get_airport_index()
+    assert [index.timezone(code) for code in ("HND", "CMB", "ORD", "PHX", "DPS")] == [
+        "Asia/Tokyo", "Asia/Colombo", "America/Chicago", "America/Phoenix", "Asia/Makassar"]
+    assert index.timezone("ZZZ") is None
+    zones = {"XX": [(0, 0, "Etc/West"), (0, 10, "Etc/East")]}
+    index = AirportIndex([airport("EAS", 0, 8), airport("WES", 0, 1)])
+    assert (index.timezone("EAS", zones), index.timezone("WES", zones), index.timezone("EAS", {})) == ("Etc/East", "Etc/West", None)
+
+
+def test_nearby_skips_airbases_and_locates_metro_codes():
+    index = get_airport_index()
+    assert [a["iata"] for _, a in index.nearby("SEL", 100)] == ["GMP", "ICN"]
+    assert "NRT" in [a["iata"] for _, a in index.nearby("TYO", 100)]
+    assert [a["iata"] for _, a in index.nearby("HND", 100, limit=None)] == ["NRT", "OMJ", "IBR", "OIM"]
+    assert index.nearby("???", 100) == []
+
+
+def test_expand_cells_swaps_one_end():
+    index = AirportIndex([airport("AAA", 10, 10), airport("AAB", 10, 10.3), airport("BBB", 20, 20),
+                          airport("BBC", 20.2, 20), airport("FAR", 30, 30)])
+    cells = [{"origin": "AAA", "dest": "BBB", "dep_date": "20261210", "ret_date": None, "air_type": "0"},
+             {"origin": "AAB", "dest": "BBB", "dep_date": "20261210", "ret_date": None, "air_type": "0"}]
+    expanded = expand_cells(cells, {"NEARBY_RADIUS_KM": "50"}, index)
+    assert expanded[:2] == cells
+    assert [(c["origin"], c["dest"], c["nearby_of"]) for c in expanded[2:]] == [
+        ("AAA", "BBC", "AAA-BBB-20261210"), ("AAB", "BBC", "AAB-BBB-20261210")]
+    only_origin = expand_cells(cells[:1], {"NEARBY_RADIUS_KM": "50", "NEARBY_EXPAND": "origin"}, index)
+    assert [(c["origin"], c["dest"]) for c in only_origin] == [("AAA", "BBB"), ("AAB", "BBB")]
+    assert expand_cells(cells, {"NEARBY_RADIUS_KM": "0"}, index) == cells
+
+
+def test_configured_search_gets_nearby_cells_at_lower_priority():
+    config = {"ORIGIN": "TYO", "DESTINATIONS": "SEL", "DEPARTURE_DATES": "20991210", "AIR_TYPE": "0",
+              "NEARBY_RADIUS_KM": "100", "NEARBY_MAX_AIRPORTS": "2", "NEARBY_EXPAND": "destination"}
+    cells = build_search_cells(config)
+    assert [c["dest"] for c in cells] == ["SEL", "GMP", "ICN"]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        now = time.time()
+        assert score_cell(cells[1], store, now) == score_cell(cells[0], store, now) * 0.5
+        store.close()
+
+
+if __name__ == "__main__":
+    test_radius_queries_match_a_full_scan()
+    test_antimeridian_and_poles()
+    test_timezone_is_the_nearest_zone_of_the_country()
+    test_nearby_skips_airbases_and_locates_metro_codes()
+    test_expand_cells_swaps_one_end()
+    test_configured_search_gets_nearby_cells_at_lower_priority()
+    print("✅ Airport index tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the browser pool helpers: /proc RSS sampling and the driver
+watchdog that recycles Chrome by memory or navigation count.
+"""
+
+import os
+from browser_pool import DriverWatchdog, process_tree_rss
+
+
+class FakeDriver:
+    launched = 0
+
+    def __init__(self):
+        FakeDriver.launched += 1
+        self.id = FakeDriver.launched
+        self.rss = 100 * 1024 * 1024
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+
+def make_watchdog(**kwargs):
+    return DriverWatchdog(FakeDriver, rss_fn=lambda d: d.rss, **kwargs)
+
+
+def test_process_tree_rss_reads_proc():
+    assert process_tree_rss(os.getpid()) > 0
+    assert process_tree_rss(os.getpid(), include_root=False) >= 0
+
+
+def test_recycles_after_navigation_limit():
+    watchdog = make_watchdog(max_navigations=3)
+    ids = [watchdog.run(lambda d: d.id) for _ in range(7)]
+    assert ids[0:3] == [ids[0]] * 3
+    assert ids[3:6] == [ids[3]] * 3 and ids[3] != ids[0]
+    assert ids[6] not in (ids[0], ids[3])
+    assert watchdog.stats["recycles"] == 2
+
+
+def test_recycles_when_rss_exceeds_threshold():
+    watchdog = make_watchdog(max_rss_mb=500)
+    first = watchdog.before_navigation()
+    assert watchdog.before_navigation() is first
+    first.rss = 600 * 1024 * 1024
+    second = watchdog.before_navigation()
+    assert second is not first and first.quit_called
+    assert watchdog.stats["peak_rss_mb"] == 600
+
+
+def test_failed_cell_is_retried_on_fresh_driver():
+    watchdog = make_watchdog()
+    seen = []
+
+    def scrape(driver):
+        seen.append(driver)
+        if len(seen) == 1:
+            raise RuntimeError("tab crashed")
+        return ["flight"]
+
+    assert watchdog.run(scrape) == ["flight"]
+    assert seen[0] is not seen[1] and seen[0].quit_called
+    assert watchdog.stats["retries"] == 1
+    assert watchdog.run(lambda d: None, retries=1) is None
+
+
+def test_close_keeps_borrowed_driver_open():
+    borrowed = FakeDriver()
+    watchdog = make_watchdog(driver=borrowed)
+    assert watchdog.before_navigation() is borrowed
+    watchdog.close()
+    assert not borrowed.quit_called
+
+    watchdog = make_watchdog(driver=borrowed, max_navigations=1)
+    watchdog.before_navigation()
+    own = watchdog.before_navigation()
+    assert borrowed.quit_called and own is not borrowed
+    watchdog.close()
+    assert own.quit_called
+
+
+if __name__ == "__main__":
+    test_process_tree_rss_reads_proc()
+    test_recycles_after_navigation_limit()
+    test_recycles_when_rss_exceeds_threshold()
+    test_failed_cell_is_retried_on_fresh_driver()
+    test_close_keeps_borrowed_driver_open()
+    print("✅ Browser pool tests passed!")
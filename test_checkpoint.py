@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for checkpointing and resuming interrupted sweeps.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+import scraper
+from checkpoint import RunCheckpoint, open_checkpoint, prune_checkpoints
+from result_store import ResultStore
+
+
+class FakeDriver:
+    current_url = "about:blank"
+
+    def quit(self):
+        pass
+
+
+def cell(dest, dep_date="20991210"):
+    return {"origin": "TYO", "dest": dest, "dep_date": dep_date, "ret_date": None, "air_type": "0"}
+
+
+def test_checkpoint_resumes_same_sweep_within_window():
+    with tempfile.TemporaryDirectory() as tmp:
+        cells = [cell("SIN"), cell("BKK"), cell("HKG")]
+        checkpoint = RunCheckpoint(cells, tmp, resume_window=3600)
+        assert not checkpoint.resumed
+        checkpoint.complete(cells[1])
+        checkpoint.complete(cell("LAX"))  # Not part of the sweep
+        assert list(checkpoint.completed) == ["TYO-BKK-20991210"]
+
+        # Same cells in another order: the same sweep
+        resumed = RunCheckpoint(list(reversed(cells)), tmp, resume_window=3600)
+        assert resumed.resumed and resumed.started_at == checkpoint.started_at
+        assert resumed.remaining(cells) == [cells[0], cells[2]]
+
+        # Other cells, or the window has passed: a fresh sweep
+        assert not RunCheckpoint(cells[:2], tmp, resume_window=3600).resumed
+        assert not RunCheckpoint(cells, tmp, resume_window=3600, now=checkpoint.started_at + 7200).resumed
+
+        resumed.finish()
+        assert not RunCheckpoint(cells, tmp, resume_window=3600).resumed
+        resumed.finish()
+
+
+def test_open_checkpoint_config_and_pruning():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert open_checkpoint([cell("SIN")], {"RESUME_WINDOW": "0"}, tmp) is None
+        checkpoint = open_checkpoint([cell("SIN")], {"RESUME_WINDOW": "60"}, tmp)
+        checkpoint.complete(cell("SIN"))
+        assert prune_checkpoints(tmp, 60) == 0
+        assert prune_checkpoints(tmp, 60, now=os.path.getmtime(checkpoint.path) + 61) == 1
+        assert os.listdir(tmp) == []
+
+
+def test_interrupted_scrape_resumes_with_partial_results(monkeypatch):
+    config = {"ORIGIN": "TYO", "DESTINATIONS": "SIN,BKK,HKG,TPE", "DEPARTURE_DATES": "20991210",
+              "AIR_TYPE": "0", "PAGE_ARCHIVE": "false", "PARSE_CACHE": "false"}
+    scraped = []
+
+    def fake_scrape_cell(driver, c, store=None, config=None, archive=None):
+        if c["dest"] == "HKG" and "HKG" not in scraped:
+            scraped.append("HKG")
+            raise KeyboardInterrupt  # The container is stopped mid-sweep
+        scraped.append(c["dest"])
+        flights = [{"price": f"{len(scraped)}0,000円", "airline": c["dest"]}] if c["dest"] != "BKK" else []
+        if flights:
+            store.record_search(c, flights)
+        return flights
+
+    monkeypatch.setattr(scraper, "scrape_cell", fake_scrape_cell)
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch.chdir(tmp)
+        with pytest.raises(KeyboardInterrupt):
+            scraper.scrape_flights(config, driver=FakeDriver())
+        assert scraped == ["SIN", "BKK", "HKG"]
+        assert len(os.listdir("data/checkpoints")) == 1
+
+        flights = scraper.scrape_flights(config, driver=FakeDriver())
+        # SIN and BKK are not scraped again; SIN's flights come from the store
+        assert scraped == ["SIN", "BKK", "HKG", "HKG", "TPE"]
+        assert sorted(f["airline"] for f in flights) == ["HKG", "SIN", "TPE"]
+        assert os.listdir("data/checkpoints") == []
+
+        # The sweep finished, so the next run scrapes everything again
+        scraper.scrape_flights(config, driver=FakeDriver())
+        assert scraped[5:] == ["SIN", "BKK", "HKG", "TPE"]
+        store = ResultStore()
+        assert len(store.latest_searches()) == 3
+        store.close()
+
+
+if __name__ == "__main__":
+    test_checkpoint_resumes_same_sweep_within_window()
+    test_open_checkpoint_config_and_pruning()
+    print("✅ Checkpoint tests passed! (run with pytest for the resume test)")
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Test script for batch report rendering in tabs of one browser and for the
+warm template renderer, using a fake WebDriver and fake per-tab CDP sessions
+that record the CDP calls.
+"""
+
+import base64
+import io
+import threading
+import time
+from bs4 import BeautifulSoup, Comment
+from PIL import Image
+from chrome_render import render_html_batch, build_template_shell, WarmRenderer
+
+
+def jpeg_bytes(width, height):
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 100, 50)).save(out, 'JPEG')
+    return out.getvalue()
+
+
+class FakeDriver:
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Page.captureScreenshot":
+            return {"data": base64.b64encode(jpeg_bytes(params["clip"]["width"], params["clip"]["height"])).decode()}
+        return {}
+
+    def execute_script(self, script, *args):
+        return "complete"
+
+    def execute_async_script(self, script, *args):
+        return [390, 800]
+
+
+class FakeBrowser:
+    """Browser side of the batch render: CDP targets and one fake session per tab."""
+
+    def __init__(self, fail_url=None):
+        self.capabilities = {"goog:chromeOptions": {"debuggerAddress": "127.0.0.1:9222"}}
+        self.fail_url = fail_url
+        self.lock = threading.Lock()
+        self.created = 0
+        self.open = set()
+        self.max_open = 0
+        self.session_threads = set()
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Target.createTarget"
+        with self.lock:
+            self.created += 1
+            target_id = f"T{self.created}"
+            self.open.add(target_id)
+            self.max_open = max(self.max_open, len(self.open))
+        return {"targetId": target_id}
+
+    def session(self, websocket_url, timeout):
+        assert websocket_url.startswith("ws://127.0.0.1:9222/devtools/page/T")
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = None
+
+    def send(self, method, params=None):
+        self.browser.session_threads.add(threading.current_thread().name)
+        if method == "Page.navigate":
+            self.url = params["url"]
+        elif method == "Runtime.evaluate":
+            value = [390, 800] if params["awaitPromise"] else "complete"
+            return {"result": {"type": "object", "value": value}}
+        elif method == "Page.captureScreenshot":
+            assert params["format"] == "png"
+            if self.browser.fail_url and self.browser.fail_url in self.url:
+                raise RuntimeError("tab crashed")
+            time.sleep(0.05)  # Keeps the tabs of a batch open at the same time
+            return {"data": base64.b64encode(jpeg_bytes(params["clip"]["width"], params["clip"]["height"])).decode()}
+        elif method == "Target.closeTarget":
+            with self.browser.lock:
+                self.browser.open.discard(params["targetId"])
+        return {}
+
+    def close(self):
+        pass
+
+
+def test_batch_renders_tabs_on_their_own_sessions():
+    browser = FakeBrowser(fail_url="report_3.html")
+    results = render_html_batch([f"<html><body>{i}</body></html>" for i in range(5)], driver=browser,
+                                concurrency=2, session_factory=browser.session)
+    assert browser.created == 5 and browser.max_open == 2 and not browser.open
+    # Tabs are driven from the tab threads, not switched on one WebDriver
+    assert browser.session_threads and all(name.startswith("render-tab") for name in browser.session_threads)
+    assert results[3] is None
+    for pages in results[:3] + results[4:]:
+        assert [(p["format"], p["width"], p["height"]) for p in pages] == [("jpeg", 390, 800)]
+        with Image.open(io.BytesIO(pages[0]["data"])) as image:
+            assert image.format == "JPEG" and image.size == (390, 800)
+
+
+class FakeWarmDriver(FakeDriver):
+    def __init__(self, crash_on_render=None):
+        super().__init__()
+        self.loaded = []
+        self.injected = []
+        self.crash_on_render = crash_on_render
+        self.quit_called = False
+
+    def get(self, url):
+        with open(url[len("file://"):], 'r', encoding='utf-8') as f:
+            self.loaded.append(f.read())
+
+    def execute_async_script(self, script, *args):
+        if args:
+            self.injected.append(args[0])
+            if len(self.injected) == self.crash_on_render:
+                raise RuntimeError("tab crashed")
+        return [390, 800]
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_template_shell_has_a_slot_per_field():
+    with open('template.html', 'r', encoding='utf-8') as f:
+        shell = build_template_shell(f.read())
+    for name in ("origin_airport_name", "destination_airport_name", "today_date", "summary_note"):
+        assert f'data-slot="{name}"' in shell
+    assert "<!--slot:flight_cards-->" in shell and 'data-slot="flight_cards"' not in shell
+    assert 'href="" data-slot-href="report_url"' in shell
+    assert "{{" not in shell
+
+
+def inject_block_slots(shell, fields):
+    """Applies INJECT_REPORT_SCRIPT's block-slot step to the shell: cards go in place of the marker."""
+    soup = BeautifulSoup(shell, "lxml")
+    for marker in soup.find_all(string=lambda text: isinstance(text, Comment) and text.startswith("slot:")):
+        for node in list(BeautifulSoup(fields[marker[len("slot:"):]], "html.parser").contents):
+            marker.insert_before(node)
+        marker.extract()
+    return soup
+
+
+def card_structure(soup):
+    """Element children of .flights-container as (tag, classes, :nth-child position)."""
+    container = soup.select_one(".flights-container")
+    return [(child.name, child.get("class"), i) for i, child in enumerate(container.find_all(recursive=False), 1)]
+
+
+def test_warm_shell_cards_match_the_filled_template():
+    with open('template.html', 'r', encoding='utf-8') as f:
+        template = f.read()
+    fields = {"origin_airport_name": "Tokyo", "destination_airport_name": "Bangkok", "today_date": "2026-10-19",
+              "summary_note": "ok", "report_url": "https://example.com",
+              "flight_cards": "".join(f'<div class="flight-card"><div class="flight-price">{i}</div></div>'
+                                      for i in range(3))}
+    cold = BeautifulSoup(template.format(**fields), "lxml")
+    warm = inject_block_slots(build_template_shell(template), fields)
+    assert card_structure(warm) == card_structure(cold) == [
+        ("h2", None, 1), ("div", ["flight-card"], 2), ("div", ["flight-card"], 3), ("div", ["flight-card"], 4)]
+    # The first card is the one the template leaves uncoloured, as in the cold render
+    assert warm.select(".flight-card:nth-child(2) .flight-price")[0].text == "0"
+
+
+def test_warm_renderer_loads_the_shell_once():
+    drivers = [FakeWarmDriver(crash_on_render=2), FakeWarmDriver()]
+    renderer = WarmRenderer(driver_factory=lambda: drivers.pop(0))
+    fields = {"origin_airport_name": "Tokyo", "destination_airport_name": "Bangkok", "today_date": "2026-10-19",
+              "flight_cards": "<div class='flight-card'>1</div>", "summary_note": "ok", "report_url": "https://example.com"}
+    first = renderer.render(fields)
+    second = renderer.render(dict(fields, summary_note="second"))  # crashes once, retried in a new browser
+    third = renderer.render(fields)
+    for pages in (first, second, third):
+        assert [(p["format"], p["width"], p["height"]) for p in pages] == [("jpeg", 390, 800)]
+    assert renderer.stats == {"shell_loads": 2, "renders": 3, "failures": 1}
+    assert renderer.driver.injected[0]["summary_note"] == "second"
+    assert renderer.driver.injected[0]["title"] == "Flight Report - Tokyo to Bangkok"
+    assert len(renderer.driver.loaded) == 1 and "<!--slot:flight_cards-->" in renderer.driver.loaded[0]
+    driver = renderer.driver
+    renderer.close()
+    assert driver.quit_called and renderer.driver is None
+
+
+class FakePngDriver(FakeWarmDriver):
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd == "Page.captureScreenshot":
+            self.capture = params
+            out = io.BytesIO()
+            Image.new('RGBA', (params["clip"]["width"], params["clip"]["height"]), (200, 100, 50, 255)).save(out, 'PNG')
+            return {"data": base64.b64encode(out.getvalue()).decode()}
+        return {}
+
+
+def test_warm_renderer_captures_lossless_images():
+    driver = FakePngDriver()
+    renderer = WarmRenderer(driver_factory=lambda: driver)
+    image = renderer.render_image({"origin_airport_name": "Tokyo", "destination_airport_name": "Bangkok"})
+    assert image.mode == "RGB" and image.size == (390, 800)
+    assert driver.capture["format"] == "png" and "quality" not in driver.capture
+
+
+class FakeTallPngDriver(FakePngDriver):
+    def execute_async_script(self, script, *args):
+        return [780, 20000]
+
+
+def test_warm_renderer_splits_tall_reports_instead_of_shrinking():
+    renderer = WarmRenderer(driver_factory=FakeTallPngDriver)
+    pages = renderer.render({"origin_airport_name": "Tokyo"}, {"REPORT_IMAGE_FORMAT": "jpeg"})
+    assert len(pages) == 3 and all(p["width"] == 780 and p["height"] <= 9000 for p in pages)
+    assert sum(p["height"] for p in pages) == 20000
+
+
+if __name__ == "__main__":
+    test_batch_renders_tabs_on_their_own_sessions()
+    test_template_shell_has_a_slot_per_field()
+    test_warm_shell_cards_match_the_filled_template()
+    test_warm_renderer_loads_the_shell_once()
+    test_warm_renderer_captures_lossless_images()
+    test_warm_renderer_splits_tall_reports_instead_of_shrinking()
+    print("✅ Chrome render tests passed!")
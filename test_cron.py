@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test script for the daemon's cron expression parser
+"""
+
+from datetime import datetime
+import pytest
+from cron import CronExpression, parse_schedule, next_run_time
+
+
+def test_daily_schedule():
+    expr = CronExpression("0 9 * * *")
+    assert expr.next_after(datetime(2026, 1, 1, 8, 59)) == datetime(2026, 1, 1, 9, 0)
+    assert expr.next_after(datetime(2026, 1, 1, 9, 0)) == datetime(2026, 1, 2, 9, 0)
+
+
+def test_steps_ranges_and_weekdays():
+    expr = CronExpression("*/15 8-18 * * 1-5")
+    # Friday evening -> Monday morning
+    assert expr.next_after(datetime(2026, 1, 2, 18, 50)) == datetime(2026, 1, 5, 8, 0)
+    assert expr.matches(datetime(2026, 1, 5, 8, 45))
+    assert not expr.matches(datetime(2026, 1, 5, 8, 50))
+    # 7 is Sunday as well
+    assert CronExpression("30 6 * * 7").next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4, 6, 30)
+
+
+def test_leap_day_and_multiple_expressions():
+    assert CronExpression("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29)
+    schedule = parse_schedule("0 9 * * *; 0 18 * * *")
+    assert next_run_time(schedule, datetime(2026, 1, 1, 10)) == datetime(2026, 1, 1, 18)
+
+
+def test_invalid_expressions():
+    for bad in ("0 9 * *", "60 * * * *", "0 9 * * 8", "*/0 * * * *"):
+        with pytest.raises(ValueError):
+            CronExpression(bad)
+
+
+if __name__ == "__main__":
+    test_daily_schedule()
+    test_steps_ranges_and_weekdays()
+    test_leap_day_and_multiple_expressions()
+    test_invalid_expressions()
+    print("✅ Cron tests passed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for report image encoding: page splitting at blank gaps,
+quality search within the byte budget, format selection and file output.
+"""
+
+import io
+import os
+import random
+import tempfile
+
+from PIL import Image, ImageDraw
+from image_encoder import (encode, encode_report, encode_to_budget, encoder_settings, fit_width, save_report_images,
+                           split_pages, MAX_WIDTH)
+
+
+def cards(width, height, card_height=700, gap=40):
+    """A report-like image: noisy cards separated by plain gaps."""
+    rng = random.Random(1)
+    image = Image.new('RGB', (width, height), (240, 240, 250))
+    draw = ImageDraw.Draw(image)
+    y = gap
+    while y < height:
+        draw.rectangle((20, y, width - 20, min(y + card_height, height)), fill=(90, 60, 160))
+        for _ in range(card_height // 4):
+            ty = y + rng.randrange(card_height)
+            draw.text((rng.randrange(40, width - 200), ty), "TYO 10:00 → BKK", fill=(255, 255, 255))
+        y += card_height + gap
+    return image
+
+
+def test_split_cuts_in_gaps():
+    image = cards(400, 5000)
+    pages = split_pages(image, max_height=2000)
+    assert len(pages) == 3 and sum(p.height for p in pages) == 5000
+    assert all(p.height <= 2000 for p in pages)
+    top = 0
+    for page in pages[:-1]:
+        top += page.height
+        # Each cut lies in a run of plain rows, never through a line of text
+        rows = [image.crop((0, y, image.width, y + 1)).tobytes() for y in range(top - 3, top + 3)]
+        assert len(set(rows)) == 1
+    assert split_pages(image, max_height=6000) == [image]
+
+
+def test_split_without_gaps_cuts_at_the_limit():
+    rng = random.Random(2)
+    image = Image.frombytes('RGB', (64, 3000), bytes(rng.randrange(256) for _ in range(64 * 3000 * 3)))
+    assert [p.height for p in split_pages(image, max_height=1000)] == [1000, 1000, 1000]
+
+
+def test_budget_search_finds_highest_fitting_quality():
+    image = cards(600, 1500)
+    full, top = encode_to_budget(image, "jpeg", 10 ** 9)
+    assert top == 90
+    budget = len(full) * 2 // 3
+    data, quality = encode_to_budget(image, "jpeg", budget)
+    assert len(data) <= budget and 60 <= quality < 90
+    assert len(encode(image, "jpeg", quality + 1)) > budget
+    # Below the floor the floor is used even if it does not fit
+    data, quality = encode_to_budget(image, "jpeg", 100)
+    assert quality == 60 and len(data) > 100
+    with Image.open(io.BytesIO(data)) as decoded:
+        assert decoded.format == "JPEG" and decoded.info.get("progressive")
+
+
+def test_auto_keeps_the_better_format():
+    image = cards(600, 1500)
+    budget = len(encode_to_budget(image, "webp", 10 ** 9)[0])
+    pages = encode_report(image, "auto", max_bytes=budget)
+    assert pages[0]["format"] == "webp" and pages[0]["quality"] == 90
+    with Image.open(io.BytesIO(pages[0]["data"])) as decoded:
+        assert decoded.format == "WEBP" and decoded.size == (600, 1500)
+
+
+def test_wide_reports_are_downscaled():
+    assert fit_width(cards(MAX_WIDTH + 600, 700)).size == (MAX_WIDTH, 583)
+
+
+def test_save_report_images():
+    assert encoder_settings({"REPORT_IMAGE_FORMAT": "gif"})["fmt"] == "jpeg"
+    assert encoder_settings({"REPORT_MAX_KB": "1.5"})["max_bytes"] == 1536
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "report")
+        assert save_report_images(cards(400, 1200), base) == [f"{base}.jpg"]
+        paths = save_report_images(cards(400, 20000), base, {"REPORT_IMAGE_FORMAT": "webp"})
+        assert paths == [f"{base}_p1.webp", f"{base}_p2.webp", f"{base}_p3.webp"]
+        heights = []
+        for path in paths:
+            with Image.open(path) as page:
+                heights.append(page.height)
+        assert sum(heights) == 20000 and max(heights) <= 9000
+
+
+if __name__ == "__main__":
+    test_split_cuts_in_gaps()
+    test_split_without_gaps_cuts_at_the_limit()
+    test_budget_search_finds_highest_fitting_quality()
+    test_auto_keeps_the_better_format()
+    test_wide_reports_are_downscaled()
+    test_save_report_images()
+    print("✅ Image encoder tests passed!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for per-stage instrumentation: stage timings land in the run's
+trace file and in the Prometheus text metrics.
+"""
+
+import json
+import os
+import tempfile
+import time
+import instrumentation
+from instrumentation import stage, start_run, finish_run, cell_tags, StageMetrics
+
+
+def test_stage_records_timings_trace_and_metrics():
+    tmp = tempfile.mkdtemp()
+    config = {"TRACE_DIR": os.path.join(tmp, "traces"), "METRICS_FILE": os.path.join(tmp, "metrics.prom")}
+    tags = cell_tags({"origin": "TYO", "dest": "SEL", "dep_date": "20261220", "ret_date": None})
+    timings = {}
+
+    trace_path = start_run(config, origin="TYO")
+    with stage("navigate", timings, **tags):
+        time.sleep(0.02)
+    try:
+        with stage("parse", timings, **tags):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    finish_run(config)
+
+    assert timings["navigate"] >= 0.02 and "parse" in timings
+    with open(trace_path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    assert [e["event"] for e in events] == ["run_started", "stage", "stage", "run_finished"]
+    assert events[1]["stage"] == "navigate" and events[1]["route"] == "TYO-SEL" and events[1]["date"] == "20261220"
+    assert events[2]["ok"] is False
+    assert set(events[3]["stage_totals"]) == {"navigate", "parse"}
+
+    with open(config["METRICS_FILE"], encoding='utf-8') as f:
+        text = f.read()
+    assert 'ai_airticket_stage_seconds_count{stage="navigate",route="TYO-SEL"}' in text
+    assert 'ai_airticket_stage_errors_total{stage="parse",route="TYO-SEL"} 1' in text
+    assert "ai_airticket_runs_total" in text
+
+
+def test_stage_without_run_only_updates_metrics():
+    assert instrumentation._run is None
+    with stage("render"):
+        pass
+    assert 'stage="render",route=""' in instrumentation.metrics.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = StageMetrics(buckets=(0.1, 1, 10))
+    for seconds in (0.05, 0.5, 5, 50):
+        metrics.observe("wait", "TYO-SEL", seconds)
+    text = metrics.render()
+    for bound, count in (("0.1", 1), ("1", 2), ("10", 3), ("+Inf", 4)):
+        assert f'ai_airticket_stage_seconds_bucket{{stage="wait",route="TYO-SEL",le="{bound}"}} {count}' in text
+    assert 'ai_airticket_stage_seconds_sum{stage="wait",route="TYO-SEL"} 55.550000' in text
+
+
+if __name__ == "__main__":
+    test_stage_records_timings_trace_and_metrics()
+    test_stage_without_run_only_updates_metrics()
+    test_histogram_buckets_are_cumulative()
+    print("✅ Instrumentation tests passed!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact LLM prompt and the structured reply parsing.
+"""
+
+import json
+
+import pytest
+
+from llm_prompt import build_prompt, build_request, encode_flights, parse_analysis
+
+
+def one_way(price, airline="大韓航空", transfers=("ICN",)):
+    return {
+        "provider_name": "Trip.com", "price": price, "trip_type": "片道", "airline": airline,
+        "flight_code": "KE0704, KE0643",
+        "departure": {"date": "12/10(水)", "time": "09:30", "airport": "NRT"},
+        "arrival": {"date": "12/10(水)", "time": "18:05", "airport": "SIN"},
+        "duration": "9時間35分", "transfers": {"count_str": "乗継1回", "airports": list(transfers)},
+        "plane_model": "機材ボーイング 777", "baggage": ["機内手荷物込", "預け手荷物込"],
+        "source_url": "https://www.tour.ne.jp/j_air/list/?air_type=0&dpt_date=20991210",
+    }
+
+
+def leg(airline, dep, arr, via, connection):
+    return {
+        "airline": airline, "flight_code": "RS0702, MU2004",
+        "departure": {"date": "1/5(月)", "time": "12:50", "airport": dep},
+        "arrival": {"date": "1/6(火)", "time": "16:00", "airport": arr},
+        "duration": "27時間10分", "transfers": {"count_str": "乗継1回/自己", "airports": [via]},
+        "segments": [
+            {"flight_code": "RS0702", "departure": {"airport": dep}, "arrival": {"airport": via}, "connection": connection},
+            {"flight_code": "MU2004", "departure": {"airport": via}, "arrival": {"airport": arr}, "connection": None},
+        ],
+    }
+
+
+def test_one_way_table_keeps_only_the_compared_fields():
+    flights = [one_way("42,000円"), one_way("45,500円", airline="A|B", transfers=[])]
+    flights[1]["plane_model"] = "N/A"
+    table = encode_flights(flights)
+    assert table.splitlines() == [
+        "#|price|airline|flights|dep|arr|time|stops|via|plane|bags|seller",
+        "1|42,000円|大韓航空|KE0704, KE0643|12/10(水) 09:30 NRT|12/10(水) 18:05 SIN|9時間35分|乗継1回|ICN|ボーイング 777|機内手荷物込;預け手荷物込|Trip.com",
+        "2|45,500円|A/B|KE0704, KE0643|12/10(水) 09:30 NRT|12/10(水) 18:05 SIN|9時間35分|乗継1回|-|-|機内手荷物込;預け手荷物込|Trip.com",
+    ]
+    prompt = build_prompt(flights)
+    assert "2 cheapest one-way flights" in prompt and table in prompt
+    assert "source_url" not in prompt and "https://" not in prompt
+    assert len(prompt) < len(json.dumps(flights, indent=2, ensure_ascii=False))
+
+
+def test_round_trip_rows_per_direction():
+    flight = {"provider_name": "Gotogate", "price": "93,817円", "trip_type": "round_trip",
+              "outbound": leg("エアソウル", "NRT", "KTM", "ICN", "15時間50分"),
+              "return": leg("エアアジア", "KTM", "NRT", "DEL", None),
+              "stay_duration": "17日", "baggage": ["機内手荷物込"]}
+    rows = encode_flights([flight], is_round_trip=True).splitlines()
+    assert rows[1] == "1|out|93,817円|17日|エアソウル|RS0702, MU2004|1/5(月) 12:50 NRT|1/6(火) 16:00 KTM|27時間10分|乗継1回/自己|ICN 15時間50分|機内手荷物込|Gotogate"
+    assert rows[2] == "1|ret|||エアアジア|RS0702, MU2004|1/5(月) 12:50 KTM|1/6(火) 16:00 NRT|27時間10分|乗継1回/自己|DEL||"
+
+
+def test_request_asks_for_json_with_one_comment_per_flight():
+    request = build_request([one_way("42,000円"), one_way("45,500円")])
+    config = request["generationConfig"]
+    assert config["responseMimeType"] == "application/json"
+    schema = config["responseSchema"]
+    assert schema["required"] == ["summary_note", "flight_comments"]
+    assert schema["properties"]["flight_comments"]["minItems"] == schema["properties"]["flight_comments"]["maxItems"] == 2
+
+    schema = build_request([], is_round_trip=True)["generationConfig"]["responseSchema"]
+    assert schema["required"] == ["summary_note", "outbound_comments", "return_comments"]
+
+
+def test_parse_analysis():
+    reply = {"summary_note": "最便宜", "flight_comments": ["**好**", "一般"]}
+    assert parse_analysis(json.dumps(reply, ensure_ascii=False)) == reply
+    # Endpoints that ignore generationConfig still answer in a fenced block
+    assert parse_analysis("Here you go:\n```json\n" + json.dumps(reply) + "\n```") == reply
+    assert parse_analysis("```\n" + json.dumps(reply) + "\n```") == reply
+    # Keys of the wrong type are dropped so the defaults stay
+    assert parse_analysis('{"summary_note": "", "outbound_comments": "x", "return_comments": ["a"]}',
+                          is_round_trip=True) == {"return_comments": ["a"]}
+    for text in ("not json", "[1, 2]"):
+        with pytest.raises(ValueError):
+            parse_analysis(text)
+
+
+if __name__ == "__main__":
+    test_one_way_table_keeps_only_the_compared_fields()
+    test_round_trip_rows_per_direction()
+    test_request_asks_for_json_with_one_comment_per_flight()
+    test_parse_analysis()
+    print("✅ LLM prompt tests passed!")
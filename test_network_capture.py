@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for decoding offers from captured network responses.
+
+The payloads below are synthetic, written in the generic fare-list shape the
+decoder recognises (no real tour.ne.jp response is checked in); they are
+replayed through a fake driver so the whole capture path runs offline.
+"""
+
+import base64
+import json
+
+from bs4 import BeautifulSoup
+from network_capture import collect_json_responses, decode_offers
+from parser import parse_flight_data, clean_html
+
+one_way_payload = {
+    "status": "ok",
+    "result": {
+        "fares": [
+            {
+                "agent_name": "Gotogate",
+                "total_price": 86344,
+                "baggage": ["機内手荷物込"],
+                "segments": [
+                    {"carrier_code": "SQ", "flight_no": "637", "airline_name": "シンガポール航空",
+                     "dpt_airport": "NRT", "arr_airport": "SIN",
+                     "dpt_datetime": "2025-12-27T15:30:00", "arr_datetime": "2025-12-27T21:45:00",
+                     "equipment": "ボーイング777"},
+                    {"carrier_code": "SQ", "flight_no": "468", "airline_name": "シンガポール航空",
+                     "dpt_airport": "SIN", "arr_airport": "CMB",
+                     "dpt_datetime": "2025-12-28T20:00:00", "arr_datetime": "2025-12-28T21:40:00"},
+                ],
+            }
+        ]
+    },
+}
+
+round_trip_payload = {
+    "itineraries": [
+        {
+            "agentName": "エクスペディア",
+            "price": "93,817円",
+            "slices": [
+                {"legs": [{"flightCode": "NH843", "airlineName": "全日空", "origin": "HND", "destination": "SIN",
+                           "departureDateTime": "2026-01-05T12:50:00", "arrivalDateTime": "2026-01-05T19:10:00"}]},
+                {"legs": [{"flightCode": "NH842", "airlineName": "全日空", "origin": "SIN", "destination": "HND",
+                           "departureDateTime": "2026-01-24T22:00:00", "arrivalDateTime": "2026-01-25T06:00:00"}]},
+            ],
+        }
+    ]
+}
+
+
+class RecordedDriver:
+    """Replays recorded performance-log entries and response bodies."""
+
+    def __init__(self, responses):
+        self.log = []
+        self.bodies = {}
+        for i, (url, mime, payload) in enumerate(responses):
+            request_id = f"req-{i}"
+            self.log.append({"message": json.dumps({"message": {
+                "method": "Network.responseReceived",
+                "params": {"requestId": request_id, "response": {"url": url, "mimeType": mime}}}})})
+            self.log.append({"message": json.dumps({"message": {
+                "method": "Network.loadingFinished", "params": {"requestId": request_id}}})})
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.bodies[request_id] = {"body": base64.b64encode(body).decode(), "base64Encoded": True}
+
+    def get_log(self, name):
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Network.getResponseBody"
+        return self.bodies[params["requestId"]]
+
+
+def test_decode_one_way_offers():
+    flights = decode_offers([one_way_payload], "0")
+    assert len(flights) == 1
+    flight = flights[0]
+    assert flight["price"] == "86,344円"
+    assert flight["provider_name"] == "Gotogate"
+    assert flight["flight_code"] == "SQ637, SQ468"
+    assert flight["departure"] == {"date": "12/27(土)", "time": "15:30", "airport": "NRT"}
+    assert flight["arrival"] == {"date": "12/28(日)", "time": "21:40", "airport": "CMB"}
+    # 15:30 JST to 21:40 Colombo time (UTC+5:30) the next day
+    assert flight["duration"] == "33時間40分"
+    assert flight["transfers"] == {"count_str": "乗継1回", "airports": ["SIN"]}
+    assert flight["plane_model"] == "ボーイング777"
+
+
+def segment(code, dep, arr, dep_time, arr_time):
+    return {"flight_no": code, "dpt_airport": dep, "arr_airport": arr, "dpt_datetime": dep_time, "arr_datetime": arr_time}
+
+
+def test_duration_matches_the_result_page():
+    # debug.html's first offer: HND 21:00 12/27 -> CMB 21:05 12/28 via PEK and TFU
+    expected = parse_flight_data(BeautifulSoup(clean_html(open('debug.html', encoding='utf-8').read()), 'lxml'), "0")[0]
+    offer = {"total_price": 99828, "segments": [
+        segment("CA0422", "HND", "PEK", "2025-12-27T21:00:00", "2025-12-28T00:05:00"),
+        segment("CA3569", "PEK", "TFU", "2025-12-28T07:40:00", "2025-12-28T10:55:00"),
+        segment("CA0425", "TFU", "CMB", "2025-12-28T18:20:00", "2025-12-28T21:05:00"),
+    ]}
+    flight = decode_offers([{"fares": [offer]}], "0")[0]
+    assert flight["duration"] == expected["duration"] == "27時間35分"
+    assert flight["departure"] == expected["departure"] and flight["arrival"] == expected["arrival"]
+
+
+def test_duration_field_and_utc_offsets():
+    legs = [segment("SQ637", "NRT", "SIN", "2025-12-27T15:30:00", "2025-12-27T21:45:00")]
+    # A duration field in the payload wins, in minutes or ISO 8601
+    assert decode_offers([{"fares": [{"price": 1, "duration": 465, "segments": legs}]}])[0]["duration"] == "7時間45分"
+    assert decode_offers([{"fares": [{"price": 1, "duration": "PT7H15M", "segments": legs}]}])[0]["duration"] == "7時間15分"
+    # Timestamps with an offset are converted to the airport's local time for display
+    utc = [segment("SQ637", "NRT", "SIN", "2025-12-27T06:30:00Z", "2025-12-27T13:45:00Z")]
+    flight = decode_offers([{"fares": [{"price": 1, "segments": utc}]}])[0]
+    assert flight["duration"] == "7時間15分"
+    assert flight["departure"]["time"] == "15:30" and flight["arrival"]["time"] == "21:45"
+    # Without a zone for one end the elapsed time is unknown rather than wrong
+    unknown = [segment("XX1", "NRT", "ZZZ", "2025-12-27T15:30:00", "2025-12-27T21:45:00")]
+    assert decode_offers([{"fares": [{"price": 1, "segments": unknown}]}])[0]["duration"] == "N/A"
+
+
+def test_decode_round_trip_offers():
+    flights = decode_offers([round_trip_payload], "1")
+    assert len(flights) == 1
+    flight = flights[0]
+    assert flight["trip_type"] == "round_trip"
+    assert flight["outbound"]["flight_code"] == "NH843"
+    assert flight["return"]["departure"]["airport"] == "SIN"
+    assert flight["outbound"]["transfers"]["count_str"] == "直行便"
+    assert [(s["flight_code"], s["connection"]) for s in flight["outbound"]["segments"]] == [("NH843", None)]
+    assert flight["outbound"]["duration"] == "7時間20分"
+    assert flight["stay_duration"] == "19日2時間50分"
+
+
+def test_unrecognised_payload_falls_back():
+    assert decode_offers([{"banners": [{"id": 1}]}, [1, 2, 3]], "0") is None
+    assert decode_offers([], "0") is None
+
+
+def test_collect_from_recorded_responses():
+    driver = RecordedDriver([
+        ("https://www.tour.ne.jp/w_air/api/search", "application/json", one_way_payload),
+        ("https://www.tour.ne.jp/w_air/list/", "text/html", {"ignored": True}),
+        ("https://ads.example.com/config.json", "application/json", {"ignored": True}),
+    ])
+    payloads = collect_json_responses(driver)
+    assert payloads == [one_way_payload]
+    assert decode_offers(payloads, "0")[0]["price"] == "86,344円"
+
+
+if __name__ == "__main__":
+    test_decode_one_way_offers()
+    test_duration_matches_the_result_page()
+    test_duration_field_and_utc_offsets()
+    test_decode_round_trip_offers()
+    test_unrecognised_payload_falls_back()
+    test_collect_from_recorded_responses()
+    print("✅ Network capture tests passed!")
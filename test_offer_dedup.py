@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for cross-provider offer deduplication.
+"""
+
+import copy
+
+from bs4 import BeautifulSoup
+from offer_dedup import dedupe_offers, itinerary_key
+from parser import parse_flight_data, clean_html
+
+
+def load(path, air_type):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), air_type)
+
+
+def resold(flight, provider, price):
+    offer = copy.deepcopy(flight)
+    offer.update(provider_name=provider, price=price)
+    return offer
+
+
+def test_same_itinerary_is_merged_into_cheapest():
+    first, second = load('debug.html', "0")[:2]
+    offers = [first, resold(first, "Trip.com", "95,000円"), second, resold(first, "Gotogate", "120,500円")]
+    merged = dedupe_offers(offers)
+    assert len(merged) == 2
+    assert merged[0]["provider_name"] == "Trip.com" and merged[0]["price"] == "95,000円"
+    assert merged[0]["alternatives"] == [{"provider_name": first["provider_name"], "price": first["price"]},
+                                         {"provider_name": "Gotogate", "price": "120,500円"}]
+    assert merged[1] is second and "alternatives" not in second
+    # Input offers are not modified
+    assert "alternatives" not in first
+
+
+def test_different_times_or_missing_codes_are_kept():
+    flight = load('debug.html', "0")[0]
+    later = resold(flight, "Trip.com", "90,000円")
+    later["departure"]["time"] = "22:00"
+    unknown = dict(flight, flight_code="N/A")
+    assert itinerary_key(flight) != itinerary_key(later) and itinerary_key(unknown) is None
+    assert len(dedupe_offers([flight, later, unknown, dict(unknown)])) == 4
+
+
+def test_round_trips_and_repeated_merges():
+    trip = load('flight.html', "1")[0]
+    other_return = resold(trip, "Expedia", "80,000円")
+    other_return["return"]["flight_code"] = "TG0001"
+    once = dedupe_offers([trip, resold(trip, "Expedia", "90,000円"), other_return])
+    assert [o["price"] for o in once] == ["90,000円", "80,000円"]
+    # Merging results of two cells again keeps every provider once
+    twice = dedupe_offers(once + [resold(trip, "Surprice", "99,000円"), copy.deepcopy(once[0])])
+    assert [a["provider_name"] for a in twice[0]["alternatives"]] == ["Gotogate", "Surprice"]
+
+
+def test_top_offers_become_diverse():
+    flights = load('debug.html', "0")
+    # Every itinerary sold by three providers, cheapest listed first
+    page = []
+    for flight in flights:
+        page += [flight, resold(flight, "B", "999,998円"), resold(flight, "C", "999,999円")]
+    assert len({f["flight_code"] for f in page[:3]}) == 1
+    top = dedupe_offers(page)[:3]
+    assert [f["flight_code"] for f in top] == [f["flight_code"] for f in flights[:3]]
+    assert all(len(f["alternatives"]) == 2 for f in top)
+
+
+if __name__ == "__main__":
+    test_same_itinerary_is_merged_into_cheapest()
+    test_different_times_or_missing_codes_are_kept()
+    test_round_trips_and_repeated_merges()
+    test_top_offers_become_diverse()
+    print("✅ Offer dedup tests passed!")
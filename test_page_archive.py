@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the raw page archive and the process-pool bulk re-parse.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+from page_archive import PageArchive, reparse_archive, chunk_entries, open_page_archive, INDEX_FILE, LOCK_FILE
+from parser import parse_flight_data, clean_html
+from result_store import ResultStore, cell_key
+
+
+def parse_file(path, air_type):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), air_type)
+
+
+def test_chunks_cover_every_entry():
+    entries = list(range(1000))
+    chunks = chunk_entries(entries, 4)
+    assert [e for chunk in chunks for e in chunk] == entries
+    assert len(chunks) == 16 and max(len(c) for c in chunks) == 63
+    assert chunk_entries([], 4) == []
+    assert chunk_entries([1, 2], 8) == [[1], [2]]
+
+
+def test_reparse_replaces_stored_offers():
+    one_way = {"origin": "TYO", "dest": "BKK", "dep_date": "20261210", "ret_date": None, "air_type": "0"}
+    round_trip = {"origin": "TYO", "dest": "SIN", "dep_date": "20261210", "ret_date": "20261220", "air_type": "1"}
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = PageArchive(os.path.join(tmp, "pages"))
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        pages = []
+        for i in range(3):
+            for cell, path in ((one_way, 'debug.html'), (round_trip, 'flight.html')):
+                scraped_at = 1700000000.0 + i * 60 + (0.5 if cell is round_trip else 0)
+                with open(path, 'r', encoding='utf-8') as f:
+                    archive.save(cell, f.read(), url=f"https://example.com/{i}", scraped_at=scraped_at)
+                pages.append((cell, scraped_at))
+        # A broken parser stored one bogus offer per search; one page was never stored at all
+        for cell, scraped_at in pages[:-1]:
+            store.record_search(cell, [{"price": "1円"}], scraped_at)
+        with open(archive.index_path, 'a', encoding='utf-8') as f:
+            f.write('{"file": "TYO-BKK')  # cut short by a crash
+
+        stats = reparse_archive(store, archive.archive_dir, workers=2)
+        assert stats["pages"] == 6 and stats["failed"] == 0 and stats["changed"] == 6
+
+        expected_one_way = parse_file('debug.html', "0")
+        expected_round_trip = parse_file('flight.html', "1")
+        _, flights = store.latest_flights(cell_key(one_way))
+        assert [f["price"] for f in flights] == [f["price"] for f in expected_one_way]
+        assert flights[0]["source_url"] == "https://example.com/2"
+        _, flights = store.latest_flights(cell_key(round_trip))
+        assert len(flights) == len(expected_round_trip)
+        rows = store.conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+        assert rows == 6
+
+        # Nothing changes on a second pass
+        stats = reparse_archive(store, archive.archive_dir, workers=2, since=1700000060.0)
+        assert stats["pages"] == 4 and stats["changed"] == 0
+        store.close()
+
+
+def test_archive_is_opt_in_and_pruned_by_age():
+    cell = {"origin": "TYO", "dest": "BKK", "dep_date": "20261210", "ret_date": None, "air_type": "0"}
+    other = dict(cell, dest="SIN")
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "pages")
+        assert open_page_archive({"PAGE_ARCHIVE_DIR": archive_dir}) is None
+        assert not os.path.exists(archive_dir)
+
+        archive = PageArchive(archive_dir)
+        now = 1700000000.0
+        archive.save(cell, "<old/>", scraped_at=now - 40 * 86400)
+        archive.save(other, "<old/>", scraped_at=now - 31 * 86400)
+        archive.save(cell, "<new/>", scraped_at=now - 86400)
+        assert archive.prune(30 * 86400, now=now) == 2
+        assert [e["scraped_at"] for e in archive.entries()] == [now - 86400]
+        assert sorted(os.listdir(archive_dir)) == sorted([INDEX_FILE, LOCK_FILE, cell_key(cell)])
+        assert len(os.listdir(os.path.join(archive_dir, cell_key(cell)))) == 1
+
+        # "0" keeps every page; by default pages older than 30 days (from now) go
+        config = {"PAGE_ARCHIVE": "true", "PAGE_ARCHIVE_DIR": archive_dir, "PAGE_ARCHIVE_MAX_AGE_DAYS": "0"}
+        assert open_page_archive(config).entries()
+        del config["PAGE_ARCHIVE_MAX_AGE_DAYS"]
+        assert open_page_archive(config).entries() == []
+
+
+def save_pages(archive_dir, dest, count):
+    archive = PageArchive(archive_dir)
+    for i in range(count):
+        archive.save({"origin": "TYO", "dest": dest, "dep_date": "20261210", "ret_date": None, "air_type": "0"},
+                     "<html/>", scraped_at=time.time() + i / 1000)
+
+
+def test_prune_never_drops_pages_saved_by_other_processes():
+    cell = {"origin": "TYO", "dest": "BKK", "dep_date": "20261210", "ret_date": None, "air_type": "0"}
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = PageArchive(os.path.join(tmp, "pages"))
+        for i in range(200):
+            archive.save(cell, "<old/>", scraped_at=1700000000.0 + i)
+        # Workers append while the coordinator prunes
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=save_pages, args=(archive.archive_dir, dest, 100))
+                   for dest in ("SIN", "HKG", "TPE")]
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            archive.prune(86400)
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+        archive.prune(86400)
+        entries = archive.entries()
+        assert len(entries) == 300 and {e["cell"]["dest"] for e in entries} == {"SIN", "HKG", "TPE"}
+
+
+if __name__ == "__main__":
+    test_chunks_cover_every_entry()
+    test_reparse_replaces_stored_offers()
+    test_archive_is_opt_in_and_pruned_by_age()
+    test_prune_never_drops_pages_saved_by_other_processes()
+    print("✅ Page archive tests passed!")
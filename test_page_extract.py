@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for in-page flight-area extraction: parsing only the card
+fragments must give the same records as parsing the full page.
+"""
+
+import json
+from bs4 import BeautifulSoup
+from parser import parse_flight_data, clean_html
+import page_extract
+from page_extract import fragments_to_html, StabilityTracker, collect_cards_until_stable, sort_by_price
+
+
+def parse(html, air_type):
+    return parse_flight_data(BeautifulSoup(clean_html(html), 'lxml'), air_type)
+
+
+def card_fragments(html):
+    """Mimics the in-page script: outerHTML of each top-level flight-area."""
+    soup = BeautifulSoup(html, 'lxml')
+    return [str(el) for el in soup.find_all('div', class_='flight-area')
+            if el.find_parent('div', class_='flight-area') is None]
+
+
+def check_page(path, air_type):
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    fragments = card_fragments(html)
+    wrapped = fragments_to_html(fragments)
+    full = parse(html, air_type)
+    assert full, f"{path} should contain flights"
+    assert json.dumps(parse(wrapped, air_type), ensure_ascii=False) == json.dumps(full, ensure_ascii=False)
+    return len(html), len(wrapped)
+
+
+def test_one_way_fragments_match_full_page():
+    full_size, fragment_size = check_page('debug.html', "0")
+    assert fragment_size * 5 < full_size
+
+
+def test_round_trip_fragments_match_full_page():
+    check_page('flight.html', "1")
+
+
+class StreamingDriver:
+    """Fake driver whose observer hands out the cards a few at a time."""
+
+    def __init__(self, fragments, batch_size):
+        self.batches = [fragments[i:i + batch_size] for i in range(0, len(fragments), batch_size)]
+        self.drains = 0
+
+    def execute_script(self, script, selector):
+        if script == page_extract.INSTALL_CARD_OBSERVER_SCRIPT:
+            return 0
+        self.drains += 1
+        return self.batches.pop(0) if self.batches else []
+
+
+def test_stability_tracker_waits_for_unchanged_top_offers():
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        flights = parse(f.read(), "0")
+    tracker = StabilityTracker(top_n=3, stable_seconds=5)
+    assert not tracker.update([], now=0)
+    assert not tracker.update(flights[:5], now=1)
+    assert not tracker.update(flights[:5], now=4)
+    assert tracker.update(flights[:5], now=6)
+    cheaper = dict(flights[0], price="1円")
+    assert not tracker.update(flights[:5] + [cheaper], now=7)
+    assert tracker.update(flights[:5] + [cheaper], now=12)
+
+
+def test_incremental_collection_matches_full_parse(monkeypatch):
+    monkeypatch.setattr(page_extract, "POLL_INTERVAL", 0.01)
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        html = f.read()
+    driver = StreamingDriver(card_fragments(html), batch_size=4)
+    batches = []
+    flights = collect_cards_until_stable(driver, "0", max_wait=30, stable_seconds=2,
+                                         on_batch=batches.append)
+    full = sort_by_price(parse(html, "0"))
+    assert json.dumps(flights, ensure_ascii=False) == json.dumps(full, ensure_ascii=False)
+    assert len(batches) == 5
+
+
+if __name__ == "__main__":
+    full_size, fragment_size = check_page('debug.html', "0")
+    print(f"debug.html: {full_size} bytes -> {fragment_size} bytes of fragments")
+    check_page('flight.html', "1")
+    test_stability_tracker_waits_for_unchanged_top_offers()
+    print("✅ Page extraction tests passed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-card parse cache: keys, LRU bound, SQLite sharing
+across processes and cached parsing of real result pages.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+from page_extract import parse_cards
+from parse_cache import ParseCache, card_key, normalize_card_html
+
+
+def page_fragments(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'lxml')
+    return [str(el) for el in soup.find_all('div', class_='flight-area')
+            if el.find_parent('div', class_='flight-area') is None]
+
+
+def test_keys_ignore_other_attributes():
+    card = '<div class="flight-area" data-id="1"><span class="price" style="x">86,344円</span></div>'
+    same = '<div  data-id="2" class="flight-area"><span class="price">86,344円</span></div>'
+    assert normalize_card_html(card) == '<div class="flight-area"><span class="price">86,344円</span></div>'
+    assert card_key(card) == card_key(same)
+    assert card_key(card) != card_key(card.replace("86,344", "86,345"))
+    assert card_key(card, "0") != card_key(card, "1")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ParseCache(max_entries=2)
+    cache.put("a", [{"price": "1円"}])
+    cache.put("b", [{"price": "2円"}])
+    assert cache.get("a") == [{"price": "1円"}]
+    cache.put("c", [])
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") == []
+    assert len(cache) == 2
+    assert cache.stats == {"hits": 3, "misses": 1, "disk_hits": 0, "evictions": 1}
+    # Hits are copies
+    cache.get("a")[0]["price"] = "changed"
+    assert cache.get("a") == [{"price": "1円"}]
+
+
+def _put_in_worker(db_path, key):
+    cache = ParseCache(db_path=db_path)
+    cache.put(key, [{"price": key}])
+    cache.close()
+    return key
+
+
+def test_database_is_shared_across_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "parse_cache.db")
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            keys = list(executor.map(_put_in_worker, [db_path] * 6, [f"k{i}" for i in range(6)]))
+        cache = ParseCache(db_path=db_path)
+        assert [cache.get(key) for key in keys] == [[{"price": key}] for key in keys]
+        assert cache.stats["disk_hits"] == 6
+        cache.close()
+
+
+def test_cached_parse_matches_uncached():
+    for path, air_type in (('debug.html', "0"), ('flight.html', "1")):
+        fragments = page_fragments(path)
+        expected = parse_cards(fragments, air_type)
+        cache = ParseCache()
+        assert parse_cards(fragments, air_type, cache) == expected
+        assert cache.stats["misses"] == len(fragments)
+        # The same cards in another order are all served from the cache
+        again = fragments[1:] + fragments[:1] if len(fragments) > 1 else fragments
+        assert parse_cards(again, air_type, cache)[-1] == expected[0]
+        assert cache.stats["hits"] == len(fragments)
+        assert expected
+
+
+if __name__ == "__main__":
+    test_keys_ignore_other_attributes()
+    test_lru_evicts_least_recently_used()
+    test_database_is_shared_across_processes()
+    test_cached_parse_matches_uncached()
+    print("✅ Parse cache tests passed!")
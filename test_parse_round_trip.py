@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for round-trip parsing: flight codes, transfer airports and
+segments must belong to their own direction.
+"""
+
+from bs4 import BeautifulSoup
+from parser import parse_flight_data, clean_html
+
+
+def parse(html):
+    return parse_flight_data(BeautifulSoup(clean_html(html), 'lxml'), "1")
+
+
+def segment_dl(code, dep, arr, end=False, connection=""):
+    arrival_class = "airport end" if end else "airport transfer"
+    return (f'<dl><dt><span class="date">1/5</span><b>{dep[1]}</b></dt>'
+            f'<dd class="airport"><b><a class="airport">{dep[0]}</a></b><span class="sch-term"><b></b>'
+            f'<span class="sch-dtl-desc"><span class="sch-dtl-desc-name"><span class="sch-dtl-desc-flt-code">{code}</span>'
+            f'</span></span></span></dd>'
+            f'<dt><span class="date">1/5</span><b>{arr[1]}</b></dt>'
+            f'<dd class="{arrival_class}"><b><a class="airport">{arr[0]}</a></b>'
+            f'<span class="sch-term"><b>{connection}</b></span></dd></dl>')
+
+
+def card(details):
+    header = '<div class="sch-header"><span class="sch-airline-name-sup">Airline</span></div>'
+    item = '<div class="sch-item"><div class="going-area"><span class="sch-time">10:00</span></div></div>'
+    return (f'<div class="flight-area"><div class="flight-summary-hdg">Agent</div>'
+            f'<span class="flight-summary-total-price">99,000円</span>'
+            f'{header}{item}{header}{item}{details}</div>')
+
+
+def test_directions_get_their_own_legs():
+    details = ('<div class="sch-dtl-container">'
+               '<div class="sch-dtl-item">'
+               + segment_dl("NH001", ("NRT", "10:00"), ("ICN", "12:30"), connection="02時間00分")
+               + segment_dl("OZ002", ("ICN", "14:30"), ("BKK", "18:00"), end=True)
+               + '</div><div class="sch-stay-item"></div><div class="sch-dtl-item">'
+               + segment_dl("TG003", ("BKK", "09:00"), ("NRT", "17:00"), end=True)
+               + '</div></div>')
+    flight = parse(card(details))[0]
+    outbound, inbound = flight["outbound"], flight["return"]
+    assert outbound["flight_code"] == "NH001, OZ002"
+    assert outbound["transfers"]["airports"] == ["ICN"]
+    assert inbound["flight_code"] == "TG003"
+    assert inbound["transfers"]["airports"] == []
+    assert outbound["segments"][0] == {
+        "flight_code": "NH001",
+        "departure": {"date": "1/5", "time": "10:00", "airport": "NRT"},
+        "arrival": {"date": "1/5", "time": "12:30", "airport": "ICN"},
+        "connection": "02時間00分",
+    }
+    assert outbound["segments"][1]["connection"] is None
+
+
+def test_card_without_details():
+    flight = parse(card(""))[0]
+    assert flight["outbound"]["flight_code"] == "N/A"
+    assert flight["return"]["transfers"]["airports"] == [] and flight["return"]["segments"] == []
+
+
+def test_recorded_round_trip_page():
+    with open('flight.html', 'r', encoding='utf-8') as f:
+        flight = parse(f.read())[0]
+    outbound, inbound = flight["outbound"], flight["return"]
+    assert outbound["flight_code"] == "RS0702, MU2004, MU9617"
+    assert outbound["transfers"]["airports"] == ["ICN", "KMG"]
+    assert inbound["flight_code"] == "AI0216, AI0881, FD0145, XJ0606"
+    assert inbound["transfers"]["airports"] == ["DEL", "AMD", "DMK"]
+    # The legs join up into the direction's overall route
+    for direction in (outbound, inbound):
+        legs = direction["segments"]
+        assert legs[0]["departure"]["airport"] == direction["departure"]["airport"]
+        assert legs[-1]["arrival"]["airport"] == direction["arrival"]["airport"]
+        assert all(a["arrival"]["airport"] == b["departure"]["airport"] for a, b in zip(legs, legs[1:]))
+
+
+if __name__ == "__main__":
+    test_directions_get_their_own_legs()
+    test_card_without_details()
+    test_recorded_round_trip_page()
+    print("✅ Round-trip parse tests passed!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the Chrome-free Pillow report renderer.
+"""
+
+import os
+import tempfile
+from bs4 import BeautifulSoup
+from PIL import Image
+from parser import parse_flight_data, clean_html
+from pillow_renderer import parse_markdown, render_report, render_report_images, SCALE, PAGE_WIDTH
+
+COMMENT = "**优点**：价格最低\n- 中转 *2小时*，注意 **行李** 规定\n2. second item with long english words to wrap"
+
+
+def load(path, air_type):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_flight_data(BeautifulSoup(clean_html(f.read()), 'lxml'), air_type)
+
+
+def report(flights, round_trip):
+    data = {
+        "origin_airport_name": "東京", "destination_airport_name": "ソウル", "today_date": "2026年 10月 19日",
+        "flights": flights[:3], "is_round_trip": round_trip, "summary_note": "以上为最便宜的三个航班选项。",
+        "report_url": "#",
+    }
+    if round_trip:
+        data.update(outbound_comments=[COMMENT], return_comments=[COMMENT])
+    else:
+        data["flight_comments"] = [COMMENT] * 3
+    return data
+
+
+def test_parse_markdown():
+    blocks = parse_markdown(COMMENT)
+    assert blocks[0] == (None, [("优点", True), ("：价格最低", False)])
+    assert blocks[1] == ("•", [("中转 2小时，注意 ", False), ("行李", True), (" 规定", False)])
+    assert blocks[2][0] == "2."
+
+
+def test_one_way_report_size_grows_with_comments():
+    flights = load('debug.html', "0")
+    image = render_report(report(flights, False))
+    assert image.width == PAGE_WIDTH * SCALE
+    without_comments = render_report(dict(report(flights, False), flight_comments=[]))
+    assert without_comments.height < image.height
+
+
+def test_round_trip_report_writes_full_width_pages():
+    flights = load('flight.html', "1")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = render_report_images(report(flights, True), os.path.join(tmp, "report"))
+        assert paths
+        for path in paths:
+            with Image.open(path) as image:
+                assert image.format == "JPEG" and image.width == PAGE_WIDTH * SCALE
+
+
+if __name__ == "__main__":
+    test_parse_markdown()
+    test_one_way_report_size_grows_with_comments()
+    test_round_trip_report_writes_full_width_pages()
+    print("✅ Pillow renderer tests passed!")
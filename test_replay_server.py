@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline replay server: recorded pages are served on the
+search URL path, and progressive injection keeps every card.
+"""
+
+import json
+import re
+import urllib.error
+import urllib.request
+from bs4 import BeautifulSoup
+from parser import parse_flight_data, clean_html
+from replay_server import ReplayServer, build_replay_page
+from scraper import build_search_url
+
+
+def parse(html, air_type):
+    return parse_flight_data(BeautifulSoup(clean_html(html), 'lxml'), air_type)
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode('utf-8')
+
+
+def test_replay_page_without_injection_parses_like_recording():
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        html = f.read()
+    replay_html, count = build_replay_page(html)
+    assert count == 20
+    assert '<script' not in replay_html
+    assert json.dumps(parse(replay_html, "0"), ensure_ascii=False) == json.dumps(parse(html, "0"), ensure_ascii=False)
+
+
+def test_injection_replaces_cards_with_slots():
+    with open('debug.html', 'r', encoding='utf-8') as f:
+        html = f.read()
+    replay_html, count = build_replay_page(html, inject_interval=0.5, batch_size=3)
+    soup = BeautifulSoup(replay_html, 'lxml')
+    assert len(soup.select('[data-replay-slot]')) == count
+    assert not parse(replay_html, "0")
+    script = soup.find_all('script')[-1].string
+    cards = json.loads(re.search(r"const cards = (\[.*?\]);\n", script, re.S).group(1).replace("<\\/", "</"))
+    assert len(cards) == count
+    assert json.dumps(parse("".join(cards), "0"), ensure_ascii=False) == json.dumps(parse(html, "0"), ensure_ascii=False)
+
+
+def test_server_answers_search_urls():
+    server = ReplayServer(port=0).start()
+    try:
+        one_way = {"origin": "TYO", "dest": "SEL", "dep_date": "20261220", "ret_date": None, "air_type": "0"}
+        round_trip = dict(one_way, ret_date="20261227", air_type="1")
+        assert len(parse(fetch(build_search_url(one_way, server.base_url)), "0")) == 20
+        assert len(parse(fetch(build_search_url(round_trip, server.base_url)), "1")) == 1
+        try:
+            fetch(server.base_url + "/elsewhere")
+            assert False, "expected 404"
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+        assert server.stats == {"pages_served": 2, "not_found": 1}
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_replay_page_without_injection_parses_like_recording()
+    test_injection_replaces_cards_with_slots()
+    test_server_answers_search_urls()
+    print("✅ Replay server tests passed!")
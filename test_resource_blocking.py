@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Test script for the scraping browser's URL block list
+"""
+
+from resource_blocking import DEFAULT_BLOCKED_URL_PATTERNS, blocked_url_patterns, blocking_enabled
+
+
+def test_blocked_url_patterns():
+    assert blocked_url_patterns({}) == DEFAULT_BLOCKED_URL_PATTERNS
+    patterns = blocked_url_patterns({
+        "BLOCKED_URL_PATTERNS": "*example-ads.com*, *.png*",
+        "ALLOWED_URL_PATTERNS": "*maps.googleapis.com*",
+    })
+    assert "*example-ads.com*" in patterns
+    assert "*maps.googleapis.com*" not in patterns
+    assert patterns.count("*.png*") == 1
+
+
+def test_blocking_enabled():
+    assert not blocking_enabled({})
+    assert not blocking_enabled({"RESOURCE_BLOCKING": None})
+    assert blocking_enabled({"RESOURCE_BLOCKING": "TRUE"})
+
+
+if __name__ == "__main__":
+    test_blocked_url_patterns()
+    test_blocking_enabled()
+    print("✅ Resource blocking tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental cross-route "where can I go cheapest" summary.
+"""
+
+import os
+import tempfile
+from datetime import datetime
+
+from result_store import ResultStore
+from route_analytics import RouteSummary, format_summary, run_route_analytics
+
+NOW = datetime(2026, 12, 1).timestamp()
+
+
+def cell(dest, dep_date, origin="TYO", ret_date=None):
+    return {"origin": origin, "dest": dest, "dep_date": dep_date, "ret_date": ret_date,
+            "air_type": "1" if ret_date else "0"}
+
+
+def offers(*prices):
+    return [{"price": f"{price:,}円"} for price in prices]
+
+
+def summary_prices(store):
+    rows = store.conn.execute("SELECT origin, dest, dep_date, air_type, min_price FROM route_summary").fetchall()
+    return {f"{o}-{d}-{date}-{a}": price for o, d, date, a, price in rows}
+
+
+def test_summary_updates_only_scraped_groups():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        store.record_search(cell("SIN", "20261210"), offers(52000, 48000), NOW - 7200)
+        store.record_search(cell("BKK", "20261210"), offers(39000), NOW - 7200)
+        store.record_search(cell("BKK", "20261211"), offers(41000) + [{"price": "N/A"}], NOW - 7200)
+        store.record_search(cell("SIN", "20261210", ret_date="20261220"), offers(90000), NOW - 7200)
+        store.record_search(cell("SIN", "20261210", ret_date="20261217"), offers(85000), NOW - 7200)
+        summary = RouteSummary(store)
+        assert summary.update() == 4
+        assert summary_prices(store) == {"TYO-SIN-20261210-0": 48000, "TYO-BKK-20261210-0": 39000,
+                                         "TYO-BKK-20261211-0": 41000, "TYO-SIN-20261210-1": 85000}
+        row = store.conn.execute("SELECT ret_date, cells FROM route_summary WHERE air_type = '1'").fetchone()
+        assert row == ("20261217", 2)
+
+        # Only the latest search of a cell counts, and only changed groups are recomputed
+        store.record_search(cell("SIN", "20261210"), offers(60000), NOW)
+        store.record_search(cell("BKK", "20261211"), [], NOW)
+        store.conn.execute("UPDATE route_summary SET min_price = 1 WHERE dest = 'BKK' AND dep_date = '20261210'")
+        summary = RouteSummary(store)
+        assert summary.update() == 2 and summary.update() == 0
+        prices = summary_prices(store)
+        assert prices["TYO-SIN-20261210-0"] == 60000
+        assert "TYO-BKK-20261211-0" not in prices
+        assert prices["TYO-BKK-20261210-0"] == 1
+        store.close()
+
+
+def test_cheapest_views_and_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        prices = {("SIN", "20261210"): 48000, ("BKK", "20261210"): 39000, ("SIN", "20261211"): 45000,
+                  ("BKK", "20261211"): 41000, ("SIN", "20261130"): 10000}
+        for (dest, dep_date), price in prices.items():
+            store.record_search(cell(dest, dep_date), offers(price), NOW - 3600)
+        store.record_search(cell("BKK", "20261210", origin="NRT"), offers(37000), NOW - 3600)
+        summary = RouteSummary(store)
+        summary.update()
+
+        by_date = summary.cheapest_destinations(today="20261201")
+        assert [(r["dep_date"], r["origin"], r["dest"], r["count"]) for r in by_date] == [
+            ("20261210", "NRT", "BKK", 3), ("20261211", "TYO", "BKK", 2)]
+        by_route = summary.cheapest_dates(today="20261201")
+        assert [(r["origin"], r["dest"], r["dep_date"], r["count"]) for r in by_route] == [
+            ("NRT", "BKK", "20261210", 1), ("TYO", "BKK", "20261210", 2), ("TYO", "SIN", "20261211", 2)]
+
+        report = format_summary(summary, top=2, origins=["TYO"], now=NOW)
+        assert "| 2026-12-10 | TYO-BKK | 39,000円 | 2 | 1h |" in report
+        assert "| TYO-SIN | 2026-12-11 | 45,000円 | 2 | 1h |" in report
+        assert "NRT" not in report and "Round-trip" not in report and "2026-11-30" not in report
+
+        report_path = os.path.join(tmp, "summary.md")
+        report = run_route_analytics({"ROUTE_REPORT_ORIGINS": "TYO"}, store, report_path)
+        with open(report_path, 'r', encoding='utf-8') as f:
+            assert f.read() == report and report.startswith("# Cheapest routes")
+        store.close()
+
+
+if __name__ == "__main__":
+    test_summary_updates_only_scraped_groups()
+    test_cheapest_views_and_report()
+    print("✅ Route analytics tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the priority scheduler and result store
+"""
+
+import os
+import tempfile
+import time
+from result_store import ResultStore, cell_key
+from scheduler import CellScheduler, score_cell, price_volatility
+
+
+def make_cell(dest, dep_date):
+    return {"origin": "TYO", "dest": dest, "dep_date": dep_date, "ret_date": None, "air_type": "0"}
+
+
+def test_price_volatility():
+    assert price_volatility([]) == 1.0
+    assert price_volatility([50000]) == 1.0
+    assert price_volatility([50000, 50000, 50000]) == 0.0
+    assert price_volatility([40000, 60000]) > price_volatility([49000, 51000])
+
+
+def test_score_prefers_stale_and_unseen_cells():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        now = time.time()
+        dep_date = time.strftime("%Y%m%d", time.localtime(now + 30 * 86400))
+        fresh, stale, unseen = make_cell("SIN", dep_date), make_cell("BKK", dep_date), make_cell("HKG", dep_date)
+        store.record_search(fresh, [{"price": "50,000円"}], scraped_at=now - 60)
+        store.record_search(stale, [{"price": "50,000円"}], scraped_at=now - 2 * 86400)
+
+        scores = {c["dest"]: score_cell(c, store, now) for c in (fresh, stale, unseen)}
+        assert scores["HKG"] > scores["BKK"] > scores["SIN"]
+        assert score_cell(make_cell("SIN", "20000101"), store, now) is None
+        store.close()
+
+
+class EmptyResultsDriver:
+    """Loads a result page without any flight-area card."""
+    page_source = "<html><body><div class='no-result'>該当する航空券はありません</div></body></html>"
+
+    def get(self, url):
+        pass
+
+
+def test_empty_cells_are_recorded_and_not_rescraped_first():
+    from scraper import scrape_cell
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        now = time.time()
+        dep_date = time.strftime("%Y%m%d", time.localtime(now + 30 * 86400))
+        empty, unseen = make_cell("SIN", dep_date), make_cell("HKG", dep_date)
+        config = {"CAPTURE_MODE": "page_source", "SCRAPE_MAX_WAIT": "0", "PARSE_CACHE": "false"}
+        assert scrape_cell(EmptyResultsDriver(), empty, store, config) == []
+
+        assert store.last_scraped_at(cell_key(empty)) is not None
+        assert store.latest_flights(cell_key(empty))[1] == []
+        assert store.latest_searches() == []
+        # A route without offers is as fresh as any other just-scraped cell
+        assert score_cell(unseen, store, now) > score_cell(empty, store, now) * 100
+        store.close()
+
+
+def test_run_defers_cells_over_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        state_path = os.path.join(tmp, "queue.json")
+        dep_date = time.strftime("%Y%m%d", time.localtime(time.time() + 10 * 86400))
+        cells = [make_cell(dest, dep_date) for dest in ("SIN", "BKK", "HKG")]
+
+        def scrape(cell):
+            store.record_search(cell, [{"price": "10,000円"}])
+            return [{"price": "10,000円"}]
+
+        # A zero budget defers everything to the persisted queue
+        scheduler = CellScheduler(store, state_path)
+        assert scheduler.run(cells, scrape, time_budget=0) == []
+        assert len(CellScheduler(store, state_path).pending) == 3
+
+        # An unlimited run drains the queue
+        scheduler = CellScheduler(store, state_path)
+        assert len(scheduler.run(cells, scrape)) == 3
+        assert CellScheduler(store, state_path).pending == {}
+        assert store.last_scraped_at(cell_key(cells[0])) is not None
+        store.close()
+
+
+if __name__ == "__main__":
+    test_price_volatility()
+    test_score_prefers_stale_and_unseen_cells()
+    test_empty_cells_are_recorded_and_not_rescraped_first()
+    test_run_defers_cells_over_budget()
+    print("✅ Scheduler tests passed!")
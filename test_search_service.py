@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-demand search service (cache + request coalescing)
+"""
+
+import os
+import tempfile
+import threading
+import time
+import pytest
+import search_service
+from browser_pool import BrowserPool
+from result_store import ResultStore
+from search_service import SearchService, build_cell
+
+
+class FakeDriver:
+    current_url = "about:blank"
+
+    def quit(self):
+        pass
+
+
+def test_build_cell_validation():
+    cell = build_cell("tyo", "sin", "20260101")
+    assert cell == {"origin": "TYO", "dest": "SIN", "dep_date": "20260101", "ret_date": None, "air_type": "0"}
+    assert build_cell("TYO", "SIN", "20260101", "20260110", "1")["ret_date"] == "20260110"
+    for args in (("TOKYO", "SIN", "20260101"), ("TYO", "SIN", "2026-01-01"), ("TYO", "SIN", "20260101", None, "1")):
+        with pytest.raises(ValueError):
+            build_cell(*args)
+
+
+def test_concurrent_requests_are_coalesced(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def fake_scrape_cell(driver, cell, store, config=None, archive=None):
+        calls.append(cell)
+        release.wait(5)
+        flights = [{"price": "42,000円"}]
+        store.record_search(cell, flights)
+        return flights
+
+    monkeypatch.setattr(search_service, "scrape_cell", fake_scrape_cell)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        service = SearchService(store, BrowserPool(FakeDriver, size=2))
+        cell = build_cell("TYO", "SIN", "20260101")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.search(cell))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert len(calls) == 1
+        assert len(results) == 5
+        assert sum(r["coalesced"] for r in results) == 4
+
+        # Fresh results are now served from the store without scraping
+        cached = service.search(cell)
+        assert cached["cached"] and cached["flights"] == [{"price": "42,000円"}]
+        assert len(calls) == 1
+
+        # max_age=0 forces a new scrape
+        service.search(cell, max_age=0)
+        assert len(calls) == 2
+        service.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    test_build_cell_validation()
+    print("✅ Search service validation test passed! (run with pytest for the coalescing test)")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Test script for the fast startup path: importing scraper must not load the
+scraping or rendering stack, and reports only look up their own airports.
+"""
+
+import subprocess
+import sys
+
+from scraper import load_airport_data
+
+HEAVY_MODULES = ("selenium", "bs4", "lxml", "PIL", "requests", "markdown", "structlog")
+
+
+def test_import_loads_no_heavy_modules():
+    check = f"import sys, scraper; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_airport_lookup_by_code():
+    everything = load_airport_data()
+    found = load_airport_data(codes={"NRT", "ICN", "???"})
+    assert found == {"NRT": everything["NRT"], "ICN": everything["ICN"]}
+    assert found["NRT"] == "Narita International Airport"
+    assert load_airport_data("missing.csv", codes={"NRT"}) == {}
+
+
+if __name__ == "__main__":
+    test_import_loads_no_heavy_modules()
+    test_airport_lookup_by_code()
+    print("✅ Startup tests passed!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the interactive Telegram bot helpers
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from result_store import ResultStore
+from telegram_commands import FlightBot, RateLimiter, format_flights_message, format_cheapest_message
+
+flight = {
+    "provider_name": "Gotogate",
+    "price": "86,344円",
+    "airline": "シンガポール航空",
+    "departure": {"date": "2025年12月27日", "time": "15:30", "airport": "NRT"},
+    "arrival": {"date": "2025年12月28日", "time": "23:40", "airport": "SIN"},
+    "duration": "9時間10分",
+    "transfers": {"count_str": "直行便", "airports": []},
+}
+
+
+def test_rate_limiter_refills():
+    limiter = RateLimiter(2, period=3600)
+    assert limiter.allow("chat", now=0)
+    assert limiter.allow("chat", now=0)
+    assert not limiter.allow("chat", now=1)
+    assert limiter.allow("other", now=1)
+    # Half the period refills one of the two tokens
+    assert limiter.allow("chat", now=1801)
+    assert not limiter.allow("chat", now=1802)
+
+
+def test_format_flights_message():
+    cell = {"origin": "TYO", "dest": "SIN", "dep_date": "20251227", "ret_date": None, "air_type": "0"}
+    now = time.time()
+    message = format_flights_message(cell, now - 120, [flight] * 7, now=now)
+    assert "*TYO → SIN* 20251227" in message
+    assert "2分钟前" in message
+    assert "5. *86,344円*" in message and "6." not in message
+    assert "NRT 15:30 → SIN 23:40" in message
+
+
+def test_cheapest_message_from_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        for dep_date, price in (("20260101", "60,000円"), ("20260102", "50,000円"), ("20260103", "70,000円")):
+            cell = {"origin": "TYO", "dest": "SIN", "dep_date": dep_date, "ret_date": None, "air_type": "0"}
+            store.record_search(cell, [{"price": price}])
+        rows = store.latest_searches("SIN")
+        assert [r["dep_date"] for r in rows] == ["20260102", "20260101", "20260103"]
+        message = format_cheapest_message("SIN", rows)
+        assert "1. *50,000円* TYO→SIN 20260102" in message
+        assert "暂无" in format_cheapest_message("BKK", store.latest_searches("BKK"))
+        store.close()
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, parse_mode=None):
+        self.replies.append((text, parse_mode))
+
+
+def test_cheapest_rejects_codes_that_break_markdown():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        bot = FlightBot(SimpleNamespace(store=store), RateLimiter(1))
+        for arg, markdown in (("A_B", None), ("*", None), ("sin", "Markdown")):
+            message = FakeMessage()
+            update = SimpleNamespace(effective_message=message)
+            asyncio.run(bot.cheapest(update, SimpleNamespace(args=[arg])))
+            [(text, parse_mode)] = message.replies
+            assert parse_mode == markdown
+            assert ("参数错误" in text) == (markdown is None)
+        store.close()
+
+
+if __name__ == "__main__":
+    test_rate_limiter_refills()
+    test_format_flights_message()
+    test_cheapest_message_from_store()
+    test_cheapest_rejects_codes_that_break_markdown()
+    print("✅ Telegram command tests passed!")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the distributed work queue (SQLite and Redis-protocol backends).
+"""
+
+import os
+import tempfile
+import threading
+
+from resp_server import RespServer
+from result_store import ResultStore
+from work_queue import RedisWorkQueue, SqliteWorkQueue, open_work_queue, process_one, run_coordinator, run_worker
+import work_queue
+
+
+def cell(dest, dep_date="20991210"):
+    return {"origin": "TYO", "dest": dest, "dep_date": dep_date, "ret_date": None, "air_type": "0"}
+
+
+def both_queues(max_attempts=2):
+    """Yields an empty SqliteWorkQueue, then an empty RedisWorkQueue on the stand-in server."""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = open_work_queue({"WORK_QUEUE_URL": "sqlite:///" + os.path.join(tmp, "queue.db"),
+                                 "WORK_QUEUE_MAX_ATTEMPTS": str(max_attempts)})
+        assert isinstance(queue, SqliteWorkQueue)
+        yield queue
+        queue.close()
+    server = RespServer(port=0).start()
+    try:
+        queue = open_work_queue({"WORK_QUEUE_URL": server.url, "WORK_QUEUE_MAX_ATTEMPTS": str(max_attempts)})
+        assert isinstance(queue, RedisWorkQueue)
+        yield queue
+        queue.close()
+    finally:
+        server.stop()
+
+
+def test_lease_complete_and_collect():
+    for queue in both_queues():
+        cells = [cell("SIN"), cell("BKK"), cell("HKG")]
+        assert queue.enqueue(cells) == 3 and queue.enqueue(cells[:1]) == 0
+        key, leased, attempt = queue.lease("w1", 60)
+        assert (key, leased, attempt) == ("TYO-SIN-20991210", cells[0], 1)
+        assert queue.lease("w2", 60)[0] == "TYO-BKK-20991210"
+        assert queue.stats() == {"pending": 1, "leased": 2, "done": 0}
+        assert not queue.complete(key, "w2", [])
+        assert queue.complete(key, "w1", [{"price": "42,000円"}])
+        [(done_key, done_cell, result)] = queue.collect()
+        assert (done_key, done_cell, result["flights"], result["worker"]) == (key, cells[0], [{"price": "42,000円"}], "w1")
+        assert queue.collect() == []
+        # A collected cell can be queued again by the next run
+        assert queue.enqueue(cells[:1]) == 1
+
+
+def test_expired_leases_are_retried_then_failed():
+    for queue in both_queues(max_attempts=2):
+        queue.enqueue([cell("SIN")])
+        key, _, _ = queue.lease("crashed", 10, now=1000.0)
+        assert queue.lease("w2", 10, now=1005.0) is None
+        # The crashed worker's lease ran out: the cell is leased again
+        assert queue.lease("w2", 10, now=1011.0) == (key, cell("SIN"), 2)
+        assert not queue.complete(key, "crashed", [])
+        queue.fail(key, "w2", "scrape failed")
+        [(_, _, result)] = queue.collect()
+        assert result["flights"] is None and result["error"] == "scrape failed"
+
+        queue.enqueue([cell("BKK")])
+        key, _, _ = queue.lease("w1", 10)
+        queue.fail(key, "w1", "scrape failed")
+        assert queue.stats()["pending"] == 1
+
+
+def test_concurrent_workers_never_share_a_cell():
+    for queue in both_queues():
+        queue.enqueue([cell(f"D{i:02d}") for i in range(40)])
+        scraped = []
+        lock = threading.Lock()
+
+        def scrape(c):
+            with lock:
+                scraped.append(c["dest"])
+            return [{"price": "1円"}]
+
+        def worker(name):
+            # Own SQLite connection per worker, as in separate containers
+            own = SqliteWorkQueue(queue.db_path) if isinstance(queue, SqliteWorkQueue) else queue
+            run_worker(own, scrape, name, idle_exit=0)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(scraped) == [f"D{i:02d}" for i in range(40)]
+        assert len(queue.collect()) == 40
+
+
+def test_coordinator_records_worker_results(monkeypatch):
+    monkeypatch.setattr(work_queue, "POLL_SECONDS", 0.01)
+    for queue in both_queues():
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ResultStore(os.path.join(tmp, "results.db"))
+            cells = [cell("SIN"), cell("BKK"), cell("HKG"), cell("TPE")]
+            # Workers elsewhere already finished two cells of this run, one without flights
+            queue.enqueue([cells[0], cells[3]])
+            for flights in ([{"price": "30,000円"}], []):
+                key, _, _ = queue.lease("remote", 60)
+                queue.complete(key, "remote", flights)
+
+            def scrape(c):
+                flights = [{"price": "50,000円"}] if c["dest"] != "HKG" else None
+                if flights:
+                    store.record_search(c, flights)
+                return flights
+
+            recorded = []
+            flights = run_coordinator(queue, cells, scrape,
+                                      lambda c, f, t: (recorded.append(c["dest"]), store.record_search(c, f, t)))
+            assert recorded == ["SIN", "TPE"]
+            assert sorted(f["price"] for f in flights) == ["30,000円", "50,000円"]
+            assert [row["dest"] for row in store.latest_searches()] == ["SIN", "BKK"]
+            assert store.latest_flights("TYO-TPE-20991210")[1] == []
+            assert queue.stats() == {"pending": 0, "leased": 0, "done": 0}
+            store.close()
+
+
+class RecordedPageDriver:
+    """Loads debug.html for every search."""
+
+    def __init__(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'debug.html'), 'r', encoding='utf-8') as f:
+            self.page_source = f.read()
+
+    def get(self, url):
+        pass
+
+
+def test_worker_results_are_saved_once(monkeypatch):
+    from scraper import scrape_queued_cell, record_queued_result
+
+    monkeypatch.setattr(work_queue, "POLL_SECONDS", 0.01)
+    config = {"CAPTURE_MODE": "page_source", "SCRAPE_MAX_WAIT": "0", "PARSE_CACHE": "false"}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Worker and coordinator share data/, as in docker-compose
+        monkeypatch.chdir(tmp)
+        queue = open_work_queue({"WORK_QUEUE_URL": "sqlite:///" + os.path.join(tmp, "queue.db")})
+        store = ResultStore(os.path.join(tmp, "results.db"))
+        queue.enqueue([cell("CMB")])
+        assert process_one(queue, lambda c: scrape_queued_cell(RecordedPageDriver(), c, config), "remote") is not None
+        assert not os.path.exists("data")
+
+        flights = run_coordinator(queue, [cell("CMB")], lambda c: None,
+                                  lambda c, f, t: record_queued_result(store, c, f, t))
+        assert flights and store.latest_flights("TYO-CMB-20991210")[1] == flights
+        assert len([name for name in os.listdir("data") if name.endswith(".md")]) == 1
+        store.close()
+        queue.close()
+
+
+if __name__ == "__main__":
+    test_lease_complete_and_collect()
+    test_expired_leases_are_retried_then_failed()
+    test_concurrent_workers_never_share_a_cell()
+    print("✅ Work queue tests passed! (run with pytest for the coordinator test)")
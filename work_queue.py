@@ -0,0 +1,418 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from result_store import cell_key
+
+# Shared queue of search cells for scraping with several workers (containers).
+# The coordinator (`python scraper.py` with WORK_QUEUE_URL set) enqueues the
+# run's cells and collects the results; workers (`python scraper.py worker`)
+# lease one cell at a time, scrape it and complete it with its flights. A
+# lease expires after WORK_QUEUE_LEASE_SECONDS, so the cell of a crashed
+# worker goes back to the queue; after WORK_QUEUE_MAX_ATTEMPTS leases it is
+# completed as failed. Results travel through the queue, so workers need
+# neither the result store nor the coordinator's data volume.
+#
+# Two implementations with the same methods:
+# - SqliteWorkQueue: one SQLite file, for containers sharing a volume
+# - RedisWorkQueue: any Redis-protocol server (resp_server.py is a local stand-in)
+
+DEFAULT_QUEUE_PATH = 'data/work_queue.db'
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_REDIS_PREFIX = 'flights:queue:'
+
+# Seconds between polls of an empty queue
+POLL_SECONDS = 2.0
+
+
+def worker_name():
+    """Returns an identifier for this process, unique across containers."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _result(flights, worker, error=None):
+    return json.dumps({'flights': flights, 'scraped_at': time.time(), 'worker': worker, 'error': error},
+                      ensure_ascii=False)
+
+
+class SqliteWorkQueue:
+    """Work queue in a SQLite file shared by the coordinator and the workers.
+
+    Each cell is one row of `jobs` (state pending, leased or done); leasing
+    runs in an IMMEDIATE transaction, so two workers never get the same cell.
+    """
+
+    def __init__(self, db_path=DEFAULT_QUEUE_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.RLock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                cell TEXT NOT NULL,
+                state TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            )
+        """)
+
+    def _transaction(self, fn):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return value
+
+    def enqueue(self, cells):
+        """Adds cells that are not queued yet; returns how many were added."""
+        def add(conn):
+            return sum(conn.execute(
+                "INSERT OR IGNORE INTO jobs (key, cell, state) VALUES (?, ?, 'pending')",
+                (cell_key(cell), json.dumps(cell, ensure_ascii=False))
+            ).rowcount for cell in cells)
+        return self._transaction(add)
+
+    def _reclaim(self, conn, now):
+        expired = conn.execute(
+            "SELECT key, attempts, worker FROM jobs WHERE state = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for key, attempts, worker in expired:
+            print(f"Work queue: lease of {key} by {worker} expired")
+            if attempts >= self.max_attempts:
+                conn.execute("UPDATE jobs SET state = 'done', worker = NULL, lease_expires = NULL, result = ?"
+                             " WHERE key = ?", (_result(None, worker, "lease expired"), key))
+            else:
+                conn.execute("UPDATE jobs SET state = 'pending', worker = NULL, lease_expires = NULL"
+                             " WHERE key = ?", (key,))
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+        """Leases the oldest pending cell to `worker`.
+
+        Returns:
+            (key, cell, attempt) or None if no cell is pending
+        """
+        now = time.time() if now is None else now
+
+        def take(conn):
+            self._reclaim(conn, now)
+            row = conn.execute(
+                "SELECT key, cell, attempts FROM jobs WHERE state = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1"
+                         " WHERE key = ?", (worker, now + lease_seconds, row[0]))
+            return row[0], json.loads(row[1]), row[2] + 1
+        return self._transaction(take)
+
+    def complete(self, key, worker, flights):
+        """Stores the flights of a leased cell.
+
+        Returns:
+            False if the lease had expired and the cell was given to another worker
+        """
+        def finish(conn):
+            return conn.execute(
+                "UPDATE jobs SET state = 'done', worker = NULL, lease_expires = NULL, result = ?"
+                " WHERE key = ? AND state = 'leased' AND worker = ?",
+                (_result(flights, worker), key, worker)
+            ).rowcount == 1
+        return self._transaction(finish)
+
+    def fail(self, key, worker, error):
+        """Returns a leased cell to the queue, or completes it as failed after max_attempts."""
+        def give_back(conn):
+            row = conn.execute("SELECT attempts FROM jobs WHERE key = ? AND state = 'leased' AND worker = ?",
+                               (key, worker)).fetchone()
+            if row is None:
+                return
+            if row[0] >= self.max_attempts:
+                conn.execute("UPDATE jobs SET state = 'done', worker = NULL, lease_expires = NULL, result = ?"
+                             " WHERE key = ?", (_result(None, worker, error), key))
+            else:
+                conn.execute("UPDATE jobs SET state = 'pending', worker = NULL, lease_expires = NULL"
+                             " WHERE key = ?", (key,))
+        self._transaction(give_back)
+
+    def collect(self):
+        """Removes and returns the finished cells as [(key, cell, result)].
+
+        result is a dict with flights (None if the cell failed), scraped_at,
+        worker and error.
+        """
+        def pop(conn):
+            rows = conn.execute("SELECT key, cell, result FROM jobs WHERE state = 'done' ORDER BY id").fetchall()
+            conn.execute("DELETE FROM jobs WHERE state = 'done'")
+            return [(key, json.loads(cell), json.loads(result)) for key, cell, result in rows]
+        return self._transaction(pop)
+
+    def stats(self):
+        """Returns the number of pending, leased and done cells."""
+        with self.lock:
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in ('pending', 'leased', 'done')}
+
+    def close(self):
+        self.conn.close()
+
+
+class RedisWorkQueue:
+    """Work queue on a Redis-protocol server, for workers on several hosts.
+
+    Keys (under `prefix`): a `pending` list of cell keys, the `cells`,
+    `owners`, `attempts` and `results` hashes and a `leases` sorted set
+    scored by lease expiry. Every step is a WATCH/MULTI/EXEC transaction,
+    so it works on servers without Lua scripting.
+    """
+
+    def __init__(self, client, prefix=DEFAULT_REDIS_PREFIX, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.client = client
+        self.max_attempts = max_attempts
+        self.pending, self.cells, self.owners, self.attempts, self.results, self.leases = (
+            prefix + name for name in ('pending', 'cells', 'owners', 'attempts', 'results', 'leases'))
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        # RESP2: spoken by every Redis-compatible server, including resp_server.py
+        return cls(redis.Redis.from_url(url, decode_responses=True, protocol=2), **kwargs)
+
+    def enqueue(self, cells):
+        """Adds cells that are not queued yet; returns how many were added."""
+        added = 0
+        for cell in cells:
+            key = cell_key(cell)
+
+            def add(pipe):
+                if pipe.hexists(self.cells, key):
+                    return False
+                pipe.multi()
+                pipe.hset(self.cells, key, json.dumps(cell, ensure_ascii=False))
+                pipe.rpush(self.pending, key)
+                return True
+            added += self.client.transaction(add, self.cells, value_from_callable=True)
+        return added
+
+    def _reclaim(self, now):
+        for key in self.client.zrangebyscore(self.leases, '-inf', now):
+            def requeue(pipe):
+                score = pipe.zscore(self.leases, key)
+                if score is None or score >= now:
+                    return
+                worker = pipe.hget(self.owners, key)
+                attempts = int(pipe.hget(self.attempts, key) or 0)
+                print(f"Work queue: lease of {key} by {worker} expired")
+                pipe.multi()
+                pipe.zrem(self.leases, key)
+                pipe.hdel(self.owners, key)
+                if attempts >= self.max_attempts:
+                    pipe.hset(self.results, key, _result(None, worker, "lease expired"))
+                else:
+                    pipe.rpush(self.pending, key)
+            self.client.transaction(requeue, self.leases)
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+        """Leases the oldest pending cell to `worker`.
+
+        Returns:
+            (key, cell, attempt) or None if no cell is pending
+        """
+        now = time.time() if now is None else now
+        self._reclaim(now)
+
+        def take(pipe):
+            key = pipe.lindex(self.pending, 0)
+            if key is None:
+                return None
+            cell = pipe.hget(self.cells, key)
+            attempt = int(pipe.hget(self.attempts, key) or 0) + 1
+            pipe.multi()
+            pipe.lpop(self.pending)
+            pipe.zadd(self.leases, {key: now + lease_seconds})
+            pipe.hset(self.owners, key, worker)
+            pipe.hset(self.attempts, key, attempt)
+            return key, json.loads(cell), attempt
+        return self.client.transaction(take, self.pending, value_from_callable=True)
+
+    def complete(self, key, worker, flights):
+        """Stores the flights of a leased cell.
+
+        Returns:
+            False if the lease had expired and the cell was given to another worker
+        """
+        def finish(pipe):
+            if pipe.hget(self.owners, key) != worker:
+                return False
+            pipe.multi()
+            pipe.zrem(self.leases, key)
+            pipe.hdel(self.owners, key)
+            pipe.hset(self.results, key, _result(flights, worker))
+            return True
+        return self.client.transaction(finish, self.owners, value_from_callable=True)
+
+    def fail(self, key, worker, error):
+        """Returns a leased cell to the queue, or completes it as failed after max_attempts."""
+        def give_back(pipe):
+            if pipe.hget(self.owners, key) != worker:
+                return
+            attempts = int(pipe.hget(self.attempts, key) or 0)
+            pipe.multi()
+            pipe.zrem(self.leases, key)
+            pipe.hdel(self.owners, key)
+            if attempts >= self.max_attempts:
+                pipe.hset(self.results, key, _result(None, worker, error))
+            else:
+                pipe.rpush(self.pending, key)
+        self.client.transaction(give_back, self.owners)
+
+    def collect(self):
+        """Removes and returns the finished cells as [(key, cell, result)] (see SqliteWorkQueue.collect)."""
+        def pop(pipe):
+            results = pipe.hgetall(self.results)
+            if not results:
+                return []
+            keys = list(results)
+            cells = pipe.hmget(self.cells, keys)
+            pipe.multi()
+            pipe.hdel(self.results, *keys)
+            pipe.hdel(self.cells, *keys)
+            pipe.hdel(self.attempts, *keys)
+            return [(key, json.loads(cell), json.loads(results[key])) for key, cell in zip(keys, cells)]
+        return self.client.transaction(pop, self.results, value_from_callable=True)
+
+    def stats(self):
+        """Returns the number of pending, leased and done cells."""
+        return {'pending': self.client.llen(self.pending), 'leased': self.client.zcard(self.leases),
+                'done': self.client.hlen(self.results)}
+
+    def close(self):
+        self.client.close()
+
+
+def open_work_queue(config):
+    """Opens the queue named by WORK_QUEUE_URL, or returns None if it is not set.
+
+    "redis://host:6379/0" opens a RedisWorkQueue; "sqlite:///data/work_queue.db"
+    or a plain file path a SqliteWorkQueue.
+    """
+    url = config.get("WORK_QUEUE_URL")
+    if not url:
+        return None
+    max_attempts = int(config.get("WORK_QUEUE_MAX_ATTEMPTS") or DEFAULT_MAX_ATTEMPTS)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue.from_url(url, max_attempts=max_attempts)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SqliteWorkQueue(url, max_attempts=max_attempts)
+
+
+def process_one(queue, scrape_fn, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Leases one cell, scrapes it and completes (or fails) it.
+
+    Args:
+        scrape_fn: Callable taking a cell and returning its flights, or None on failure
+
+    Returns:
+        The leased cell key, or None if the queue had nothing pending
+    """
+    job = queue.lease(worker, lease_seconds)
+    if job is None:
+        return None
+    key, cell, attempt = job
+    print(f"Work queue: {worker} scraping {key} (attempt {attempt})")
+    try:
+        flights = scrape_fn(cell)
+    except Exception as e:
+        flights, error = None, f"{type(e).__name__}: {e}"
+    else:
+        error = "scrape failed"
+    if flights is None:
+        queue.fail(key, worker, error)
+    elif not queue.complete(key, worker, flights):
+        print(f"Work queue: lease of {key} was lost, result dropped")
+    return key
+
+
+def run_worker(queue, scrape_fn, worker=None, lease_seconds=DEFAULT_LEASE_SECONDS, idle_exit=None,
+               stop_event=None):
+    """Scrapes queued cells until stopped, or until idle for `idle_exit` seconds.
+
+    Returns:
+        Number of cells processed
+    """
+    worker = worker or worker_name()
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    idle_since = time.time()
+    while not stop_event.is_set():
+        if process_one(queue, scrape_fn, worker, lease_seconds) is not None:
+            processed += 1
+            idle_since = time.time()
+            continue
+        if idle_exit is not None and time.time() - idle_since >= idle_exit:
+            break
+        stop_event.wait(POLL_SECONDS)
+    print(f"Work queue: worker {worker} stopping after {processed} cells")
+    return processed
+
+
+def run_coordinator(queue, cells, scrape_fn, record_fn, lease_seconds=DEFAULT_LEASE_SECONDS, time_budget=None):
+    """Enqueues the run's cells, helps scraping them and collects all results.
+
+    The coordinator scrapes queued cells itself while any are pending (so a
+    run without workers still finishes) and otherwise waits for the workers.
+    Results of earlier runs' cells that finish meanwhile are recorded too.
+
+    Args:
+        scrape_fn: Callable taking a cell and returning its flights (None on
+            failure); it stores the cells the coordinator scrapes itself
+        record_fn: Callable(cell, flights, scraped_at) storing a cell another
+            worker scraped
+        time_budget: Seconds to wait for this run's cells, None for unlimited;
+            cells still queued afterwards stay queued for the workers
+
+    Returns:
+        List of all flights of this run's cells
+    """
+    worker = worker_name() + "-coordinator"
+    wanted = {cell_key(cell) for cell in cells}
+    added = queue.enqueue(cells)
+    print(f"Work queue: {added} cells enqueued, {len(wanted) - added} already queued")
+    started = time.time()
+    finished = set()
+    all_flights = []
+    while True:
+        for key, cell, result in queue.collect():
+            if result['flights'] is not None:
+                # Empty results are stored too, so the cell counts as freshly scraped
+                if result['worker'] != worker:
+                    record_fn(cell, result['flights'], result['scraped_at'])
+            elif result['error']:
+                print(f"Work queue: {key} failed on {result['worker']}: {result['error']}")
+            if key in wanted:
+                finished.add(key)
+                all_flights.extend(result['flights'] or [])
+        if finished >= wanted:
+            break
+        if time_budget is not None and time.time() - started > time_budget:
+            print(f"Work queue: time budget reached, {len(wanted - finished)} cells left to the workers")
+            break
+        if process_one(queue, scrape_fn, worker, lease_seconds) is None:
+            time.sleep(POLL_SECONDS)
+    print(f"Work queue: {len(finished)}/{len(wanted)} cells finished, queue {queue.stats()}")
+    return all_flights